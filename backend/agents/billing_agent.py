@@ -1,12 +1,14 @@
 """
 Billing Support Agent - Hybrid RAG/CAG Implementation
-Uses cached general billing info (CAG) + specific query RAG on subsequent requests
+Uses shared general billing info (CAG) + specific query RAG on every request
 """
 
+from typing import Dict
 from langchain_core.messages import HumanMessage, SystemMessage
 from models.schemas import AgentState, Message
-from utils.llm_config import get_response_llm
-from utils.retrieval import get_billing_context
+from utils.llm_config import get_response_llm, get_response_hedge_llm, stream_llm_response, astream_llm_response
+from utils.retrieval import get_billing_context, aget_billing_context, get_query_embedding, aget_query_embedding
+from utils.speculative_retrieval import use_prefetched_context
 
 
 BILLING_AGENT_PROMPT = """You are a helpful billing support specialist. Answer briefly and directly.
@@ -31,8 +33,9 @@ def billing_agent_node(state: AgentState) -> AgentState:
     Billing Support Agent node implementing Hybrid RAG/CAG strategy.
     
     Strategy:
-    - First billing query in session: Perform RAG and cache general billing info
-    - Subsequent queries: Use cached info (CAG) + RAG for specific details
+    - General billing info (CAG): computed once per corpus version and shared
+      by all sessions, which reference it by version
+    - Specific details: RAG for every query
     
     Args:
         state: Current agent state
@@ -46,56 +49,103 @@ def billing_agent_node(state: AgentState) -> AgentState:
         # Get context using Hybrid RAG/CAG strategy
         context_result = get_billing_context(
             query=state.current_message,
-            cached_info=state.cached_billing_info
+            context_version=state.billing_context_version,
+            query_embedding=get_query_embedding(state)
         )
+        prompt = _prepare_prompt(state, context_result)
         
-        context = context_result["context"]
-        cache_update = context_result.get("cache_update")
-        
-        # Update cache if this is the first query
-        if cache_update is not None:
-            state.cached_billing_info = cache_update
-            print(f"   ✓ Cached general billing information for future queries")
-        else:
-            print(f"   ✓ Using cached billing info + specific RAG retrieval")
-        
-        # Format prompt with context
-        prompt = BILLING_AGENT_PROMPT.format(
-            context=context,
-            question=state.current_message
-        )
-        
-        # Get response from OpenAI GPT-4 with strict token limit
+        # Stream response from OpenAI GPT-4 with strict token limit
+        # (deltas reach the SSE client as they are generated)
         llm = get_response_llm()
         messages = [HumanMessage(content=prompt)]
-        response = llm.invoke(messages, max_tokens=150)
+        response_text = stream_llm_response(llm, messages, max_tokens=150)
         
-        # Update state with response
-        state.response = response.content
+        return _record_response(state, response_text)
         
-        # Add message to conversation history
-        assistant_message = Message(
-            role="assistant",
-            content=response.content,
-            agent_type="billing"
-        )
-        state.messages.append(assistant_message)
+    except Exception as e:
+        return _record_fallback(state, e)
+
+
+async def abilling_agent_node(state: AgentState) -> AgentState:
+    """
+    Async variant of billing_agent_node (same Hybrid RAG/CAG strategy).
+    
+    Args:
+        state: Current agent state
         
-        print(f"   ✓ Generated response ({len(response.content)} chars)")
+    Returns:
+        Updated state with generated response
+    """
+    try:
+        print(f"💰 Billing Agent processing query...")
         
-        return state
+        # Prefetched during routing if speculative retrieval is enabled
+        context_result = await use_prefetched_context(state, "billing", lambda: _aretrieve_context(state))
+        prompt = _prepare_prompt(state, context_result)
         
-    except Exception as e:
-        print(f"❌ Error in billing agent: {str(e)}")
-        # Fallback response
-        state.response = "I apologize, but I'm having trouble accessing billing information right now. Please try again or contact our support team for assistance."
+        llm = get_response_llm()
+        messages = [HumanMessage(content=prompt)]
+        response_text = await astream_llm_response(llm, messages, hedge_llm=get_response_hedge_llm(), max_tokens=150)
         
-        assistant_message = Message(
-            role="assistant",
-            content=state.response,
-            agent_type="billing"
-        )
-        state.messages.append(assistant_message)
+        return _record_response(state, response_text)
         
-        return state
+    except Exception as e:
+        return _record_fallback(state, e)
+
+
+async def _aretrieve_context(state: AgentState) -> Dict:
+    """Retrieve billing context with the turn's shared query embedding."""
+    return await aget_billing_context(
+        query=state.current_message,
+        context_version=state.billing_context_version,
+        query_embedding=await aget_query_embedding(state)
+    )
+
+
+def _prepare_prompt(state: AgentState, context_result: Dict) -> str:
+    """Record the shared billing context version on the state and format the prompt."""
+    context = context_result["context"]
+    
+    # Sessions reference the shared general billing context by version
+    if context_result.get("reused"):
+        print(f"   ✓ Using cached billing info + specific RAG retrieval")
+    else:
+        state.billing_context_version = context_result.get("context_version")
+        print(f"   ✓ Using shared general billing information (version {state.billing_context_version})")
+    
+    # Format prompt with context
+    return BILLING_AGENT_PROMPT.format(
+        context=context,
+        question=state.current_message
+    )
+
 
+def _record_response(state: AgentState, response_text: str) -> AgentState:
+    """Store the generated response and add it to the conversation history."""
+    state.response = response_text
+    
+    assistant_message = Message(
+        role="assistant",
+        content=response_text,
+        agent_type="billing"
+    )
+    state.messages.append(assistant_message)
+    
+    print(f"   ✓ Generated response ({len(response_text)} chars)")
+    
+    return state
+
+
+def _record_fallback(state: AgentState, error: Exception) -> AgentState:
+    """Store the fallback response after an agent error."""
+    print(f"❌ Error in billing agent: {str(error)}")
+    state.response = "I apologize, but I'm having trouble accessing billing information right now. Please try again or contact our support team for assistance."
+    
+    assistant_message = Message(
+        role="assistant",
+        content=state.response,
+        agent_type="billing"
+    )
+    state.messages.append(assistant_message)
+    
+    return state
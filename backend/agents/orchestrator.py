@@ -3,14 +3,24 @@ LangGraph Orchestrator Agent
 Routes user queries to specialized worker agents using AWS Bedrock
 """
 
-from typing import Literal
+import time
+from typing import Dict, Literal, Optional
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from models.schemas import AgentState, Message
-from utils.llm_config import get_orchestrator_llm
-from agents.billing_agent import billing_agent_node
-from agents.technical_agent import technical_agent_node
-from agents.policy_agent import policy_agent_node
+from utils.llm_config import (
+    get_orchestrator_llm, get_orchestrator_failover, get_orchestrator_hedge, record_orchestrator_call,
+    invoke_llm, ainvoke_llm, ainvoke_llm_hedged
+)
+from utils.query_classifier import get_query_classifier, ROUTER_CONFIDENCE_THRESHOLD
+from utils.speculative_retrieval import SPECULATIVE_RETRIEVAL, start_speculative_retrieval
+from utils.metrics import observe_stage, set_request_agent
+from utils.routing_cache import get_routing_cache, routing_cache_version
+from agents.billing_agent import billing_agent_node, abilling_agent_node
+from agents.technical_agent import technical_agent_node, atechnical_agent_node
+from agents.policy_agent import policy_agent_node, apolicy_agent_node
+from agents.response_cache_node import response_cache_node, aresponse_cache_node
 
 
 # Orchestrator routing prompt
@@ -46,48 +56,313 @@ User message: {message}
 Category:"""
 
 
+# Routing statistics (fast path, decision cache and LLM)
+ROUTING_STATS = {
+    "fast_path_hits": 0,
+    "cache_hits": 0,
+    "llm_routes": 0,
+    "fast_path_seconds": 0.0,
+    "cache_seconds": 0.0,
+    "llm_seconds": 0.0
+}
+
+
 def route_query(state: AgentState) -> AgentState:
     """
     Orchestrator node: Routes query to appropriate agent using AWS Bedrock.
     
+    Confident local classifications skip the routing LLM entirely, as do
+    messages whose normalized text the LLM has already routed.
+    
     Args:
         state: Current agent state
         
     Returns:
         Updated state with selected agent
     """
+    routing_start = time.perf_counter()
     try:
-        # Get the orchestrator LLM (AWS Bedrock)
+        if _route_fast_path(state):
+            return state
+        
+        # Get the orchestrator LLM (AWS Bedrock while it is healthy)
         llm = get_orchestrator_llm()
+        cache_version = routing_cache_version(ROUTING_PROMPT, llm)
+        if _route_from_cache(state, cache_version):
+            return state
         
         # Format routing prompt
         prompt = ROUTING_PROMPT.format(message=state.current_message)
         
         # Get routing decision
+        start = time.perf_counter()
         messages = [HumanMessage(content=prompt)]
-        response = llm.invoke(messages)
+        response, answered_by = _invoke_routing_llm(llm, messages)
+        _record_llm_route(time.perf_counter() - start)
         
-        # Extract agent selection
-        agent_selection = response.content.strip().lower()
+        if answered_by is not llm:
+            cache_version = routing_cache_version(ROUTING_PROMPT, answered_by)
+        return _apply_routing_decision(state, response.content, cache_version)
         
-        # Validate and set agent
-        valid_agents = ["billing", "technical", "policy"]
-        if agent_selection not in valid_agents:
-            # Default to technical if unclear
-            print(f"⚠️  Unclear routing decision: '{agent_selection}', defaulting to technical")
-            agent_selection = "technical"
+    except Exception as e:
+        print(f"❌ Error in orchestrator routing: {str(e)}")
+        # Default to technical agent on error
+        state.current_agent = "technical"
+        set_request_agent(state.current_agent)
+        return state
+    
+    finally:
+        observe_stage("routing", time.perf_counter() - routing_start, agent=state.current_agent)
+
+
+async def aroute_query(state: AgentState) -> AgentState:
+    """
+    Async variant of route_query.
+    
+    The orchestrator LLM is invoked through its async client.
+    With SPECULATIVE_RETRIEVAL, the likely agents' contexts are prefetched
+    while the routing LLM runs.
+    
+    Args:
+        state: Current agent state
         
-        # Update state
-        state.current_agent = agent_selection
-        print(f"🎯 Orchestrator routed query to: {agent_selection.upper()} agent")
+    Returns:
+        Updated state with selected agent
+    """
+    routing_start = time.perf_counter()
+    try:
+        if _route_fast_path(state):
+            return state
         
-        return state
+        llm = get_orchestrator_llm()
+        cache_version = routing_cache_version(ROUTING_PROMPT, llm)
+        if _route_from_cache(state, cache_version):
+            return state
+        
+        if SPECULATIVE_RETRIEVAL:
+            start_speculative_retrieval(state)
+        
+        prompt = ROUTING_PROMPT.format(message=state.current_message)
+        
+        start = time.perf_counter()
+        messages = [HumanMessage(content=prompt)]
+        response, answered_by = await _ainvoke_routing_llm(llm, messages)
+        _record_llm_route(time.perf_counter() - start)
+        
+        if answered_by is not llm:
+            cache_version = routing_cache_version(ROUTING_PROMPT, answered_by)
+        return _apply_routing_decision(state, response.content, cache_version)
         
     except Exception as e:
         print(f"❌ Error in orchestrator routing: {str(e)}")
         # Default to technical agent on error
         state.current_agent = "technical"
+        set_request_agent(state.current_agent)
         return state
+    
+    finally:
+        observe_stage("routing", time.perf_counter() - routing_start, agent=state.current_agent)
+
+
+def _route_fast_path(state: AgentState) -> bool:
+    """
+    Route with the local classifier if it is confident enough.
+    
+    Args:
+        state: Current agent state
+        
+    Returns:
+        True if the state was routed without the LLM
+    """
+    start = time.perf_counter()
+    label, confidence = get_query_classifier().classify(state.current_message or "")
+    elapsed = time.perf_counter() - start
+    
+    if label is None or confidence < ROUTER_CONFIDENCE_THRESHOLD:
+        return False
+    
+    ROUTING_STATS["fast_path_hits"] += 1
+    ROUTING_STATS["fast_path_seconds"] += elapsed
+    
+    state.current_agent = label
+    set_request_agent(label)
+    print(f"🎯 Orchestrator routed query to: {label.upper()} agent (fast path, confidence {confidence:.2f})")
+    return True
+
+
+def _route_from_cache(state: AgentState, cache_version: str) -> bool:
+    """
+    Route with a decision the routing LLM made earlier for the same
+    normalized message text.
+    
+    Args:
+        state: Current agent state
+        cache_version: Version of the routing prompt and model in use
+        
+    Returns:
+        True if the state was routed from the cache
+    """
+    start = time.perf_counter()
+    label = get_routing_cache().get(state.current_message or "", cache_version)
+    if label is None:
+        return False
+    
+    ROUTING_STATS["cache_hits"] += 1
+    ROUTING_STATS["cache_seconds"] += time.perf_counter() - start
+    
+    state.current_agent = label
+    set_request_agent(label)
+    print(f"🎯 Orchestrator routed query to: {label.upper()} agent (cached decision)")
+    return True
+
+
+def _invoke_routing_llm(llm, messages):
+    """
+    Invoke the routing LLM, recording each call's outcome for provider selection.
+    
+    A failed call is retried once on another provider if one is available.
+    
+    Args:
+        llm: Orchestrator LLM selected for this request
+        messages: Routing prompt messages
+        
+    Returns:
+        Tuple of (response message, LLM that produced it)
+    """
+    try:
+        return _recorded_call(llm, lambda: invoke_llm(llm, messages)), llm
+    except Exception as e:
+        fallback = get_orchestrator_failover(llm)
+        if fallback is None:
+            raise
+        print(f"⚠️  Routing LLM failed ({str(e)}), retrying on another provider")
+        return _recorded_call(fallback, lambda: invoke_llm(fallback, messages)), fallback
+
+
+async def _ainvoke_routing_llm(llm, messages):
+    """
+    Async variant of _invoke_routing_llm.
+    
+    With LLM_HEDGING, a slow call is also sent to the other provider and
+    the first answer is used.
+    """
+    try:
+        return await ainvoke_llm_hedged(
+            llm,
+            get_orchestrator_hedge(llm),
+            messages,
+            kind="routing",
+            call=lambda model: _arecorded_call(model, lambda: ainvoke_llm(model, messages))
+        )
+    except Exception as e:
+        fallback = get_orchestrator_failover(llm)
+        if fallback is None:
+            raise
+        print(f"⚠️  Routing LLM failed ({str(e)}), retrying on another provider")
+        return await _arecorded_call(fallback, lambda: ainvoke_llm(fallback, messages)), fallback
+
+
+def _recorded_call(llm, call):
+    start = time.perf_counter()
+    try:
+        response = call()
+    except Exception as e:
+        record_orchestrator_call(llm, time.perf_counter() - start, error=e)
+        raise
+    record_orchestrator_call(llm, time.perf_counter() - start)
+    return response
+
+
+async def _arecorded_call(llm, call):
+    start = time.perf_counter()
+    try:
+        response = await call()
+    except Exception as e:
+        record_orchestrator_call(llm, time.perf_counter() - start, error=e)
+        raise
+    record_orchestrator_call(llm, time.perf_counter() - start)
+    return response
+
+
+def _record_llm_route(elapsed: float) -> None:
+    ROUTING_STATS["llm_routes"] += 1
+    ROUTING_STATS["llm_seconds"] += elapsed
+
+
+def get_routing_stats() -> Dict:
+    """
+    Summarize fast-path and cached routing effectiveness.
+    
+    Latency saved is estimated as fast-path and cache hits times the average
+    routing LLM latency observed in this process.
+    
+    Returns:
+        Dictionary with hit rates, average latencies and estimated savings
+    """
+    hits = ROUTING_STATS["fast_path_hits"]
+    cache_hits = ROUTING_STATS["cache_hits"]
+    llm_routes = ROUTING_STATS["llm_routes"]
+    total = hits + cache_hits + llm_routes
+    
+    avg_fast_ms = (ROUTING_STATS["fast_path_seconds"] / hits * 1000) if hits else None
+    avg_cache_ms = (ROUTING_STATS["cache_seconds"] / cache_hits * 1000) if cache_hits else None
+    avg_llm_ms = (ROUTING_STATS["llm_seconds"] / llm_routes * 1000) if llm_routes else None
+    saved_seconds: Optional[float] = None
+    if avg_llm_ms is not None and (avg_fast_ms is not None or avg_cache_ms is not None):
+        saved_seconds = (
+            hits * (avg_llm_ms - (avg_fast_ms or 0.0))
+            + cache_hits * (avg_llm_ms - (avg_cache_ms or 0.0))
+        ) / 1000
+    
+    return {
+        "confidence_threshold": ROUTER_CONFIDENCE_THRESHOLD,
+        "fast_path_hits": hits,
+        "cache_hits": cache_hits,
+        "llm_routes": llm_routes,
+        "fast_path_hit_rate": hits / total if total else 0.0,
+        "cache_hit_rate": cache_hits / total if total else 0.0,
+        "avg_fast_path_ms": avg_fast_ms,
+        "avg_cache_ms": avg_cache_ms,
+        "avg_llm_route_ms": avg_llm_ms,
+        "estimated_seconds_saved": saved_seconds,
+        "decision_cache": get_routing_cache().stats()
+    }
+
+
+def _apply_routing_decision(
+    state: AgentState,
+    decision: str,
+    cache_version: Optional[str] = None
+) -> AgentState:
+    """
+    Validate the routing LLM's answer and record the selected agent.
+    
+    Args:
+        state: Current agent state
+        decision: Raw routing LLM output
+        cache_version: Routing prompt/model version to cache a valid decision under
+        
+    Returns:
+        Updated state with selected agent
+    """
+    # Extract agent selection
+    agent_selection = decision.strip().lower()
+    
+    # Validate and set agent
+    valid_agents = ["billing", "technical", "policy"]
+    if agent_selection not in valid_agents:
+        # Default to technical if unclear (never cached)
+        print(f"⚠️  Unclear routing decision: '{agent_selection}', defaulting to technical")
+        agent_selection = "technical"
+    elif cache_version is not None:
+        get_routing_cache().put(state.current_message or "", agent_selection, cache_version)
+    
+    # Update state
+    state.current_agent = agent_selection
+    set_request_agent(agent_selection)
+    print(f"🎯 Orchestrator routed query to: {agent_selection.upper()} agent")
+    
+    return state
 
 
 def route_to_agent(state: AgentState) -> Literal["billing_agent", "technical_agent", "policy_agent"]:
@@ -111,11 +386,27 @@ def route_to_agent(state: AgentState) -> Literal["billing_agent", "technical_age
     return next_node
 
 
+def route_after_cache(state: AgentState) -> Literal["billing_agent", "technical_agent", "policy_agent", "end"]:
+    """
+    Conditional routing after the response cache lookup.
+    
+    Args:
+        state: Current agent state
+        
+    Returns:
+        "end" on a cache hit, otherwise the selected agent node
+    """
+    if state.metadata.get("response_cache", {}).get("hit"):
+        return "end"
+    return route_to_agent(state)
+
+
 def create_agent_graph() -> StateGraph:
     """
     Create the LangGraph StateGraph for multi-agent workflow.
     
-    Flow: START → orchestrator → [billing_agent | technical_agent | policy_agent] → END
+    Flow: START → orchestrator → response_cache → [billing_agent | technical_agent | policy_agent] → END
+    (a response cache hit goes straight to END)
     
     Returns:
         Compiled StateGraph
@@ -123,23 +414,28 @@ def create_agent_graph() -> StateGraph:
     # Create graph
     workflow = StateGraph(AgentState)
     
-    # Add nodes
-    workflow.add_node("orchestrator", route_query)
-    workflow.add_node("billing_agent", billing_agent_node)
-    workflow.add_node("technical_agent", technical_agent_node)
-    workflow.add_node("policy_agent", policy_agent_node)
+    # Add nodes (sync implementation for invoke/stream, async for ainvoke/astream)
+    workflow.add_node("orchestrator", RunnableLambda(route_query, afunc=aroute_query))
+    workflow.add_node("billing_agent", RunnableLambda(billing_agent_node, afunc=abilling_agent_node))
+    workflow.add_node("technical_agent", RunnableLambda(technical_agent_node, afunc=atechnical_agent_node))
+    workflow.add_node("policy_agent", RunnableLambda(policy_agent_node, afunc=apolicy_agent_node))
+    workflow.add_node("response_cache", RunnableLambda(response_cache_node, afunc=aresponse_cache_node))
     
     # Set entry point
     workflow.set_entry_point("orchestrator")
     
-    # Add conditional routing from orchestrator to agents
+    # Check the response cache once the agent is known
+    workflow.add_edge("orchestrator", "response_cache")
+    
+    # Add conditional routing from the cache lookup to agents
     workflow.add_conditional_edges(
-        "orchestrator",
-        route_to_agent,
+        "response_cache",
+        route_after_cache,
         {
             "billing_agent": "billing_agent",
             "technical_agent": "technical_agent",
-            "policy_agent": "policy_agent"
+            "policy_agent": "policy_agent",
+            "end": END
         }
     )
     
@@ -152,7 +448,7 @@ def create_agent_graph() -> StateGraph:
     graph = workflow.compile()
     
     print("✅ LangGraph multi-agent workflow created successfully")
-    print("   Flow: START → orchestrator → [billing | technical | policy] → END")
+    print("   Flow: START → orchestrator → response_cache → [billing | technical | policy] → END")
     
     return graph
 
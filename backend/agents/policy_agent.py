@@ -5,8 +5,9 @@ Uses pre-loaded static policy documents without vector database queries
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from models.schemas import AgentState, Message
-from utils.llm_config import get_response_llm
-from utils.retrieval import get_policy_context
+from utils.llm_config import get_response_llm, get_response_hedge_llm, stream_llm_response, astream_llm_response
+from utils.retrieval import get_policy_context, aget_policy_context
+from utils.speculative_retrieval import use_prefetched_context
 
 
 POLICY_AGENT_PROMPT = """You are a policy specialist. Provide brief, clear policy answers.
@@ -32,6 +33,7 @@ def policy_agent_node(state: AgentState) -> AgentState:
     
     Strategy:
     - Uses pre-loaded static policy documents from memory
+    - Sends only the most relevant sections, within a token budget
     - No vector database queries - fastest response time
     - Ensures consistent policy information
     
@@ -44,8 +46,11 @@ def policy_agent_node(state: AgentState) -> AgentState:
     try:
         print(f"📋 Policy Agent processing query...")
         
-        # Get relevant policy context (Pure CAG with smart selection)
-        context = get_policy_context(query=state.current_message)
+        # Get relevant policy sections (Pure CAG with section-level selection)
+        context = get_policy_context(
+            query=state.current_message,
+            query_embedding=state.query_embedding
+        )
         
         # Note: Smart selection message is printed by get_policy_context()
         
@@ -55,37 +60,80 @@ def policy_agent_node(state: AgentState) -> AgentState:
             question=state.current_message
         )
         
-        # Get response from OpenAI GPT-4 with strict token limit
+        # Stream response from OpenAI GPT-4 with strict token limit
+        # (deltas reach the SSE client as they are generated)
         llm = get_response_llm()
         messages = [HumanMessage(content=prompt)]
-        response = llm.invoke(messages, max_tokens=150)
+        response_text = stream_llm_response(llm, messages, max_tokens=150)
         
-        # Update state with response
-        state.response = response.content
+        return _record_response(state, response_text)
         
-        # Add message to conversation history
-        assistant_message = Message(
-            role="assistant",
-            content=response.content,
-            agent_type="policy"
-        )
-        state.messages.append(assistant_message)
+    except Exception as e:
+        return _record_fallback(state, e)
+
+
+async def apolicy_agent_node(state: AgentState) -> AgentState:
+    """
+    Async variant of policy_agent_node (same Pure CAG strategy).
+    
+    Args:
+        state: Current agent state
         
-        print(f"   ✓ Generated policy response ({len(response.content)} chars)")
+    Returns:
+        Updated state with generated response
+    """
+    try:
+        print(f"📋 Policy Agent processing query...")
         
-        return state
+        # Prefetched during routing if speculative retrieval is enabled
+        context = await use_prefetched_context(state, "policy", lambda: aget_policy_context(
+            query=state.current_message,
+            query_embedding=state.query_embedding
+        ))
         
-    except Exception as e:
-        print(f"❌ Error in policy agent: {str(e)}")
-        # Fallback response
-        state.response = "I apologize, but I'm having trouble accessing policy documents right now. You can find our complete policies at [website]/legal or contact our compliance team for assistance."
+        # Note: Smart selection message is printed by get_policy_context()
         
-        assistant_message = Message(
-            role="assistant",
-            content=state.response,
-            agent_type="policy"
+        prompt = POLICY_AGENT_PROMPT.format(
+            context=context,
+            question=state.current_message
         )
-        state.messages.append(assistant_message)
         
-        return state
+        llm = get_response_llm()
+        messages = [HumanMessage(content=prompt)]
+        response_text = await astream_llm_response(llm, messages, hedge_llm=get_response_hedge_llm(), max_tokens=150)
+        
+        return _record_response(state, response_text)
+        
+    except Exception as e:
+        return _record_fallback(state, e)
 
+
+def _record_response(state: AgentState, response_text: str) -> AgentState:
+    """Store the generated response and add it to the conversation history."""
+    state.response = response_text
+    
+    assistant_message = Message(
+        role="assistant",
+        content=response_text,
+        agent_type="policy"
+    )
+    state.messages.append(assistant_message)
+    
+    print(f"   ✓ Generated policy response ({len(response_text)} chars)")
+    
+    return state
+
+
+def _record_fallback(state: AgentState, error: Exception) -> AgentState:
+    """Store the fallback response after an agent error."""
+    print(f"❌ Error in policy agent: {str(error)}")
+    state.response = "I apologize, but I'm having trouble accessing policy documents right now. You can find our complete policies at [website]/legal or contact our compliance team for assistance."
+    
+    assistant_message = Message(
+        role="assistant",
+        content=state.response,
+        agent_type="policy"
+    )
+    state.messages.append(assistant_message)
+    
+    return state
@@ -0,0 +1,100 @@
+"""
+Response Cache Node - Semantic Response Cache Lookup
+Answers questions equivalent to recently answered ones without retrieval or
+generation (runs after routing, so entries are per agent)
+"""
+
+from models.schemas import AgentState, Message
+from utils.response_cache import get_response_cache
+from utils.speculative_retrieval import prefetched_embedding
+from utils.retrieval import (
+    get_query_embedding, aget_query_embedding,
+    get_corpus_version,
+    get_policy_version, aget_policy_version
+)
+
+
+def response_cache_node(state: AgentState) -> AgentState:
+    """
+    Response cache node: serve a cached answer if an equivalent question was
+    answered by the same agent against the current corpus version.
+
+    Args:
+        state: Current agent state (already routed)
+
+    Returns:
+        Updated state; on a hit the response is set and the agents are skipped
+    """
+    state.metadata["response_cache"] = {"hit": False}
+    cache = get_response_cache()
+    if not cache.enabled or not state.current_message:
+        return state
+
+    try:
+        query_embedding = get_query_embedding(state)
+        if query_embedding is None:
+            return state
+        version = get_policy_version() if state.current_agent == "policy" else get_corpus_version()
+        entry = cache.get(state.current_agent, query_embedding, version)
+        return _apply_cache_result(state, entry, version)
+
+    except Exception as e:
+        print(f"⚠️  Response cache lookup failed: {str(e)}")
+        return state
+
+
+async def aresponse_cache_node(state: AgentState) -> AgentState:
+    """
+    Async variant of response_cache_node.
+
+    Args:
+        state: Current agent state (already routed)
+
+    Returns:
+        Updated state; on a hit the response is set and the agents are skipped
+    """
+    state.metadata["response_cache"] = {"hit": False}
+    cache = get_response_cache()
+    if not cache.enabled or not state.current_message:
+        return state
+
+    try:
+        # Reuse the embedding of a speculative prefetch instead of racing it
+        if state.query_embedding is None:
+            state.query_embedding = await prefetched_embedding(state)
+        query_embedding = await aget_query_embedding(state)
+        if query_embedding is None:
+            return state
+        version = await aget_policy_version() if state.current_agent == "policy" else get_corpus_version()
+        entry = cache.get(state.current_agent, query_embedding, version)
+        return _apply_cache_result(state, entry, version)
+
+    except Exception as e:
+        print(f"⚠️  Response cache lookup failed: {str(e)}")
+        return state
+
+
+def _apply_cache_result(state: AgentState, entry, version: str) -> AgentState:
+    """Record the lookup outcome (and the cached response on a hit)."""
+    if entry is None:
+        # The version is kept so the generated answer can be cached against it
+        state.metadata["response_cache"] = {"hit": False, "version": version}
+        return state
+
+    state.response = entry["response"]
+    state.metadata["response_cache"] = {
+        "hit": True,
+        "version": version,
+        "similarity": entry["similarity"]
+    }
+
+    assistant_message = Message(
+        role="assistant",
+        content=entry["response"],
+        agent_type=state.current_agent
+    )
+    state.messages.append(assistant_message)
+
+    print(f"⚡ Response cache hit for {state.current_agent} agent (similarity {entry['similarity']:.3f})")
+
+    return state
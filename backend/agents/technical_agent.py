@@ -5,8 +5,9 @@ Always queries vector database for the most current technical information
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from models.schemas import AgentState, Message
-from utils.llm_config import get_response_llm
-from utils.retrieval import get_technical_context
+from utils.llm_config import get_response_llm, get_response_hedge_llm, stream_llm_response, astream_llm_response
+from utils.retrieval import get_technical_context, aget_technical_context, get_query_embedding, aget_query_embedding
+from utils.speculative_retrieval import use_prefetched_context
 
 
 TECHNICAL_AGENT_PROMPT = """You are a technical support specialist. Provide brief, actionable solutions.
@@ -44,7 +45,10 @@ def technical_agent_node(state: AgentState) -> AgentState:
         print(f"🔧 Technical Agent processing query...")
         
         # Get context using Pure RAG (always query database)
-        context = get_technical_context(query=state.current_message)
+        context = get_technical_context(
+            query=state.current_message,
+            query_embedding=get_query_embedding(state)
+        )
         
         print(f"   ✓ Retrieved latest technical documentation")
         
@@ -54,37 +58,85 @@ def technical_agent_node(state: AgentState) -> AgentState:
             question=state.current_message
         )
         
-        # Get response from OpenAI GPT-4 with strict token limit
+        # Stream response from OpenAI GPT-4 with strict token limit
+        # (deltas reach the SSE client as they are generated)
         llm = get_response_llm()
         messages = [HumanMessage(content=prompt)]
-        response = llm.invoke(messages, max_tokens=180)
+        response_text = stream_llm_response(llm, messages, max_tokens=180)
         
-        # Update state with response
-        state.response = response.content
+        return _record_response(state, response_text)
         
-        # Add message to conversation history
-        assistant_message = Message(
-            role="assistant",
-            content=response.content,
-            agent_type="technical"
-        )
-        state.messages.append(assistant_message)
+    except Exception as e:
+        return _record_fallback(state, e)
+
+
+async def atechnical_agent_node(state: AgentState) -> AgentState:
+    """
+    Async variant of technical_agent_node (same Pure RAG strategy).
+    
+    Args:
+        state: Current agent state
         
-        print(f"   ✓ Generated technical response ({len(response.content)} chars)")
+    Returns:
+        Updated state with generated response
+    """
+    try:
+        print(f"🔧 Technical Agent processing query...")
         
-        return state
+        # Prefetched during routing if speculative retrieval is enabled
+        context = await use_prefetched_context(state, "technical", lambda: _aretrieve_context(state))
         
-    except Exception as e:
-        print(f"❌ Error in technical agent: {str(e)}")
-        # Fallback response
-        state.response = "I apologize, but I'm having trouble accessing technical documentation right now. Please try again or contact our technical support team for immediate assistance."
+        print(f"   ✓ Retrieved latest technical documentation")
         
-        assistant_message = Message(
-            role="assistant",
-            content=state.response,
-            agent_type="technical"
+        prompt = TECHNICAL_AGENT_PROMPT.format(
+            context=context,
+            question=state.current_message
         )
-        state.messages.append(assistant_message)
         
-        return state
+        llm = get_response_llm()
+        messages = [HumanMessage(content=prompt)]
+        response_text = await astream_llm_response(llm, messages, hedge_llm=get_response_hedge_llm(), max_tokens=180)
+        
+        return _record_response(state, response_text)
+        
+    except Exception as e:
+        return _record_fallback(state, e)
+
+
+async def _aretrieve_context(state: AgentState) -> str:
+    """Retrieve technical context with the turn's shared query embedding."""
+    return await aget_technical_context(
+        query=state.current_message,
+        query_embedding=await aget_query_embedding(state)
+    )
 
+
+def _record_response(state: AgentState, response_text: str) -> AgentState:
+    """Store the generated response and add it to the conversation history."""
+    state.response = response_text
+    
+    assistant_message = Message(
+        role="assistant",
+        content=response_text,
+        agent_type="technical"
+    )
+    state.messages.append(assistant_message)
+    
+    print(f"   ✓ Generated technical response ({len(response_text)} chars)")
+    
+    return state
+
+
+def _record_fallback(state: AgentState, error: Exception) -> AgentState:
+    """Store the fallback response after an agent error."""
+    print(f"❌ Error in technical agent: {str(error)}")
+    state.response = "I apologize, but I'm having trouble accessing technical documentation right now. Please try again or contact our technical support team for immediate assistance."
+    
+    assistant_message = Message(
+        role="assistant",
+        content=state.response,
+        agent_type="technical"
+    )
+    state.messages.append(assistant_message)
+    
+    return state
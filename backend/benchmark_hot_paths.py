@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Benchmark: retrieval and serving hot paths
+Times the per-request code paths (policy CAG, RAG context assembly, hybrid
+billing context, ChromaDB queries, SSE event serialization and the LangGraph
+state round trip) and stores the results as a JSON baseline that later runs
+are compared against.
+
+Runs offline: embeddings are deterministic hash vectors, the LLMs are fakes
+and ChromaDB is a temporary snapshot of data/ embedded with those vectors,
+so only the repo's own code is timed.
+
+Usage:
+    python benchmark_hot_paths.py --save baseline.json
+    python benchmark_hot_paths.py --compare baseline.json            # exit 1 on regressions
+    python benchmark_hot_paths.py --compare baseline.json --threshold 0.2 --filter policy
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import itertools
+import platform
+import tempfile
+import statistics
+import contextlib
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+os.environ["RETRIEVAL_ENGINE"] = "chroma"
+# The fakes have no quota; pacing them would time the rate limiter's sleeps
+for limit in ("OPENAI", "EMBEDDING", "BEDROCK"):
+    os.environ[f"{limit}_REQUESTS_PER_MINUTE"] = "0"
+    os.environ[f"{limit}_TOKENS_PER_MINUTE"] = "0"
+
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+import main as api
+import utils.llm_config as llm_config
+import utils.retrieval as retrieval
+import agents.orchestrator as orchestrator
+from ingest_data import DATA_DIR, COLLECTION_NAME, build_chunk_records
+from models.schemas import AgentState, Message
+
+EMBEDDING_DIM = 1536  # text-embedding-3-small
+
+BENCHMARK_QUERIES = {
+    "billing": [
+        "How much does the Premium plan cost?",
+        "Can I get a refund for last month's invoice?",
+        "How do I update my payment method?",
+    ],
+    "technical": [
+        "I can't log in to my account",
+        "The API returns a 401 error",
+        "Webhooks stopped firing after the update",
+    ],
+    "policy": [
+        "What is your privacy policy?",
+        "Can I delete my data under GDPR?",
+        "Do you use tracking cookies?",
+    ],
+}
+
+# Length of the fake answer and of the conversation history used by the
+# SSE and graph benchmarks
+ANSWER_TOKENS = 200
+HISTORY_MESSAGES = 20
+
+DEFAULT_THRESHOLD = 0.15
+
+
+class HashEmbeddings:
+    """Deterministic embeddings: equal texts get equal unit vectors."""
+
+    def embed_query(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class ReplayGraph:
+    """Graph stand-in that replays a recorded astream() run, so the SSE loop is timed on its own."""
+
+    def __init__(self, events: List[tuple]):
+        self.events = events
+
+    async def astream(self, state, stream_mode=None):
+        for event in self.events:
+            yield event
+
+
+def build_chroma_snapshot(path: str, embeddings: HashEmbeddings):
+    """Chunk and embed every document under data/ into a ChromaDB collection at path."""
+    client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(name=COLLECTION_NAME)
+
+    records = []
+    for doc_type in ("billing", "technical", "policy"):
+        for file_path in sorted((DATA_DIR / doc_type).glob("*.txt")):
+            records.extend(build_chunk_records(doc_type, file_path.name, file_path.read_text(encoding="utf-8")))
+
+    texts = [record["text"] for record in records]
+    collection.add(
+        ids=[record["id"] for record in records],
+        documents=texts,
+        metadatas=[record["metadata"] for record in records],
+        embeddings=embeddings.embed_documents(texts)
+    )
+    return collection
+
+
+def install_offline_providers(collection, embeddings: HashEmbeddings) -> None:
+    """Point retrieval at the snapshot and swap the LLMs for fakes."""
+    retrieval.get_embeddings = lambda: embeddings
+    retrieval.get_collection = lambda: collection
+    retrieval._embedding_cache = None
+    retrieval._billing_general_context = None
+
+    answer = " ".join(f"word{i}" for i in range(ANSWER_TOKENS))
+    llm_config.response_llm = GenericFakeChatModel(messages=itertools.cycle([AIMessage(content=answer)]))
+    routing_llm = GenericFakeChatModel(messages=itertools.cycle([AIMessage(content="technical")]))
+    orchestrator.get_orchestrator_llm = lambda: routing_llm
+
+    retrieval.warm_policy_sections()
+    retrieval.warm_billing_context()
+
+
+def conversation_state(session_id: str, message: str) -> AgentState:
+    """Session state with HISTORY_MESSAGES earlier turns and a new user message."""
+    history = []
+    for i in range(HISTORY_MESSAGES // 2):
+        history.append(Message(role="user", content=f"Earlier question {i} about my account"))
+        history.append(Message(role="assistant", content=f"Earlier answer {i} " * 40, agent_type="technical"))
+    history.append(Message(role="user", content=message))
+    return AgentState(session_id=session_id, messages=history, current_message=message)
+
+
+def recorded_stream_events(agent: str, answer_tokens: int) -> List[tuple]:
+    """The (mode, chunk) events the graph yields for one streamed answer."""
+    node = f"{agent}_agent"
+    events = [("updates", {"orchestrator": {"current_agent": agent}})]
+    for i in range(answer_tokens):
+        events.append(("messages", (AIMessageChunk(content=f" word{i}"), {"langgraph_node": node})))
+    events.append(("values", {
+        "current_agent": agent,
+        "response": "".join(f" word{i}" for i in range(answer_tokens)),
+        "metadata": {}
+    }))
+    return events
+
+
+def build_benchmarks() -> Dict[str, Callable[[], object]]:
+    """Map benchmark names to zero-argument callables (one call = one operation)."""
+    embeddings = retrieval.get_embeddings()
+    queries = {
+        doc_type: itertools.cycle([(query, embeddings.embed_query(query)) for query in doc_queries])
+        for doc_type, doc_queries in BENCHMARK_QUERIES.items()
+    }
+    technical_results = retrieval.query_rag(
+        BENCHMARK_QUERIES["technical"][0],
+        document_type="technical",
+        top_k=5,
+        query_embedding=embeddings.embed_query(BENCHMARK_QUERIES["technical"][0])
+    )
+    # Overlapping retrievals (billing hybrid, speculative prefetch) repeat chunks
+    rag_results = technical_results + technical_results[:2]
+
+    def policy_smart_selection():
+        query, _ = next(queries["policy"])
+        return retrieval.load_policy_documents(query)
+
+    def policy_section_context():
+        query, vector = next(queries["policy"])
+        return retrieval.get_policy_context(query, query_embedding=vector)
+
+    def billing_context():
+        query, vector = next(queries["billing"])
+        return retrieval.get_billing_context(query, context_version=None, query_embedding=vector)
+
+    def chroma_query_rag():
+        query, vector = next(queries["technical"])
+        return retrieval.query_rag(query, document_type="technical", top_k=5, query_embedding=vector)
+
+    loop = asyncio.new_event_loop()
+    replay_graph = ReplayGraph(recorded_stream_events("technical", ANSWER_TOKENS))
+
+    async def consume_sse_stream():
+        state = conversation_state("benchmark-sse", BENCHMARK_QUERIES["technical"][0])
+        async for _ in api.generate_sse_stream("benchmark-sse", state, state.current_message):
+            pass
+
+    def sse_stream():
+        api.agent_graph = replay_graph
+        loop.run_until_complete(consume_sse_stream())
+
+    graph = orchestrator.create_agent_graph()
+
+    def graph_invoke():
+        query = BENCHMARK_QUERIES["technical"][1]
+        return graph.invoke(conversation_state("benchmark-graph", query))
+
+    return {
+        "load_policy_documents.cached": retrieval.load_policy_documents,
+        "load_policy_documents.smart_selection": policy_smart_selection,
+        "get_policy_context.sections": policy_section_context,
+        "format_rag_context": lambda: retrieval.format_rag_context(rag_results, max_tokens=retrieval.TECHNICAL_CONTEXT_TOKENS),
+        "get_billing_context": billing_context,
+        "query_rag.chroma": chroma_query_rag,
+        "generate_sse_stream": sse_stream,
+        "agent_graph.invoke": graph_invoke,
+    }
+
+
+def time_benchmark(func: Callable[[], object], rounds: int, min_round_seconds: float) -> Dict:
+    """
+    Time a callable in rounds of equal iteration counts.
+
+    The iteration count is calibrated so a round takes at least
+    min_round_seconds. The fastest round (least disturbed by other load on
+    the machine) is what baselines are compared on.
+
+    Returns:
+        Per-call statistics in microseconds
+    """
+    func()  # warm up caches and lazy imports
+
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_seconds or iterations >= 1_000_000:
+            break
+        iterations *= 2 if elapsed <= 0 else max(2, min(10, int(min_round_seconds / elapsed) + 1))
+
+    # Like timeit, keep garbage collection pauses out of the timed rounds
+    per_call = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            per_call.append((time.perf_counter() - start) / iterations * 1e6)
+    finally:
+        gc.enable()
+
+    return {
+        "min_us": round(min(per_call), 3),
+        "median_us": round(statistics.median(per_call), 3),
+        "stdev_us": round(statistics.stdev(per_call), 3) if len(per_call) > 1 else 0.0,
+        "iterations": iterations,
+        "rounds": rounds
+    }
+
+
+def run_benchmarks(name_filter: Optional[str], rounds: int, min_round_seconds: float) -> Dict:
+    """Build the offline environment and time every (matching) benchmark."""
+    embeddings = HashEmbeddings()
+    with tempfile.TemporaryDirectory() as snapshot_dir, open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            collection = build_chroma_snapshot(snapshot_dir, embeddings)
+            chunks = collection.count()
+            install_offline_providers(collection, embeddings)
+            benchmarks = build_benchmarks()
+
+        results = {}
+        for name, func in benchmarks.items():
+            if name_filter and name_filter not in name:
+                continue
+            # Agents and retrieval log every request; keep that out of the report
+            with contextlib.redirect_stdout(devnull):
+                results[name] = time_benchmark(func, rounds, min_round_seconds)
+            print(f"   {name:<40}{format_us(results[name]['min_us']):>12}  "
+                  f"(median {format_us(results[name]['median_us'])}, {results[name]['iterations']} calls x {rounds})")
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "chunks": chunks,
+        "benchmarks": results
+    }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """
+    Compare best-of-rounds times against a baseline.
+
+    Args:
+        baseline: Stored benchmark report
+        current: Report of this run
+        threshold: Relative slowdown above which a benchmark is a regression
+
+    Returns:
+        One row per benchmark present in both reports
+    """
+    rows = []
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            continue
+        change = result["min_us"] / before["min_us"] - 1 if before["min_us"] else 0.0
+        if change > threshold:
+            verdict = "regression"
+        elif change < -threshold:
+            verdict = "improvement"
+        else:
+            verdict = "unchanged"
+        rows.append({
+            "name": name,
+            "baseline_us": before["min_us"],
+            "current_us": result["min_us"],
+            "change": change,
+            "verdict": verdict
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict], threshold: float) -> None:
+    icons = {"regression": "❌", "improvement": "✅", "unchanged": "  "}
+    print(f"\n   Comparison with baseline (threshold ±{threshold:.0%}):")
+    for row in rows:
+        print(f"   {icons[row['verdict']]} {row['name']:<40}{format_us(row['baseline_us']):>12} → "
+              f"{format_us(row['current_us']):>10}  {row['change']:+7.1%}  {row['verdict']}")
+
+
+def format_us(microseconds: float) -> str:
+    if microseconds >= 1000:
+        return f"{microseconds / 1000:.2f} ms"
+    return f"{microseconds:.1f} µs"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="Write the results as a JSON baseline to this file")
+    parser.add_argument("--compare", help="Compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown flagged as a regression (0.15 = 15%%)")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=7, help="Timed rounds per benchmark")
+    parser.add_argument("--min-round-seconds", type=float, default=0.2, help="Minimum duration of a round")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print("\n" + "="*70)
+    print(f"📊 Hot Path Benchmarks (best time per call of {args.rounds} rounds)")
+    print("="*70)
+    report = run_benchmarks(args.filter, args.rounds, args.min_round_seconds)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+        print(f"\n💾 Baseline written to {args.save}")
+
+    if baseline is None:
+        return 0
+
+    rows = compare_results(baseline, report, args.threshold)
+    print_comparison(rows, args.threshold)
+    regressions = [row["name"] for row in rows if row["verdict"] == "regression"]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
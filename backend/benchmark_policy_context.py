@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: whole-document vs. section-level policy context
+Compares the policy agent's prompt tokens and end-to-end latency when the
+prompt carries whole policy documents (keyword-selected files) versus the
+token-budgeted sections from the policy section index.
+
+Prompt tokens and context assembly time are measured offline. With --live the
+response LLM is called for both prompts (requires API keys) to measure
+time-to-first-token and total generation time.
+
+Usage:
+    python benchmark_policy_context.py          # prompt tokens only (offline)
+    python benchmark_policy_context.py --live   # plus LLM latency
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from typing import Dict, List
+
+BENCHMARK_QUERIES = [
+    "What is your privacy policy?",
+    "How long do you keep my data?",
+    "Can I delete my account data under GDPR?",
+    "Do you use cookies for tracking?",
+    "What happens if I violate the acceptable use policy?",
+    "Which court handles disputes?",
+    "How do I request a copy of my personal data?",
+    "Do you transfer data outside the EU?",
+]
+
+
+def measure_prompt(build_context, query: str) -> Dict:
+    """Build the policy prompt for a query and count its tokens."""
+    from agents.policy_agent import POLICY_AGENT_PROMPT
+    from utils.token_utils import count_tokens
+
+    start = time.perf_counter()
+    context = build_context(query)
+    context_ms = (time.perf_counter() - start) * 1000
+
+    prompt = POLICY_AGENT_PROMPT.format(context=context, question=query)
+    return {"prompt": prompt, "tokens": count_tokens(prompt), "context_ms": context_ms}
+
+
+def measure_generation(prompt: str) -> Dict:
+    """Stream the policy answer and time the first token and the full response."""
+    from langchain_core.messages import HumanMessage
+    from utils.llm_config import get_response_llm
+
+    llm = get_response_llm()
+    start = time.perf_counter()
+    first_token_ms = None
+    for chunk in llm.stream([HumanMessage(content=prompt)], max_tokens=150):
+        if first_token_ms is None and chunk.content:
+            first_token_ms = (time.perf_counter() - start) * 1000
+    total_ms = (time.perf_counter() - start) * 1000
+    return {"first_token_ms": first_token_ms or total_ms, "total_ms": total_ms}
+
+
+def summarize(label: str, runs: List[Dict], live: bool) -> None:
+    tokens = [run["tokens"] for run in runs]
+    print(f"   {label}")
+    print(f"      Prompt tokens:     mean {statistics.mean(tokens):7.0f}, max {max(tokens):6d}")
+    print(f"      Context build:     mean {statistics.mean(run['context_ms'] for run in runs):7.3f} ms")
+    if live:
+        print(f"      Time to 1st token: p50 {statistics.median(run['first_token_ms'] for run in runs):7.0f} ms")
+        print(f"      End-to-end:        p50 {statistics.median(run['total_ms'] for run in runs):7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Also measure LLM latency (calls the API)")
+    parser.add_argument("--repeat", type=int, default=1, help="LLM calls per query and variant with --live")
+    args = parser.parse_args()
+
+    if not args.live:
+        # Offline: rank sections by keywords only (no embedding calls)
+        os.environ["POLICY_SECTION_EMBEDDINGS"] = "false"
+        os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+
+    from utils.retrieval import POLICY_CONTEXT_TOKENS, load_policy_documents, get_policy_context, warm_policy_sections
+
+    warm_policy_sections()
+
+    print("\n" + "="*70)
+    print(f"📊 Policy Context Benchmark ({len(BENCHMARK_QUERIES)} queries, budget {POLICY_CONTEXT_TOKENS} tokens)")
+    print("="*70)
+
+    variants = {
+        "Whole documents (before)": load_policy_documents,
+        "Section index (after)": get_policy_context,
+    }
+    results = {label: [] for label in variants}
+
+    for query in BENCHMARK_QUERIES:
+        for label, build_context in variants.items():
+            run = measure_prompt(build_context, query)
+            if args.live:
+                timings = [measure_generation(run["prompt"]) for _ in range(args.repeat)]
+                run["first_token_ms"] = statistics.median(t["first_token_ms"] for t in timings)
+                run["total_ms"] = statistics.median(t["total_ms"] for t in timings)
+            results[label].append(run)
+
+    print()
+    for label, runs in results.items():
+        summarize(label, runs, args.live)
+
+    before, after = results.values()
+    before_tokens = sum(run["tokens"] for run in before)
+    after_tokens = sum(run["tokens"] for run in after)
+    print(f"\n   Prompt token reduction: {1 - after_tokens / before_tokens:.0%}")
+    if args.live:
+        before_ms = statistics.median(run["total_ms"] for run in before)
+        after_ms = statistics.median(run["total_ms"] for run in after)
+        print(f"   End-to-end speedup (p50): {before_ms / after_ms:.2f}x")
+    print()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
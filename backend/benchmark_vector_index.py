@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: NumPy vector index vs. ChromaDB retrieval
+Compares query latency and recall@k of the two engines behind query_rag.
+Runs offline: queries are perturbed copies of stored chunk embeddings, so no
+embedding API calls are made.
+
+Usage:
+    python benchmark_vector_index.py                   # use ingested ./chroma_db
+    python benchmark_vector_index.py --synthetic 600   # synthetic corpus
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+from dotenv import load_dotenv
+
+from utils.vector_index import DOCUMENT_TYPES, NumpyVectorIndex, export_vector_index
+
+load_dotenv()
+
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+COLLECTION_NAME = "customer_service_docs"
+EMBEDDING_DIM = 1536  # text-embedding-3-small
+
+
+def build_synthetic_collection(client, chunk_count: int):
+    """Create a collection of random unit vectors spread over the document types."""
+    rng = np.random.default_rng(42)
+    collection = client.create_collection(name=COLLECTION_NAME)
+
+    vectors = rng.standard_normal((chunk_count, EMBEDDING_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    ids, documents, metadatas = [], [], []
+    for i in range(chunk_count):
+        document_type = DOCUMENT_TYPES[i % len(DOCUMENT_TYPES)]
+        ids.append(f"{document_type}_synthetic_{i}")
+        documents.append(f"Synthetic {document_type} chunk {i}")
+        metadatas.append({"document_type": document_type, "source_document": f"synthetic_{i}.txt"})
+
+    collection.add(ids=ids, embeddings=vectors.tolist(), documents=documents, metadatas=metadatas)
+    return collection
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run_benchmark(collection, index_dir: Path, query_count: int, top_k: int) -> Dict:
+    """Time both engines on the same queries and measure Chroma recall against exact search."""
+    export_vector_index(collection, index_dir)
+    index = NumpyVectorIndex(index_dir)
+
+    rng = np.random.default_rng(7)
+    chroma_ms, numpy_ms, recalls = [], [], []
+
+    for i in range(query_count):
+        document_type = DOCUMENT_TYPES[i % len(DOCUMENT_TYPES)]
+        partition = index.partitions[document_type]
+        if len(partition) == 0:
+            continue
+
+        # Perturbed copy of a stored chunk embedding
+        base = np.asarray(partition.embeddings[rng.integers(len(partition))], dtype=np.float32)
+        query = (base + rng.normal(0, 0.02, base.shape).astype(np.float32)).tolist()
+
+        start = time.perf_counter()
+        chroma_results = collection.query(
+            query_embeddings=[query],
+            n_results=top_k,
+            where={"document_type": document_type},
+            include=["documents", "metadatas", "distances"]
+        )
+        chroma_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        numpy_results = index.query(query, document_type=document_type, top_k=top_k)
+        numpy_ms.append((time.perf_counter() - start) * 1000)
+
+        exact = {result["content"] for result in numpy_results}
+        approximate = set(chroma_results["documents"][0])
+        recalls.append(len(exact & approximate) / len(exact))
+
+    return {
+        "chunks": len(index),
+        "queries": len(recalls),
+        "chroma_p50_ms": statistics.median(chroma_ms),
+        "chroma_p95_ms": percentile(chroma_ms, 0.95),
+        "numpy_p50_ms": statistics.median(numpy_ms),
+        "numpy_p95_ms": percentile(numpy_ms, 0.95),
+        "chroma_recall_at_k": statistics.mean(recalls)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark a synthetic corpus with this many chunks")
+    parser.add_argument("--queries", type=int, default=300, help="Number of benchmark queries")
+    parser.add_argument("--top-k", type=int, default=5, help="Results per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.synthetic:
+            client = chromadb.PersistentClient(path=tmp_dir, settings=Settings(anonymized_telemetry=False))
+            collection = build_synthetic_collection(client, args.synthetic)
+            source = f"synthetic ({args.synthetic} chunks)"
+        else:
+            client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR, settings=Settings(anonymized_telemetry=False))
+            collection = client.get_collection(name=COLLECTION_NAME)
+            source = CHROMA_PERSIST_DIR
+
+        print("\n" + "="*70)
+        print(f"📊 Vector Index Benchmark: {source}")
+        print("="*70)
+
+        stats = run_benchmark(collection, Path(tmp_dir) / "vector_index", args.queries, args.top_k)
+
+    print(f"   Chunks indexed:      {stats['chunks']}")
+    print(f"   Queries:             {stats['queries']} (top_k={args.top_k})")
+    print(f"   ChromaDB latency:    p50 {stats['chroma_p50_ms']:.3f} ms, p95 {stats['chroma_p95_ms']:.3f} ms")
+    print(f"   NumPy latency:       p50 {stats['numpy_p50_ms']:.3f} ms, p95 {stats['numpy_p95_ms']:.3f} ms")
+    print(f"   Speedup (p50):       {stats['chroma_p50_ms'] / stats['numpy_p50_ms']:.1f}x")
+    print(f"   NumPy recall@k:      1.000 (exact search)")
+    print(f"   ChromaDB recall@k:   {stats['chroma_recall_at_k']:.3f} (HNSW vs. exact)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
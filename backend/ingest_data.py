@@ -5,14 +5,23 @@ Processes mock documents, creates embeddings, and stores in ChromaDB
 
 import os
 import glob
+import json
+import time
+import uuid
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 import chromadb
 from chromadb.config import Settings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
+from utils.token_utils import count_tokens
+from utils.vector_index import export_vector_index, _replace_file
+from utils.rate_limiter import call_with_retries, estimate_tokens
 
 # Load environment variables
 load_dotenv()
@@ -21,11 +30,20 @@ load_dotenv()
 DATA_DIR = Path(__file__).parent / "data"
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
 COLLECTION_NAME = "customer_service_docs"
+CORPUS_VERSION_FILE = Path(CHROMA_PERSIST_DIR) / "corpus_version.json"
+MANIFEST_FILE = Path(CHROMA_PERSIST_DIR) / "ingest_manifest.json"
+EMBEDDING_MODEL = "text-embedding-3-small"
+VECTOR_INDEX_DIR = Path(os.getenv("VECTOR_INDEX_DIR", str(Path(CHROMA_PERSIST_DIR) / "vector_index")))
 
 # Text splitting parameters
 CHUNK_SIZE = 800  # tokens (approximate, ~600-1000 words)
 CHUNK_OVERLAP = 100  # tokens overlap for context continuity
 
+# Embedding batching (chunks from all files are embedded together)
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "50000"))  # tokens per request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))  # inputs per request
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))  # requests in flight
+
 
 def get_document_files() -> Dict[str, List[Path]]:
     """
@@ -97,19 +115,244 @@ def chunk_document(content: str, source_file: str) -> List[Dict]:
     return chunk_dicts
 
 
-def ingest_documents():
+def write_corpus_version() -> str:
+    """
+    Record a new corpus version after ingestion.
+    
+    The running backend watches this file and drops caches built from the
+    previous corpus (shared billing context, collection handle). The file is
+    replaced atomically, so the watcher never reads a partial write.
+    
+    Returns:
+        New corpus version identifier
+    """
+    version = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    record = {"version": version, "ingested_at": datetime.now().isoformat()}
+    _replace_file(Path(CORPUS_VERSION_FILE), lambda f: f.write(json.dumps(record).encode("utf-8")))
+    return version
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 hex digest of text content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest() -> Optional[Dict]:
+    """
+    Load the ingestion manifest written by the previous run.
+    
+    Returns:
+        Manifest dictionary, or None if missing or unreadable
+    """
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(manifest: Dict) -> None:
+    """Persist the ingestion manifest (written atomically)."""
+    tmp_path = MANIFEST_FILE.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+
+def get_ingest_settings() -> Dict:
+    """Settings that invalidate every stored chunk when they change."""
+    return {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP
+    }
+
+
+def build_chunk_records(doc_type: str, filename: str, content: str) -> List[Dict]:
+    """
+    Chunk a document and assign content-derived chunk IDs.
+    
+    IDs depend on the chunk text (not its position), so chunks that only move
+    within a file keep their ID and embedding.
+    
+    Args:
+        doc_type: Document type (billing, technical, policy)
+        filename: Source filename
+        content: Document text content
+        
+    Returns:
+        List of chunk records with id, text and metadata
+    """
+    records = []
+    seen = {}
+    
+    for chunk in chunk_document(content, filename):
+        chunk_hash = hash_text(chunk["text"])[:16]
+        
+        # Identical chunks within a file get distinct IDs
+        occurrence = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = occurrence + 1
+        suffix = f"_{occurrence}" if occurrence else ""
+        
+        records.append({
+            "id": f"{doc_type}_{filename}_{chunk_hash}{suffix}",
+            "text": chunk["text"],
+            "metadata": {
+                "document_type": doc_type,
+                "source_document": filename,
+                "chunk_index": chunk["chunk_index"],
+                "total_chunks": chunk["total_chunks"],
+                "content_hash": chunk_hash,
+                "last_updated": datetime.now().isoformat()
+            }
+        })
+    
+    return records
+
+
+def make_embedding_batches(records: List[Dict]) -> List[List[Dict]]:
+    """
+    Group chunk records into batches under the token and input-count budgets.
+    
+    Args:
+        records: Chunk records to embed
+        
+    Returns:
+        List of record batches
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    
+    for record in records:
+        tokens = count_tokens(record["text"])
+        if current and (current_tokens + tokens > EMBED_BATCH_TOKENS or len(current) >= EMBED_BATCH_SIZE):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(record)
+        current_tokens += tokens
+    
+    if current:
+        batches.append(current)
+    return batches
+
+
+def embed_batch(embeddings_model, texts: List[str]) -> List[List[float]]:
+    """
+    Embed one batch behind the shared embeddings rate limiter.
+    
+    Throttled, timed-out and 5xx failures are retried with jittered backoff
+    (honouring retry-after); other errors (e.g. 400/401) fail immediately.
+    
+    Args:
+        embeddings_model: Embeddings client
+        texts: Batch of chunk texts
+        
+    Returns:
+        Embedding vectors in input order
+    """
+    return call_with_retries(
+        "embeddings",
+        lambda: embeddings_model.embed_documents(texts),
+        estimate_tokens(texts)
+    )
+
+
+def embed_records_concurrently(embeddings_model, records: List[Dict]) -> tuple:
+    """
+    Embed chunk records from all files in batches on a bounded worker pool.
+    
+    Args:
+        embeddings_model: Embeddings client
+        records: Chunk records to embed
+        
+    Returns:
+        Tuple of ({chunk_id: vector}, set of chunk IDs whose batch failed)
+    """
+    if not records:
+        return {}, set()
+    
+    batches = make_embedding_batches(records)
+    print(f"\n🧮 Embedding {len(records)} chunks in {len(batches)} batches ({EMBED_CONCURRENCY} concurrent)...")
+    
+    vectors = {}
+    failed_ids = set()
+    with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY) as pool:
+        futures = {
+            pool.submit(embed_batch, embeddings_model, [record["text"] for record in batch]): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                for record, vector in zip(batch, future.result()):
+                    vectors[record["id"]] = vector
+            except Exception as e:
+                print(f"   ✗ Embedding batch of {len(batch)} chunks failed: {str(e)}")
+                failed_ids.update(record["id"] for record in batch)
+    
+    return vectors, failed_ids
+
+
+def ingest_documents(full_rebuild: bool = False):
     """
     Main ingestion function: loads documents, creates embeddings, stores in ChromaDB.
+    
+    Incremental by default: files whose content hash matches the manifest are
+    skipped, only new chunks are embedded and upserted, moved chunks get
+    metadata-only updates, and chunks from edited or deleted files are removed.
+    The serving collection is never emptied.
+    
+    Args:
+        full_rebuild: Delete the collection and re-embed everything
     """
+    start_time = time.perf_counter()
+    
     print("\n" + "="*70)
     print("🚀 Starting Data Ingestion Pipeline")
     print("="*70)
     
+    # Get all document files and hash their content
+    doc_files = get_document_files()
+    current_files = {}
+    for doc_type, files in doc_files.items():
+        for file_path in files:
+            content = load_document(file_path)
+            current_files[f"{doc_type}/{file_path.name}"] = {
+                "document_type": doc_type,
+                "filename": file_path.name,
+                "content": content,
+                "file_hash": hash_text(content)
+            }
+    
+    # Compare against the previous run
+    manifest = load_manifest()
+    if manifest is None or manifest.get("settings") != get_ingest_settings():
+        if not full_rebuild:
+            print("\nℹ️  No compatible ingestion manifest found, performing full rebuild")
+        full_rebuild = True
+    
+    previous_files = {} if full_rebuild else manifest["files"]
+    changed = [
+        key for key, info in current_files.items()
+        if previous_files.get(key, {}).get("file_hash") != info["file_hash"]
+    ]
+    removed = [key for key in previous_files if key not in current_files]
+    
+    if not changed and not removed:
+        elapsed = time.perf_counter() - start_time
+        print(f"\n✅ All {len(current_files)} documents unchanged, nothing to ingest ({elapsed:.2f}s)\n")
+        return
+    
+    print(f"\n🔍 {len(changed)} new/changed and {len(removed)} removed documents")
+    
     # Initialize OpenAI embeddings
-    print("\n🔑 Initializing OpenAI embeddings (text-embedding-3-small)...")
+    print(f"\n🔑 Initializing OpenAI embeddings ({EMBEDDING_MODEL})...")
     embeddings_model = OpenAIEmbeddings(
-        model="text-embedding-3-small",
-        openai_api_key=os.getenv("OPENAI_API_KEY")
+        model=EMBEDDING_MODEL,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=0  # Retried per batch behind the shared rate limiter
     )
     
     # Initialize ChromaDB client with persistence
@@ -119,90 +362,133 @@ def ingest_documents():
         settings=Settings(anonymized_telemetry=False)
     )
     
-    # Get or create collection (delete existing for fresh start)
-    try:
-        chroma_client.delete_collection(name=COLLECTION_NAME)
-        print(f"🗑️  Deleted existing collection: {COLLECTION_NAME}")
-    except Exception:
-        print(f"ℹ️  No existing collection to delete")
+    if full_rebuild:
+        try:
+            chroma_client.delete_collection(name=COLLECTION_NAME)
+            print(f"🗑️  Deleted existing collection: {COLLECTION_NAME}")
+        except Exception:
+            print(f"ℹ️  No existing collection to delete")
     
-    collection = chroma_client.create_collection(
+    collection = chroma_client.get_or_create_collection(
         name=COLLECTION_NAME,
         metadata={"description": "Customer service documents with billing, technical, and policy content"}
     )
-    print(f"✅ Created collection: {COLLECTION_NAME}")
+    print(f"✅ Using collection: {COLLECTION_NAME}")
     
-    # Get all document files
-    doc_files = get_document_files()
+    new_manifest_files = {
+        key: previous_files[key] for key in current_files
+        if key in previous_files and key not in changed
+    }
+    deleted_chunks = 0
     
-    # Process each document type
-    total_chunks = 0
-    total_documents = 0
+    # Remove chunks of deleted documents
+    for key in removed:
+        stale_ids = previous_files[key]["chunk_ids"]
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+        deleted_chunks += len(stale_ids)
+        print(f"   🗑️  {key}: removed {len(stale_ids)} chunks")
     
-    for doc_type, files in doc_files.items():
-        print(f"\n📚 Processing {doc_type.upper()} documents...")
+    # Re-chunk new/changed documents and plan their collection changes
+    plans = {}
+    for key in changed:
+        info = current_files[key]
+        try:
+            records = build_chunk_records(info["document_type"], info["filename"], info["content"])
+        except Exception as e:
+            print(f"   ✗ Error chunking {key}: {str(e)}")
+            if key in previous_files:
+                new_manifest_files[key] = previous_files[key]
+            continue
         
-        for file_path in files:
-            try:
-                # Load document content
-                content = load_document(file_path)
-                filename = file_path.name
-                
-                # Chunk the document
-                chunks = chunk_document(content, filename)
-                
-                print(f"   ✓ {filename}: {len(chunks)} chunks")
-                
-                # Prepare data for ChromaDB
-                chunk_ids = []
-                chunk_texts = []
-                chunk_metadatas = []
-                
-                for chunk in chunks:
-                    # Generate unique ID for each chunk
-                    chunk_id = f"{doc_type}_{filename}_{chunk['chunk_index']}"
-                    
-                    # Prepare metadata
-                    metadata = {
-                        "document_type": doc_type,
-                        "source_document": filename,
-                        "chunk_index": chunk["chunk_index"],
-                        "total_chunks": chunk["total_chunks"],
-                        "last_updated": datetime.now().isoformat()
-                    }
-                    
-                    chunk_ids.append(chunk_id)
-                    chunk_texts.append(chunk["text"])
-                    chunk_metadatas.append(metadata)
-                
-                # Generate embeddings for all chunks
-                embeddings = embeddings_model.embed_documents(chunk_texts)
-                
-                # Add to collection
-                collection.add(
-                    ids=chunk_ids,
-                    embeddings=embeddings,
-                    documents=chunk_texts,
-                    metadatas=chunk_metadatas
-                )
-                
-                total_chunks += len(chunks)
-                total_documents += 1
-                
-            except Exception as e:
-                print(f"   ✗ Error processing {filename}: {str(e)}")
-                continue
+        old_ids = set(previous_files.get(key, {}).get("chunk_ids", []))
+        plans[key] = {
+            "records": records,
+            "new": [record for record in records if record["id"] not in old_ids],
+            "kept": [record for record in records if record["id"] in old_ids],
+            "stale_ids": list(old_ids - {record["id"] for record in records})
+        }
+    
+    # Embed new chunks from all files together in token-budgeted batches
+    pending = [(key, record) for key, plan in plans.items() for record in plan["new"]]
+    embed_start = time.perf_counter()
+    vectors, failed_ids = embed_records_concurrently(embeddings_model, [record for _, record in pending])
+    embed_elapsed = time.perf_counter() - embed_start
+    
+    # Files with any failed chunk keep their previous state and are retried next run
+    failed_keys = {key for key, record in pending if record["id"] in failed_ids}
+    for key in failed_keys:
+        print(f"   ✗ Error embedding {key}, will retry on next run")
+        if key in previous_files:
+            new_manifest_files[key] = previous_files[key]
+    
+    # Bulk collection writes across all files
+    upserts = [record for key, record in pending if key not in failed_keys]
+    updates = [record for key, plan in plans.items() if key not in failed_keys for record in plan["kept"]]
+    deletes = [chunk_id for key, plan in plans.items() if key not in failed_keys for chunk_id in plan["stale_ids"]]
+    
+    max_batch = chroma_client.get_max_batch_size()
+    for offset in range(0, len(upserts), max_batch):
+        batch = upserts[offset:offset + max_batch]
+        collection.upsert(
+            ids=[record["id"] for record in batch],
+            embeddings=[vectors[record["id"]] for record in batch],
+            documents=[record["text"] for record in batch],
+            metadatas=[record["metadata"] for record in batch]
+        )
+    # Unchanged chunks may have moved; refresh position metadata only
+    for offset in range(0, len(updates), max_batch):
+        batch = updates[offset:offset + max_batch]
+        collection.update(
+            ids=[record["id"] for record in batch],
+            metadatas=[record["metadata"] for record in batch]
+        )
+    for offset in range(0, len(deletes), max_batch):
+        collection.delete(ids=deletes[offset:offset + max_batch])
+    
+    embedded_chunks = len(upserts)
+    updated_chunks = len(updates)
+    deleted_chunks += len(deletes)
+    
+    for key, plan in plans.items():
+        if key in failed_keys:
+            continue
+        new_manifest_files[key] = {
+            "file_hash": current_files[key]["file_hash"],
+            "chunk_ids": [record["id"] for record in plan["records"]]
+        }
+        print(f"   ✓ {key}: {len(plan['records'])} chunks ({len(plan['new'])} embedded, {len(plan['stale_ids'])} removed)")
+    
+    save_manifest({
+        "settings": get_ingest_settings(),
+        "updated_at": datetime.now().isoformat(),
+        "files": new_manifest_files
+    })
+    
+    total_chunks = sum(len(entry["chunk_ids"]) for entry in new_manifest_files.values())
     
     print("\n" + "="*70)
     print("✅ Data Ingestion Complete!")
     print("="*70)
     print(f"📊 Statistics:")
-    print(f"   - Total documents processed: {total_documents}")
-    print(f"   - Total chunks created: {total_chunks}")
-    print(f"   - Average chunks per document: {total_chunks / total_documents:.1f}")
+    print(f"   - Total documents: {len(new_manifest_files)}")
+    print(f"   - Total chunks: {total_chunks}")
+    print(f"   - Chunks embedded: {embedded_chunks}")
+    if embedded_chunks:
+        print(f"   - Embedding throughput: {embedded_chunks / embed_elapsed:.1f} chunks/s")
+    print(f"   - Chunks with metadata updates: {updated_chunks}")
+    print(f"   - Chunks deleted: {deleted_chunks}")
     print(f"   - ChromaDB collection: {COLLECTION_NAME}")
     print(f"   - Persist directory: {CHROMA_PERSIST_DIR}")
     
+    # Export embedding matrices for the in-process NumPy retrieval engine
+    index_counts = export_vector_index(collection, VECTOR_INDEX_DIR)
+    print(f"   - NumPy vector index: {sum(index_counts.values())} chunks in {VECTOR_INDEX_DIR}")
+    
+    # Publish new corpus version (invalidates shared caches in the backend)
+    corpus_version = write_corpus_version()
+    print(f"   - Corpus version: {corpus_version}")
+    
     # Verify data
     print(f"\n🔍 Verifying data in ChromaDB...")
     collection_count = collection.count()
@@ -225,12 +511,17 @@ def ingest_documents():
     else:
         print(f"   ⚠️  No results found for test query")
     
-    print("\n✨ Ingestion pipeline completed successfully!\n")
+    elapsed = time.perf_counter() - start_time
+    print(f"\n✨ Ingestion pipeline completed successfully in {elapsed:.1f}s!\n")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest documents into ChromaDB")
+    parser.add_argument("--full", action="store_true", help="Delete the collection and re-embed every document")
+    args = parser.parse_args()
+    
     try:
-        ingest_documents()
+        ingest_documents(full_rebuild=args.full)
     except KeyboardInterrupt:
         print("\n\n⚠️  Ingestion interrupted by user")
     except Exception as e:
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Load test for the /chat SSE endpoint
+Drives the backend with many concurrent SSE clients, each holding a
+multi-turn conversation drawn from a replayable billing/technical/policy
+query mix, and reports time to first token, total latency, output tokens per
+second and error rates (p50/p95/p99, overall and per agent).
+
+Run it against a backend wired to mock_providers.py to measure the backend
+itself without provider costs or rate limits.
+
+Usage:
+    python load_test.py --concurrency 50 --conversations 200
+    python load_test.py --concurrency 500 --conversations 2000 --turns 3 --output report.json
+    python load_test.py --save-mix mix.json ...      # record the generated query mix
+    python load_test.py --mix-file mix.json ...      # replay it
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+from utils.token_utils import count_tokens
+
+QUERY_MIX = {
+    "billing": [
+        "What are your pricing plans?",
+        "How much does the Premium plan cost per month?",
+        "Do you offer an annual discount?",
+        "How do I update my payment method?",
+        "Can I get a refund for last month's invoice?",
+        "What happens if my payment fails?",
+        "How do I upgrade from Basic to Enterprise?",
+        "Why was I charged twice this month?",
+    ],
+    "technical": [
+        "I can't log in to my account",
+        "The dashboard is loading very slowly",
+        "The API returns a 401 error with my key",
+        "How do I reset two-factor authentication?",
+        "The mobile app crashes when I open reports",
+        "Webhooks stopped firing after the update",
+        "Export to CSV times out on large projects",
+        "How do I rotate my API keys?",
+    ],
+    "policy": [
+        "What is your privacy policy?",
+        "How long do you retain my personal data?",
+        "Can I delete my data under GDPR?",
+        "Do you use tracking cookies?",
+        "What does the acceptable use policy prohibit?",
+        "Where is my data stored?",
+        "Can you terminate my account without notice?",
+        "Do you share data with third parties?",
+    ],
+}
+
+DEFAULT_WEIGHTS = {"billing": 0.4, "technical": 0.4, "policy": 0.2}
+
+
+def build_mix(conversations: int, turns: int, weights: Dict[str, float], seed: int) -> List[List[Dict]]:
+    """
+    Generate a reproducible list of conversations.
+
+    Args:
+        conversations: Number of conversations
+        turns: Messages per conversation
+        weights: Share of each domain
+        seed: Random seed (same seed, same mix)
+
+    Returns:
+        Conversations, each a list of {"domain", "message"} turns
+    """
+    rng = random.Random(seed)
+    domains = list(weights)
+    mix = []
+    for _ in range(conversations):
+        conversation = []
+        for _ in range(turns):
+            domain = rng.choices(domains, weights=[weights[d] for d in domains])[0]
+            conversation.append({"domain": domain, "message": rng.choice(QUERY_MIX[domain])})
+        mix.append(conversation)
+    return mix
+
+
+async def send_turn(client: httpx.AsyncClient, message: str, session_id: Optional[str], timeout: float) -> Dict:
+    """
+    Send one chat message and time its SSE stream.
+
+    Returns:
+        Result with status, agent, session_id, ttft, latency and output tokens
+    """
+    payload = {"message": message}
+    if session_id:
+        payload["session_id"] = session_id
+
+    result = {"status": "ok", "agent": None, "session_id": session_id, "ttft": None, "latency": None, "tokens": 0}
+    text_parts = []
+    start = time.perf_counter()
+    try:
+        async with client.stream("POST", "/chat", json=payload, timeout=timeout) as response:
+            if response.status_code != 200:
+                result["status"] = f"http_{response.status_code}"
+                await response.aread()
+                return result
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event["type"] == "start":
+                    result["session_id"] = event.get("session_id")
+                elif event["type"] == "agent":
+                    result["agent"] = event.get("agent_type")
+                elif event["type"] == "token":
+                    if result["ttft"] is None:
+                        result["ttft"] = time.perf_counter() - start
+                    text_parts.append(event.get("content", ""))
+                elif event["type"] == "complete":
+                    result["agent"] = event.get("agent_type") or result["agent"]
+                elif event["type"] == "error":
+                    result["status"] = "sse_error"
+
+        if result["ttft"] is None and result["status"] == "ok":
+            result["status"] = "no_tokens"
+
+    except httpx.TimeoutException:
+        result["status"] = "timeout"
+    except httpx.HTTPError:
+        result["status"] = "connection_error"
+
+    result["latency"] = time.perf_counter() - start
+    result["tokens"] = count_tokens("".join(text_parts)) if text_parts else 0
+    return result
+
+
+async def run_load(
+    url: str,
+    mix: List[List[Dict]],
+    concurrency: int,
+    think_time: float,
+    ramp_up: float,
+    timeout: float
+) -> tuple:
+    """
+    Run every conversation of the mix with `concurrency` simultaneous clients.
+
+    Returns:
+        Tuple of (turn results, wall-clock seconds)
+    """
+    conversations: asyncio.Queue = asyncio.Queue()
+    for conversation in mix:
+        conversations.put_nowait(conversation)
+    results = []
+
+    async def virtual_user(index: int, client: httpx.AsyncClient) -> None:
+        # Spread client start times over the ramp-up period
+        await asyncio.sleep(ramp_up * index / max(concurrency, 1))
+        while not conversations.empty():
+            conversation = conversations.get_nowait()
+            session_id = None
+            for turn in conversation:
+                result = await send_turn(client, turn["message"], session_id, timeout)
+                result["domain"] = turn["domain"]
+                results.append(result)
+                session_id = result["session_id"]
+                if think_time:
+                    await asyncio.sleep(random.uniform(0, 2 * think_time))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[virtual_user(i, client) for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def summarize(results: List[Dict], elapsed: Optional[float] = None) -> Dict:
+    """Latency percentiles, throughput and error rates of a set of turn results."""
+    ok = [r for r in results if r["status"] == "ok"]
+    ttfts = [r["ttft"] for r in ok]
+    latencies = [r["latency"] for r in ok]
+    token_rates = [r["tokens"] / (r["latency"] - r["ttft"]) for r in ok if r["latency"] > r["ttft"] and r["tokens"]]
+    statuses = Counter(r["status"] for r in results)
+
+    summary = {
+        "requests": len(results),
+        "succeeded": len(ok),
+        "error_rate": 1 - len(ok) / len(results) if results else 0.0,
+        "errors": {status: count for status, count in statuses.items() if status != "ok"},
+        "ttft_ms": {f"p{p}": _ms(percentile(ttfts, p)) for p in (50, 95, 99)},
+        "latency_ms": {f"p{p}": _ms(percentile(latencies, p)) for p in (50, 95, 99)},
+        "tokens_per_second_per_stream": {f"p{p}": _round(percentile(token_rates, p)) for p in (50, 95, 99)},
+    }
+    if elapsed:
+        summary["requests_per_second"] = round(len(ok) / elapsed, 2)
+        summary["output_tokens_per_second"] = round(sum(r["tokens"] for r in ok) / elapsed, 1)
+    return summary
+
+
+def build_report(results: List[Dict], elapsed: float, args: argparse.Namespace) -> Dict:
+    routed = [r for r in results if r["agent"]]
+    return {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "conversations": args.conversations,
+        "turns": args.turns,
+        "seed": args.seed,
+        "elapsed_seconds": round(elapsed, 2),
+        "overall": summarize(results, elapsed),
+        "by_agent": {
+            agent: summarize([r for r in results if r["agent"] == agent])
+            for agent in sorted({r["agent"] for r in routed})
+        },
+        "routing_accuracy": (
+            sum(r["agent"] == r["domain"] for r in routed) / len(routed) if routed else None
+        )
+    }
+
+
+def print_report(report: Dict) -> None:
+    overall = report["overall"]
+    print("\n" + "="*70)
+    print(f"📊 Load test: {report['concurrency']} concurrent clients, "
+          f"{overall['requests']} requests in {report['elapsed_seconds']}s")
+    print("="*70)
+    print(f"   Throughput: {overall['requests_per_second']} req/s, {overall['output_tokens_per_second']} output tokens/s")
+    print(f"   Errors: {overall['error_rate']:.2%} {overall['errors'] or ''}")
+    if report["routing_accuracy"] is not None:
+        print(f"   Routing accuracy vs. query domain: {report['routing_accuracy']:.1%}")
+
+    print(f"\n   {'':<12}{'TTFT p50/p95/p99 (ms)':<28}{'Total p50/p95/p99 (ms)':<28}{'tok/s p50':>10}")
+    rows = [("overall", overall)] + list(report["by_agent"].items())
+    for name, summary in rows:
+        ttft = "/".join(str(summary["ttft_ms"][p]) for p in ("p50", "p95", "p99"))
+        latency = "/".join(str(summary["latency_ms"][p]) for p in ("p50", "p95", "p99"))
+        print(f"   {name:<12}{ttft:<28}{latency:<28}{str(summary['tokens_per_second_per_stream']['p50']):>10}")
+
+
+def parse_weights(text: str) -> Dict[str, float]:
+    weights = {}
+    for part in text.split(","):
+        domain, _, weight = part.partition("=")
+        if domain not in QUERY_MIX:
+            raise argparse.ArgumentTypeError(f"unknown domain: {domain}")
+        weights[domain] = float(weight)
+    return weights
+
+
+def _ms(seconds: Optional[float]) -> Optional[int]:
+    return round(seconds * 1000) if seconds is not None else None
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Backend base URL")
+    parser.add_argument("--concurrency", type=int, default=50, help="Simultaneous SSE clients")
+    parser.add_argument("--conversations", type=int, default=200, help="Conversations to run")
+    parser.add_argument("--turns", type=int, default=2, help="Messages per conversation")
+    parser.add_argument("--weights", type=parse_weights, default=DEFAULT_WEIGHTS,
+                        help="Domain mix, e.g. billing=0.4,technical=0.4,policy=0.2")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the generated query mix")
+    parser.add_argument("--mix-file", help="Replay the conversations stored in this file")
+    parser.add_argument("--save-mix", help="Write the generated conversations to this file")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between turns (seconds)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which clients start")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.mix_file:
+        with open(args.mix_file) as f:
+            mix = json.load(f)
+        args.conversations = len(mix)
+        args.turns = max(len(conversation) for conversation in mix)
+    else:
+        mix = build_mix(args.conversations, args.turns, args.weights, args.seed)
+    if args.save_mix:
+        with open(args.save_mix, "w") as f:
+            json.dump(mix, f, indent=2)
+        print(f"💾 Saved query mix to {args.save_mix}")
+
+    print(f"🚀 Sending {sum(len(c) for c in mix)} messages in {len(mix)} conversations "
+          f"with {args.concurrency} concurrent clients to {args.url}")
+    results, elapsed = asyncio.run(run_load(args.url, mix, args.concurrency, args.think_time, args.ramp_up, args.timeout))
+
+    report = build_report(results, elapsed, args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.output}")
+
+    return 0 if report["overall"]["succeeded"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
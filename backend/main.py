@@ -13,12 +13,31 @@ from datetime import datetime
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.background import BackgroundTask
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 
 from models.schemas import ChatRequest, AgentState, Message
-from agents.orchestrator import create_agent_graph
-from utils.retrieval import verify_chromadb_connection
+from agents.orchestrator import create_agent_graph, get_routing_stats
+from utils.retrieval import (
+    verify_chromadb_connection, get_embedding_cache, warm_billing_context, warm_policy_sections,
+    track_embedding_calls, record_turn_embedding_calls, get_embedding_turn_stats
+)
+from utils.response_cache import get_response_cache
+from utils.speculative_retrieval import discard_speculative_retrieval, get_speculation_stats
+from utils.session_store import create_session_store
+from utils.async_utils import run_blocking
+from utils.query_classifier import get_query_classifier, ROUTER_CONFIDENCE_THRESHOLD
+from utils.admission import get_admission_controller, AdmissionRejected
+from utils.rate_limiter import get_rate_limit_stats
+from utils.hedging import get_hedging_stats
+from utils.llm_config import (
+    get_orchestrator_router, start_orchestrator_health_checks, stop_orchestrator_health_checks
+)
+from utils.metrics import (
+    start_request_metrics, render_metrics, current_agent,
+    FIRST_TOKEN_SECONDS, REQUEST_SECONDS, REQUESTS, CANCELLED
+)
 
 # Load environment variables
 load_dotenv()
@@ -42,9 +61,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory session store
-# Format: {session_id: AgentState}
-SESSION_STORE: Dict[str, AgentState] = {}
+# Session store selected by SESSION_BACKEND (memory | sqlite | redis)
+# Shared backends let any worker or host continue a conversation
+SESSION_STORE = create_session_store()
 
 # Global LangGraph instance
 agent_graph = None
@@ -75,6 +94,25 @@ async def startup_event():
     except Exception as e:
         print(f"⚠️  ChromaDB connection warning: {str(e)}")
     
+    # Precompute shared general billing context (Hybrid RAG/CAG)
+    try:
+        await run_blocking(warm_billing_context)
+    except Exception as e:
+        print(f"⚠️  Billing context warm-up warning: {str(e)}")
+    
+    # Split and index policy documents by section (Pure CAG)
+    try:
+        await run_blocking(warm_policy_sections)
+    except Exception as e:
+        print(f"⚠️  Policy section warm-up warning: {str(e)}")
+    
+    # Build local fast-path router from the document corpora
+    try:
+        get_query_classifier()
+        print(f"✅ Local query router ready (confidence threshold {ROUTER_CONFIDENCE_THRESHOLD})")
+    except Exception as e:
+        print(f"⚠️  Local query router unavailable: {str(e)}")
+    
     # Initialize LangGraph
     global agent_graph
     try:
@@ -84,6 +122,17 @@ async def startup_event():
         print(f"❌ Failed to initialize LangGraph: {str(e)}")
         raise
     
+    # Construct routing LLM clients and probe them in the background
+    try:
+        start_orchestrator_health_checks()
+        print("✅ Routing LLM health checks started (Bedrock preferred, OpenAI fallback)")
+    except Exception as e:
+        print(f"⚠️  Routing LLM health checks unavailable: {str(e)}")
+    
+    # Start idle session sweeper
+    SESSION_STORE.start_sweeper()
+    print(f"✅ Session store ready ({type(SESSION_STORE).__name__}, ttl={SESSION_STORE.ttl_seconds:.0f}s)")
+    
     print("="*60)
     print("✅ Backend is ready to accept requests")
     print("   API Docs: http://localhost:8000/docs")
@@ -91,20 +140,47 @@ async def startup_event():
     print("="*60 + "\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks."""
+    await SESSION_STORE.stop_sweeper()
+    await stop_orchestrator_health_checks()
+
+
 @app.get("/health")
 async def health_check():
     """
     Health check endpoint to verify server is running.
     """
+    store_stats = await run_blocking(SESSION_STORE.stats)
+    
     return {
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
         "service": "Advanced Customer Service AI",
         "agents": ["billing", "technical", "policy"],
-        "sessions_active": len(SESSION_STORE)
+        "sessions_active": store_stats["sessions"],
+        "session_store": store_stats,
+        "routing": get_routing_stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "embedding_calls": get_embedding_turn_stats(),
+        "response_cache": get_response_cache().stats(),
+        "speculative_retrieval": get_speculation_stats(),
+        "admission": get_admission_controller().stats(),
+        "rate_limits": get_rate_limit_stats(),
+        "orchestrator": get_orchestrator_router().stats(),
+        "hedging": get_hedging_stats()
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Latency histograms and request counters in the Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def get_or_create_session(session_id: Optional[str] = None) -> tuple[str, AgentState]:
     """
     Retrieve existing session or create a new one.
@@ -115,8 +191,10 @@ def get_or_create_session(session_id: Optional[str] = None) -> tuple[str, AgentS
     Returns:
         Tuple of (session_id, agent_state)
     """
-    if session_id and session_id in SESSION_STORE:
-        return session_id, SESSION_STORE[session_id]
+    if session_id:
+        existing_state = SESSION_STORE.get(session_id)
+        if existing_state is not None:
+            return session_id, existing_state
     
     # Create new session
     new_session_id = session_id or str(uuid.uuid4())
@@ -125,35 +203,18 @@ def get_or_create_session(session_id: Optional[str] = None) -> tuple[str, AgentS
         messages=[],
         metadata={"created_at": datetime.now().isoformat()}
     )
-    SESSION_STORE[new_session_id] = new_state
+    SESSION_STORE.put(new_session_id, new_state)
     
     print(f"📝 Created new session: {new_session_id}")
     return new_session_id, new_state
 
 
-async def stream_response_tokens(text: str, delay: float = 0.02) -> AsyncIterator[str]:
-    """
-    Stream text token-by-token to simulate real-time generation.
-    
-    Args:
-        text: Complete text to stream
-        delay: Delay between tokens in seconds
-        
-    Yields:
-        Individual words/tokens
-    """
-    # Split into words for more natural streaming
-    words = text.split()
-    
-    for i, word in enumerate(words):
-        # Add space before word (except first word)
-        if i > 0:
-            yield " " + word
-        else:
-            yield word
-        
-        # Small delay to simulate streaming
-        await asyncio.sleep(delay)
+# Graph nodes whose LLM deltas are forwarded to the client as SSE tokens
+# (the orchestrator's routing LLM output is never streamed)
+STREAMING_AGENT_NODES = {"billing_agent", "technical_agent", "policy_agent"}
+
+# Seconds between client disconnect checks during a stream
+DISCONNECT_CHECK_INTERVAL = 0.25
 
 
 async def generate_sse_stream(
@@ -164,6 +225,12 @@ async def generate_sse_stream(
     """
     Generate Server-Sent Events stream for chat response.
     
+    Response tokens are forwarded as soon as the agent's LLM produces them
+    (LangGraph "messages" stream mode), rather than replayed after the full
+    answer has been generated. Answers served from the response cache use the
+    same event sequence (start, agent, token, complete). Cancelling the
+    stream (client disconnect) cancels the graph run with it.
+    
     Args:
         session_id: Session identifier
         state: Current agent state
@@ -172,11 +239,27 @@ async def generate_sse_stream(
     Yields:
         SSE-formatted event strings
     """
+    request_start = time.perf_counter()
+    
+    # Count embedding calls of this turn (the query is embedded at most once)
+    embedding_calls = track_embedding_calls()
+    
+    # Stage metrics of this turn are labelled with the routed agent
+    start_request_metrics()
+    first_token_sent = False
+    cache_hit = False
+    status = "error"
+    agent_type = None
+    streamed_tokens = 0
+    streaming_run_id = None
+    graph_events = None
+    
     try:
         # Add user message to state
         user_msg = Message(role="user", content=user_message)
         state.messages.append(user_msg)
         state.current_message = user_message
+        state.query_embedding = None
         
         # Send initial event with metadata
         initial_event = {
@@ -186,63 +269,95 @@ async def generate_sse_stream(
         }
         yield f"data: {json.dumps(initial_event)}\n\n"
         
-        # Invoke LangGraph with retry logic
-        max_retries = 3
-        retry_delay = 1
+        # Stream the LangGraph run (provider calls retry individually behind the
+        # shared rate limiter, so the graph itself is never re-run)
+        result = None
+        graph_events = agent_graph.astream(
+            state,
+            stream_mode=["updates", "messages", "values"]
+        )
         
-        for attempt in range(max_retries):
-            try:
-                # Invoke the agent graph (returns dict)
-                result = agent_graph.invoke(state)
-                
-                # Extract response and agent type from dict
-                response_text = result.get("response")
-                agent_type = result.get("current_agent")
-                
-                # Update state with result
-                state.response = response_text
-                state.current_agent = agent_type
-                state.cached_billing_info = result.get("cached_billing_info")
-                
-                # Send agent type event
-                agent_event = {
-                    "type": "agent",
-                    "agent_type": agent_type
-                }
-                yield f"data: {json.dumps(agent_event)}\n\n"
-                
-                # Stream response tokens
-                async for token in stream_response_tokens(response_text, delay=0.02):
+        async for mode, chunk in graph_events:
+            if mode == "updates":
+                # Orchestrator decision arrives before any agent tokens
+                routing = chunk.get("orchestrator")
+                if routing and agent_type is None:
+                    agent_type = routing.get("current_agent")
+                    agent_event = {
+                        "type": "agent",
+                        "agent_type": agent_type
+                    }
+                    yield f"data: {json.dumps(agent_event)}\n\n"
+            
+            elif mode == "messages":
+                message_chunk, chunk_metadata = chunk
+                if chunk_metadata.get("langgraph_node") not in STREAMING_AGENT_NODES:
+                    continue
+                content = message_chunk.content
+                if isinstance(content, str) and content:
+                    # Stay with the first LLM run that streamed (a cancelled hedge
+                    # may have produced a token in the same instant)
+                    if streaming_run_id is None:
+                        streaming_run_id = message_chunk.id
+                    elif message_chunk.id != streaming_run_id:
+                        continue
+                    if not first_token_sent:
+                        FIRST_TOKEN_SECONDS.observe(time.perf_counter() - request_start, agent=current_agent())
+                        first_token_sent = True
+                    streamed_tokens += 1
                     token_event = {
                         "type": "token",
-                        "content": token
+                        "content": content
                     }
                     yield f"data: {json.dumps(token_event)}\n\n"
-                
-                # Send completion event
-                complete_event = {
-                    "type": "complete",
-                    "session_id": session_id,
-                    "agent_type": agent_type,
-                    "timestamp": datetime.now().isoformat()
-                }
-                yield f"data: {json.dumps(complete_event)}\n\n"
-                
-                # Update session store
-                SESSION_STORE[session_id] = state
-                
-                # Success - break retry loop
-                break
-                
-            except Exception as e:
-                if "rate_limit" in str(e).lower() and attempt < max_retries - 1:
-                    # Rate limit error - retry with exponential backoff
-                    print(f"⚠️  Rate limit hit, retrying in {retry_delay}s (attempt {attempt + 1}/{max_retries})")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
-                    # Other error or max retries reached
-                    raise
+            
+            elif mode == "values":
+                # Last values chunk is the final graph state (dict)
+                result = chunk
+        
+        # Extract response and agent type from final state
+        response_text = result.get("response")
+        agent_type = result.get("current_agent")
+        
+        # Update state with result
+        state.response = response_text
+        state.current_agent = agent_type
+        state.billing_context_version = result.get("billing_context_version")
+        cache_result = (result.get("metadata") or {}).get("response_cache", {})
+        cache_hit = bool(cache_result.get("hit"))
+        
+        # Cached answers and agent fallback responses are not generated
+        # by the LLM, so send them as a single token
+        if streamed_tokens == 0 and response_text:
+            if not first_token_sent:
+                FIRST_TOKEN_SECONDS.observe(time.perf_counter() - request_start, agent=current_agent())
+                first_token_sent = True
+            token_event = {
+                "type": "token",
+                "content": response_text
+            }
+            yield f"data: {json.dumps(token_event)}\n\n"
+        
+        # Send completion event
+        complete_event = {
+            "type": "complete",
+            "session_id": session_id,
+            "agent_type": agent_type,
+            "cached": cache_hit,
+            "timestamp": datetime.now().isoformat()
+        }
+        yield f"data: {json.dumps(complete_event)}\n\n"
+        
+        # Cache freshly generated answers (fallbacks are never streamed)
+        query_embedding = result.get("query_embedding")
+        if not cache_hit and streamed_tokens > 0 and "version" in cache_result and query_embedding:
+            get_response_cache().put(agent_type, user_message, query_embedding, response_text, cache_result["version"])
+        if get_response_cache().enabled:
+            get_response_cache().record_request(cache_hit, time.perf_counter() - request_start)
+        
+        # Update session store (re-measures the session's size)
+        await run_blocking(SESSION_STORE.put, session_id, state)
+        status = "ok"
         
     except Exception as e:
         # Send error event
@@ -253,14 +368,38 @@ async def generate_sse_stream(
             "timestamp": datetime.now().isoformat()
         }
         yield f"data: {json.dumps(error_event)}\n\n"
+    
+    except (asyncio.CancelledError, GeneratorExit):
+        # Client disconnected: the graph run (node, retrieval, LLM call) was cancelled
+        status = "cancelled"
+        phase = "generation" if streamed_tokens else "retrieval" if agent_type else "routing"
+        CANCELLED.inc(agent=current_agent(), phase=phase)
+        print(f"🛑 Client disconnected during {phase}, request cancelled")
+        raise
+    
+    finally:
+        # Stops any node still running (e.g. after a disconnect)
+        if graph_events is not None:
+            await graph_events.aclose()
+        
+        # Prefetches not claimed by an agent (cache hit, error) are cancelled
+        discard_speculative_retrieval(session_id, user_message)
+        record_turn_embedding_calls(embedding_calls)
+        
+        agent = current_agent()
+        REQUEST_SECONDS.observe(time.perf_counter() - request_start, agent=agent, cached=str(cache_hit).lower())
+        REQUESTS.inc(agent=agent, status=status)
 
 
 @app.post("/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """
     Chat endpoint with Server-Sent Events streaming.
     
     Accepts user message and returns streaming response from appropriate agent.
+    Requests beyond the worker's in-flight limit wait in a bounded queue;
+    when the queue is full or the wait exceeds its deadline the request is
+    rejected with 429 and a Retry-After header.
     
     Args:
         request: ChatRequest with message and optional session_id
@@ -268,27 +407,43 @@ async def chat_endpoint(request: ChatRequest):
     Returns:
         StreamingResponse with SSE events
     """
+    slot = None
     try:
         # Validate input
         if not request.message or not request.message.strip():
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
+        # Wait for an admission slot (held until the stream ends)
+        try:
+            slot = await get_admission_controller().acquire()
+        except AdmissionRejected as e:
+            print(f"⚠️  Chat request rejected ({e.reason}), retry after {e.retry_after}s")
+            raise HTTPException(
+                status_code=429,
+                detail="The service is busy. Please try again shortly.",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        
         # Get or create session
-        session_id, state = get_or_create_session(request.session_id)
+        session_id, state = await run_blocking(get_or_create_session, request.session_id)
         
         print(f"\n💬 New message in session {session_id[:8]}...")
         print(f"   User: {request.message[:100]}{'...' if len(request.message) > 100 else ''}")
         
         # Create SSE stream
-        return StreamingResponse(
-            generate_sse_stream(session_id, state, request.message),
+        response = StreamingResponse(
+            stream_until_disconnect(generate_sse_stream(session_id, state, request.message), http_request, slot),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
                 "X-Accel-Buffering": "no",  # Disable proxy buffering
-            }
+            },
+            # Releases the slot even if the client disconnects before the stream starts
+            background=BackgroundTask(slot.release)
         )
+        slot = None
+        return response
         
     except HTTPException:
         raise
@@ -298,6 +453,82 @@ async def chat_endpoint(request: ChatRequest):
             status_code=500,
             detail="An error occurred processing your request. Please try again."
         )
+    finally:
+        # Not handed to a stream (validation or setup failed)
+        if slot is not None:
+            slot.release()
+
+
+async def stream_until_disconnect(
+    stream: AsyncIterator[str],
+    http_request: Request,
+    slot
+) -> AsyncIterator[str]:
+    """
+    Forward an SSE stream, cancelling it as soon as the client disconnects.
+    
+    The stream is produced by its own task so that a disconnect is noticed
+    while the graph is still routing, retrieving or waiting for the LLM, not
+    only when the next event fails to send. Cancelling that task cancels the
+    running node, its awaited retrieval and the LLM HTTP request (blocking
+    calls already running on the executor finish in the background). The
+    admission slot is released when the stream ends either way.
+    
+    Args:
+        stream: SSE event stream (generate_sse_stream)
+        http_request: Starlette request of the stream
+        slot: Admission slot held by the request
+        
+    Yields:
+        SSE-formatted event strings
+    """
+    # One event at a time: the producer waits until the previous one was sent
+    events: asyncio.Queue = asyncio.Queue(maxsize=1)
+    
+    async def produce() -> None:
+        try:
+            async for event in stream:
+                await events.put(event)
+        finally:
+            await stream.aclose()
+        await events.put(None)  # End of stream
+    
+    producer = asyncio.create_task(produce())
+    last_check = time.monotonic()
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            while True:
+                await asyncio.wait(
+                    {next_event, producer},
+                    timeout=max(0.0, last_check + DISCONNECT_CHECK_INTERVAL - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if producer.done() and not producer.cancelled() and producer.exception():
+                    # Stream raised before its end: surface the error
+                    next_event.cancel()
+                    raise producer.exception()
+                
+                # Checked at most every interval, whether or not events are flowing
+                if time.monotonic() - last_check >= DISCONNECT_CHECK_INTERVAL:
+                    last_check = time.monotonic()
+                    if await http_request.is_disconnected():
+                        next_event.cancel()
+                        return
+                if next_event.done():
+                    break
+            event = next_event.result()
+            if event is None:
+                break
+            yield event
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+        slot.release()
 
 
 @app.get("/sessions/{session_id}")
@@ -311,16 +542,16 @@ async def get_session(session_id: str):
     Returns:
         Session state information
     """
-    if session_id not in SESSION_STORE:
+    state = await run_blocking(SESSION_STORE.get, session_id, touch=False)
+    if state is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    state = SESSION_STORE[session_id]
-    
     return {
         "session_id": session_id,
         "message_count": len(state.messages),
         "current_agent": state.current_agent,
-        "has_cached_billing": state.cached_billing_info is not None,
+        "has_cached_billing": state.billing_context_version is not None,
+        "billing_context_version": state.billing_context_version,
         "metadata": state.metadata
     }
 
@@ -336,8 +567,7 @@ async def delete_session(session_id: str):
     Returns:
         Success message
     """
-    if session_id in SESSION_STORE:
-        del SESSION_STORE[session_id]
+    if await run_blocking(SESSION_STORE.delete, session_id):
         return {"message": "Session deleted successfully"}
     else:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -353,6 +583,7 @@ async def root():
         "endpoints": {
             "chat": "/chat (POST)",
             "health": "/health (GET)",
+            "metrics": "/metrics (GET)",
             "sessions": "/sessions/{session_id} (GET)",
             "docs": "/docs (GET)"
         },
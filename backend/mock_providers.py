@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI and Bedrock server for load testing
+Emulates the OpenAI chat completions (streaming and non-streaming) and
+embeddings endpoints and the Bedrock runtime InvokeModel (plain and
+streaming) and Converse endpoints, with configurable latency and error distributions, so the backend
+can be load tested without provider costs or rate limits.
+
+Latencies are log-normal around the configured medians. Errors are injected
+at random with the configured rates, in each provider's wire format (429 with
+retry-after-ms / x-amzn-ErrorType: ThrottlingException, and 500).
+
+Usage:
+    python mock_providers.py --port 8100 --ttft-ms 300 --token-ms 20 --error-rate-429 0.01
+
+    # Point the backend at it
+    OPENAI_BASE_URL=http://localhost:8100/v1 \\
+    AWS_ENDPOINT_URL_BEDROCK_RUNTIME=http://localhost:8100 \\
+    AWS_ACCESS_KEY_ID=mock AWS_SECRET_ACCESS_KEY=mock \\
+    uvicorn main:app --port 8000
+"""
+
+import sys
+import json
+import time
+import uuid
+import zlib
+import base64
+import random
+import struct
+import asyncio
+import hashlib
+import argparse
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from utils.query_classifier import get_query_classifier
+
+# Default behaviour (overridden by command-line options)
+MOCK_CONFIG = {
+    "ttft_ms": 300.0,           # chat: median time to first token
+    "token_ms": 20.0,           # chat: median time between streamed tokens
+    "embedding_ms": 50.0,       # embeddings: median latency
+    "bedrock_ms": 250.0,        # Bedrock: median latency
+    "latency_sigma": 0.4,       # log-normal spread of every latency
+    "response_tokens": 80,      # chat: answer length (capped by max_tokens)
+    "embedding_dimensions": 1536,
+    "error_rate_429": 0.0,
+    "error_rate_500": 0.0,
+    "retry_after_ms": 500
+}
+
+ANSWER_WORDS = (
+    "Thanks for reaching out. Based on our documentation, the plan includes priority "
+    "support, monthly invoices and secure access. Please check your account settings "
+    "or contact support if the issue persists after clearing the cache."
+).split()
+
+MOCK_STATS = {"chat": 0, "chat_stream": 0, "embeddings": 0, "bedrock": 0, "errors_429": 0, "errors_500": 0}
+
+app = FastAPI(title="Mock OpenAI / Bedrock provider")
+
+
+def sample_latency(median_ms: float) -> float:
+    """Log-normal latency in seconds around a median."""
+    if median_ms <= 0:
+        return 0.0
+    return random.lognormvariate(0.0, MOCK_CONFIG["latency_sigma"]) * median_ms / 1000
+
+
+def injected_error(provider: str) -> Optional[JSONResponse]:
+    """Randomly fail a request in the provider's error format."""
+    roll = random.random()
+    if roll < MOCK_CONFIG["error_rate_429"]:
+        MOCK_STATS["errors_429"] += 1
+        if provider == "bedrock":
+            return JSONResponse(
+                {"message": "Too many requests, please wait before trying again."},
+                status_code=429,
+                headers={"x-amzn-ErrorType": "ThrottlingException"}
+            )
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after-ms": str(MOCK_CONFIG["retry_after_ms"])}
+        )
+    if roll < MOCK_CONFIG["error_rate_429"] + MOCK_CONFIG["error_rate_500"]:
+        MOCK_STATS["errors_500"] += 1
+        if provider == "bedrock":
+            return JSONResponse(
+                {"message": "Internal server error (mock)"},
+                status_code=500,
+                headers={"x-amzn-ErrorType": "InternalServerException"}
+            )
+        return JSONResponse(
+            {"error": {"message": "The server had an error (mock)", "type": "server_error", "code": None}},
+            status_code=500
+        )
+    return None
+
+
+def message_text(content: Any) -> str:
+    """Plain text of a chat message content (string or content blocks)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return ""
+
+
+def generate_answer(prompt: str, max_tokens: Optional[int]) -> List[str]:
+    """
+    Answer a prompt: routing prompts get an agent name, others filler text.
+
+    Returns:
+        Answer split into streamable pieces (one word each)
+    """
+    if "Category:" in prompt and "User message:" in prompt:
+        message = prompt.split("User message:", 1)[1].rsplit("Category:", 1)[0]
+        label, _ = get_query_classifier().classify(message)
+        return [label or "technical"]
+
+    count = MOCK_CONFIG["response_tokens"]
+    if max_tokens:
+        count = min(count, max_tokens)
+    return [(" " if i else "") + ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(count)]
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    """Deterministic unit vector for a text (equal texts get equal vectors)."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(MOCK_CONFIG["embedding_dimensions"]).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def usage(prompt: str, completion_tokens: int) -> Dict:
+    prompt_tokens = len(prompt) // 4 + 1
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """OpenAI chat completions (streaming and non-streaming)."""
+    body = await request.json()
+    prompt = "\n".join(message_text(message.get("content")) for message in body.get("messages", []))
+    max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+    model = body.get("model", "mock")
+
+    await asyncio.sleep(sample_latency(MOCK_CONFIG["ttft_ms"]))
+    error = injected_error("openai")
+    if error is not None:
+        return error
+
+    pieces = generate_answer(prompt, max_tokens)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        MOCK_STATS["chat"] += 1
+        await asyncio.sleep(sum(sample_latency(MOCK_CONFIG["token_ms"]) for _ in pieces[1:]))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(pieces)},
+                "finish_reason": "stop"
+            }],
+            "usage": usage(prompt, len(pieces))
+        }
+
+    MOCK_STATS["chat_stream"] += 1
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    async def stream():
+        def chunk(delta: Dict, finish_reason: Optional[str] = None) -> str:
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }) + "\n\n"
+
+        yield chunk({"role": "assistant", "content": ""})
+        for i, piece in enumerate(pieces):
+            if i:
+                await asyncio.sleep(sample_latency(MOCK_CONFIG["token_ms"]))
+            yield chunk({"content": piece})
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [],
+                "usage": usage(prompt, len(pieces))
+            }) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    """OpenAI embeddings (text or token-id inputs, float or base64 encoding)."""
+    body = await request.json()
+    inputs = body.get("input", [])
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+
+    await asyncio.sleep(sample_latency(MOCK_CONFIG["embedding_ms"]))
+    error = injected_error("openai")
+    if error is not None:
+        return error
+
+    MOCK_STATS["embeddings"] += 1
+    data = []
+    for index, item in enumerate(inputs):
+        vector = fake_embedding(item if isinstance(item, str) else json.dumps(item))
+        if body.get("encoding_format") == "base64":
+            embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode()
+        else:
+            embedding = vector.tolist()
+        data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "mock"),
+        "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+    }
+
+
+@app.post("/model/{model_id:path}/invoke")
+async def bedrock_invoke(model_id: str, request: Request):
+    """Bedrock InvokeModel with an Anthropic messages body."""
+    body = await request.json()
+    prompt = "\n".join(message_text(message.get("content")) for message in body.get("messages", []))
+
+    await asyncio.sleep(sample_latency(MOCK_CONFIG["bedrock_ms"]))
+    error = injected_error("bedrock")
+    if error is not None:
+        return error
+
+    MOCK_STATS["bedrock"] += 1
+    text = "".join(generate_answer(prompt, body.get("max_tokens")))
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": model_id,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": len(prompt) // 4 + 1, "output_tokens": len(text) // 4 + 1}
+    }
+
+
+def event_stream_message(payload: Dict) -> bytes:
+    """Encode a Bedrock response-stream chunk as an AWS event stream message."""
+    body = json.dumps({"bytes": base64.b64encode(json.dumps(payload).encode()).decode()}).encode()
+    headers = b""
+    for name, value in ((":event-type", "chunk"), (":content-type", "application/json"), (":message-type", "event")):
+        headers += bytes([len(name)]) + name.encode() + b"\x07" + struct.pack(">H", len(value)) + value.encode()
+    prelude = struct.pack(">II", 16 + len(headers) + len(body), len(headers))
+    message = prelude + struct.pack(">I", zlib.crc32(prelude)) + headers + body
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+@app.post("/model/{model_id:path}/invoke-with-response-stream")
+async def bedrock_invoke_stream(model_id: str, request: Request):
+    """Bedrock InvokeModelWithResponseStream with an Anthropic messages body."""
+    body = await request.json()
+    prompt = "\n".join(message_text(message.get("content")) for message in body.get("messages", []))
+
+    await asyncio.sleep(sample_latency(MOCK_CONFIG["bedrock_ms"]))
+    error = injected_error("bedrock")
+    if error is not None:
+        return error
+
+    MOCK_STATS["bedrock"] += 1
+    pieces = generate_answer(prompt, body.get("max_tokens"))
+    input_tokens = len(prompt) // 4 + 1
+
+    async def stream():
+        yield event_stream_message({
+            "type": "message_start",
+            "message": {
+                "id": f"msg_{uuid.uuid4().hex[:24]}",
+                "type": "message",
+                "role": "assistant",
+                "model": model_id,
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": 1}
+            }
+        })
+        yield event_stream_message({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        for i, piece in enumerate(pieces):
+            if i:
+                await asyncio.sleep(sample_latency(MOCK_CONFIG["token_ms"]))
+            yield event_stream_message({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}})
+        yield event_stream_message({"type": "content_block_stop", "index": 0})
+        yield event_stream_message({
+            "type": "message_delta",
+            "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": len(pieces)}
+        })
+        yield event_stream_message({
+            "type": "message_stop",
+            "amazon-bedrock-invocationMetrics": {
+                "inputTokenCount": input_tokens,
+                "outputTokenCount": len(pieces),
+                "invocationLatency": 0,
+                "firstByteLatency": 0
+            }
+        })
+
+    return StreamingResponse(stream(), media_type="application/vnd.amazon.eventstream")
+
+
+@app.post("/model/{model_id:path}/converse")
+async def bedrock_converse(model_id: str, request: Request):
+    """Bedrock Converse API."""
+    body = await request.json()
+    prompt = "\n".join(
+        message_text(message.get("content")) for message in body.get("messages", [])
+    )
+    max_tokens = (body.get("inferenceConfig") or {}).get("maxTokens")
+
+    await asyncio.sleep(sample_latency(MOCK_CONFIG["bedrock_ms"]))
+    error = injected_error("bedrock")
+    if error is not None:
+        return error
+
+    MOCK_STATS["bedrock"] += 1
+    text = "".join(generate_answer(prompt, max_tokens))
+    return {
+        "output": {"message": {"role": "assistant", "content": [{"text": text}]}},
+        "stopReason": "end_turn",
+        "usage": {"inputTokens": len(prompt) // 4 + 1, "outputTokens": len(text) // 4 + 1, "totalTokens": 0},
+        "metrics": {"latencyMs": 0}
+    }
+
+
+@app.get("/stats")
+async def stats():
+    """Requests served and errors injected so far."""
+    return {"config": MOCK_CONFIG, **MOCK_STATS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft-ms", type=float, default=MOCK_CONFIG["ttft_ms"], help="Median chat time to first token")
+    parser.add_argument("--token-ms", type=float, default=MOCK_CONFIG["token_ms"], help="Median time between streamed tokens")
+    parser.add_argument("--embedding-ms", type=float, default=MOCK_CONFIG["embedding_ms"], help="Median embedding latency")
+    parser.add_argument("--bedrock-ms", type=float, default=MOCK_CONFIG["bedrock_ms"], help="Median Bedrock latency")
+    parser.add_argument("--latency-sigma", type=float, default=MOCK_CONFIG["latency_sigma"], help="Log-normal spread (0 = fixed)")
+    parser.add_argument("--response-tokens", type=int, default=MOCK_CONFIG["response_tokens"], help="Answer length in tokens")
+    parser.add_argument("--embedding-dimensions", type=int, default=MOCK_CONFIG["embedding_dimensions"])
+    parser.add_argument("--error-rate-429", type=float, default=MOCK_CONFIG["error_rate_429"], help="Share of requests throttled")
+    parser.add_argument("--error-rate-500", type=float, default=MOCK_CONFIG["error_rate_500"], help="Share of requests failing with 500")
+    parser.add_argument("--retry-after-ms", type=int, default=MOCK_CONFIG["retry_after_ms"], help="retry-after-ms sent with OpenAI 429s")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latencies and errors")
+    args = parser.parse_args()
+
+    for key in MOCK_CONFIG:
+        MOCK_CONFIG[key] = getattr(args, key)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    print(f"🧪 Mock OpenAI/Bedrock server on http://{args.host}:{args.port}")
+    print(f"   OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    print(f"   AWS_ENDPOINT_URL_BEDROCK_RUNTIME=http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -54,10 +54,19 @@ class AgentState(BaseModel):
     # Session context
     session_id: str = Field(..., description="Unique session identifier")
     
-    # Billing agent cache (Hybrid RAG/CAG)
-    cached_billing_info: Optional[str] = Field(
+    # Billing agent cache (Hybrid RAG/CAG) - the general billing context is
+    # shared across sessions; each session only records the version it uses
+    billing_context_version: Optional[str] = Field(
         None, 
-        description="Cached billing information for Hybrid RAG/CAG strategy"
+        description="Version of the shared general billing context (Hybrid RAG/CAG strategy)"
+    )
+    
+    # Embedding of current_message, computed once per turn and shared by
+    # every stage (cache lookup, retrieval); never persisted with the session
+    query_embedding: Optional[List[float]] = Field(
+        None,
+        exclude=True,
+        description="Query embedding of the current message"
     )
     
     # Additional context
@@ -0,0 +1,67 @@
+"""
+Admission control test
+Verifies the in-flight limit, FIFO queueing, fast rejection beyond the queue
+and the queue deadline, without the API or any providers.
+"""
+
+import asyncio
+
+from utils.admission import AdmissionController, AdmissionRejected
+
+
+async def hold(controller: AdmissionController, seconds: float, results: list, name: str) -> None:
+    """Acquire a slot, keep it for a while and record the outcome."""
+    try:
+        slot = await controller.acquire()
+    except AdmissionRejected as e:
+        results.append((name, e.reason, e.retry_after))
+        return
+    results.append((name, "admitted", None))
+    await asyncio.sleep(seconds)
+    slot.release()
+
+
+async def run_burst() -> tuple:
+    controller = AdmissionController(max_inflight=2, max_queued=2, queue_timeout=1.0)
+    results = []
+    await asyncio.gather(*[hold(controller, 0.05, results, f"r{i}") for i in range(6)])
+    return controller, results
+
+
+async def run_deadline() -> tuple:
+    controller = AdmissionController(max_inflight=1, max_queued=4, queue_timeout=0.05)
+    results = []
+    await asyncio.gather(*[hold(controller, 0.2, results, f"r{i}") for i in range(3)])
+    return controller, results
+
+
+def test_admission_control():
+    """In-flight limit, FIFO queue, queue_full and queue_timeout rejections."""
+    print("\n" + "="*70)
+    print("🧪 Testing Admission Control")
+    print("="*70)
+
+    controller, results = asyncio.run(run_burst())
+    outcomes = {name: outcome for name, outcome, _ in results}
+    print(f"   Burst of 6 (2 in flight, 2 queued): {outcomes}")
+
+    assert [outcomes[f"r{i}"] for i in range(6)] == ["admitted"] * 4 + ["queue_full"] * 2
+    # Queued requests are admitted in arrival order
+    assert [name for name, outcome, _ in results if outcome == "admitted"] == ["r0", "r1", "r2", "r3"]
+    assert all(retry_after >= 1 for _, outcome, retry_after in results if outcome != "admitted")
+    stats = controller.stats()
+    assert stats["inflight"] == 0 and stats["queue_depth"] == 0
+    assert stats["queued"] == 2 and stats["rejected_queue_full"] == 2
+
+    controller, results = asyncio.run(run_deadline())
+    outcomes = {name: outcome for name, outcome, _ in results}
+    print(f"   Queue deadline shorter than service time: {outcomes}")
+
+    assert outcomes == {"r0": "admitted", "r1": "queue_timeout", "r2": "queue_timeout"}
+    assert controller.stats()["inflight"] == 0
+
+    print("\n✅ Admission control works")
+
+
+if __name__ == "__main__":
+    test_admission_control()
@@ -74,7 +74,7 @@ def test_agent_system():
             # Check results (LangGraph returns dict)
             actual_agent = result.get("current_agent")
             response = result.get("response")
-            cached_info = result.get("cached_billing_info")
+            context_version = result.get("billing_context_version")
             
             print(f"\n📊 Results:")
             print(f"   Routed to: {actual_agent.upper() if actual_agent else 'UNKNOWN'} agent")
@@ -85,8 +85,8 @@ def test_agent_system():
                 print(f"   {response[:200]}...")
             
             # Check if cache was updated (for billing)
-            if actual_agent == "billing" and cached_info:
-                print(f"\n   💾 Billing cache initialized: {len(cached_info)} chars")
+            if actual_agent == "billing" and context_version:
+                print(f"\n   💾 Billing cache referenced: version {context_version}")
             
         except Exception as e:
             print(f"\n❌ Test failed with error: {str(e)}")
@@ -113,7 +113,7 @@ def test_agent_system():
             session_id=session_id
         )
         result1 = graph.invoke(state1)
-        cache_created = result1.get("cached_billing_info") is not None
+        cache_created = result1.get("billing_context_version") is not None
         print(f"   Cache created: {'✅ YES' if cache_created else '❌ NO'}")
         
         # Second query with cache
@@ -123,10 +123,10 @@ def test_agent_system():
                 messages=result1.get("messages", []),
                 current_message="How much does the Enterprise plan cost?",
                 session_id=session_id,
-                cached_billing_info=result1.get("cached_billing_info")
+                billing_context_version=result1.get("billing_context_version")
             )
             result2 = graph.invoke(state2)
-            cache_used = result2.get("cached_billing_info") == result1.get("cached_billing_info")
+            cache_used = result2.get("billing_context_version") == result1.get("billing_context_version")
             print(f"   Cache used (unchanged): {'✅ YES' if cache_used else '❌ NO'}")
             print(f"   Response generated: {'✅ YES' if result2.get('response') else '❌ NO'}")
     
@@ -0,0 +1,171 @@
+"""
+Concurrency test for the async request path
+Verifies that /chat throughput grows with concurrent clients on a single worker
+(provider calls are replaced by local fakes with fixed latency, so no API keys
+or ingested ChromaDB collection are required)
+"""
+
+import os
+import time
+import asyncio
+import itertools
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator, List, Sequence, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import httpx
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+import main
+import utils.llm_config as llm_config
+import utils.retrieval as retrieval
+import utils.response_cache as response_cache
+import agents.orchestrator as orchestrator
+from utils.embedding_cache import EmbeddingCache
+from utils.response_cache import ResponseCache
+
+
+# Simulated provider latency (seconds) for each network/IO stage
+PROVIDER_LATENCY = 0.05
+CONCURRENCY_LEVELS = [1, 4, 16]
+REQUESTS_PER_CLIENT = 2
+
+
+class SlowFakeChatModel(GenericFakeChatModel):
+    """Fake chat model that waits before streaming, like a remote provider."""
+
+    latency: float = PROVIDER_LATENCY
+
+    def _stream(self, *args: Any, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        yield from super()._stream(*args, **kwargs)
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for chunk in super()._stream(*args, **kwargs):
+            yield chunk
+
+
+class SlowFakeEmbeddings:
+    """Fake embeddings client with network-like latency."""
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(PROVIDER_LATENCY)
+        return [0.0] * 8
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(PROVIDER_LATENCY)
+        return [0.0] * 8
+
+
+class BlockingFakeCollection:
+    """Fake ChromaDB collection whose query blocks the calling thread."""
+
+    def query(self, **kwargs: Any) -> dict:
+        time.sleep(PROVIDER_LATENCY)
+        return {
+            "ids": [["technical_login_issues.txt_0"]],
+            "documents": [["Clear the browser cache and retry the login."]],
+            "metadatas": [[{"source_document": "login_issues.txt"}]],
+            "distances": [[0.1]],
+        }
+
+
+# Module globals replaced while fake providers are installed
+PATCHED_GLOBALS = [
+    (llm_config, "response_llm"),
+    (orchestrator, "get_orchestrator_llm"),
+    (retrieval, "get_embeddings"),
+    (retrieval, "get_collection"),
+    (retrieval, "_embedding_cache"),
+    (retrieval, "_billing_general_context"),
+    (response_cache, "_response_cache"),
+    (main, "agent_graph"),
+]
+
+
+@contextmanager
+def restoring_globals(targets: Sequence[Tuple[Any, str]] = PATCHED_GLOBALS):
+    """Restore the given module globals on exit, whatever the test assigned to them."""
+    saved = [(module, name, getattr(module, name)) for module, name in targets]
+    try:
+        yield
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+
+
+@contextmanager
+def fake_providers():
+    """Swap provider clients for local fakes and build the graph (restored on exit)."""
+    with restoring_globals():
+        llm_config.response_llm = SlowFakeChatModel(
+            messages=itertools.cycle([AIMessage(content="1. Clear your cache 2. Reset your password")])
+        )
+        routing_llm = SlowFakeChatModel(messages=itertools.cycle([AIMessage(content="technical")]))
+        orchestrator.get_orchestrator_llm = lambda: routing_llm
+
+        fake_embeddings = SlowFakeEmbeddings()
+        fake_collection = BlockingFakeCollection()
+        retrieval.get_embeddings = lambda: fake_embeddings
+        retrieval.get_collection = lambda: fake_collection
+        # Fake vectors must never reach the on-disk embedding cache
+        retrieval._embedding_cache = EmbeddingCache(path=None)
+        retrieval._billing_general_context = None
+        # Every client sends the same question; measure the full pipeline, not cache hits
+        response_cache._response_cache = ResponseCache(max_entries=0)
+
+        main.agent_graph = orchestrator.create_agent_graph()
+        yield
+
+
+async def run_client(client: httpx.AsyncClient, requests_count: int) -> int:
+    """Send sequential chat requests and return the number that completed."""
+    completed = 0
+    for _ in range(requests_count):
+        response = await client.post("/chat", json={"message": "I can't log in"})
+        if '"type": "complete"' in response.text:
+            completed += 1
+    return completed
+
+
+async def measure_throughput(concurrency: int) -> float:
+    """Return completed requests per second with `concurrency` parallel clients."""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            run_client(client, REQUESTS_PER_CLIENT) for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    completed = sum(results)
+    assert completed == concurrency * REQUESTS_PER_CLIENT, "Some requests did not complete"
+    return completed / elapsed
+
+
+def test_throughput_scales_with_concurrency():
+    """Throughput on one worker should grow with the number of concurrent clients."""
+    print("\n" + "="*70)
+    print("🧪 Testing Async Request Path Concurrency")
+    print("="*70)
+
+    throughput = {}
+    with fake_providers():
+        for concurrency in CONCURRENCY_LEVELS:
+            throughput[concurrency] = asyncio.run(measure_throughput(concurrency))
+            print(f"   {concurrency:>3} clients: {throughput[concurrency]:6.1f} req/s")
+
+    lowest, highest = CONCURRENCY_LEVELS[0], CONCURRENCY_LEVELS[-1]
+    speedup = throughput[highest] / throughput[lowest]
+    print(f"\n📊 Speedup at {highest} clients: {speedup:.1f}x")
+
+    # A blocking event loop would keep throughput flat (speedup ~1x)
+    assert speedup > highest / 4, f"Throughput did not scale with concurrency ({speedup:.1f}x)"
+
+
+if __name__ == "__main__":
+    test_throughput_scales_with_concurrency()
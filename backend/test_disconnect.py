@@ -0,0 +1,128 @@
+"""
+Client disconnect test
+Verifies that closing the SSE connection mid-answer cancels the running LLM
+generation, releases the admission slot and is counted in the metrics.
+Provider calls are replaced by local fakes, so no API keys are required.
+"""
+
+import os
+import json
+import time
+import asyncio
+import itertools
+from typing import Any, AsyncIterator, Iterator, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+import main
+import utils.llm_config as llm_config
+import utils.retrieval as retrieval
+import agents.orchestrator as orchestrator
+from utils.metrics import render_metrics
+from test_concurrency import fake_providers
+
+
+# Disconnect after this many token events
+TOKENS_BEFORE_DISCONNECT = 3
+
+
+class EndlessFakeChatModel(GenericFakeChatModel):
+    """Fake chat model that streams a token every 20 ms for a long time."""
+
+    chunks_generated: int = 0
+    finished: bool = False
+
+    def _stream(self, *args: Any, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        raise NotImplementedError
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for i in range(500):
+            await asyncio.sleep(0.02)
+            self.chunks_generated += 1
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"word{i} "))
+        self.finished = True
+
+
+async def chat_then_disconnect(message: str) -> List[str]:
+    """Call /chat as an ASGI client that disconnects after a few tokens."""
+    body = json.dumps({"message": message}).encode()
+    disconnected = asyncio.Event()
+    request_sent = False
+    events = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] != "http.response.body" or not message.get("body"):
+            return
+        for line in message["body"].decode().splitlines():
+            if line.startswith("data: "):
+                events.append(json.loads(line[6:])["type"])
+        if events.count("token") >= TOKENS_BEFORE_DISCONNECT:
+            disconnected.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/chat",
+        "raw_path": b"/chat",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("test", 80),
+    }
+    await asyncio.wait_for(main.app(scope, receive, send), timeout=10)
+    return events
+
+
+def test_disconnect_cancels_generation():
+    """A client disconnect stops the LLM stream and frees the worker slot."""
+    print("\n" + "="*70)
+    print("🧪 Testing Cancellation on Client Disconnect")
+    print("="*70)
+
+    with fake_providers():
+        # Route to billing even when the local classifier's fast path is disabled
+        routing_llm = GenericFakeChatModel(messages=itertools.cycle([AIMessage(content="billing")]))
+        orchestrator.get_orchestrator_llm = lambda: routing_llm
+        retrieval.warm_billing_context()
+        llm = EndlessFakeChatModel(messages=iter([AIMessage(content="unused")]))
+        llm_config.response_llm = llm
+
+        start = time.perf_counter()
+        events = asyncio.run(chat_then_disconnect("What does the Premium plan cost?"))
+        elapsed = time.perf_counter() - start
+        generated = llm.chunks_generated
+        print(f"   Events before disconnect: {events}")
+        print(f"   Request ended after {elapsed:.2f}s, {generated}/500 chunks generated")
+
+        metrics = render_metrics()
+        cancelled = [line for line in metrics.splitlines() if line.startswith(("chat_cancelled", "llm_generations_cancelled"))]
+        print("   " + "\n   ".join(cancelled))
+
+        assert "complete" not in events
+        assert not llm.finished and generated < 50, "LLM kept generating after the disconnect"
+        assert elapsed < 5
+        assert 'chat_cancelled_requests_total{agent="billing",phase="generation"}' in metrics
+        assert 'llm_generations_cancelled_total{agent="billing"}' in metrics
+        assert main.get_admission_controller().stats()["inflight"] == 0
+
+    print("\n✅ Generation cancelled and slot released on disconnect")
+
+
+if __name__ == "__main__":
+    test_disconnect_cancels_generation()
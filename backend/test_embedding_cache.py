@@ -0,0 +1,111 @@
+"""
+Query embedding cache persistence test
+Verifies that cached query embeddings survive a restart (a new cache on the
+same SQLite file), that keys are normalized per model, that vectors
+evicted from the in-memory LRU are still served from disk, and that the disk
+store is capped at its least recently used entries. Uses fake embeddings, so
+no API keys are required.
+"""
+
+import os
+import tempfile
+from typing import List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import utils.retrieval as retrieval
+from utils.embedding_cache import EmbeddingCache
+
+
+class CountingFakeEmbeddings:
+    """Fake embeddings client with float32-exact vectors."""
+
+    def __init__(self):
+        self.query_calls = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls += 1
+        return [len(text) / 4, 0.5, -0.25]
+
+
+def test_cache_survives_restart():
+    """A query embedded before a restart is not sent to the provider again."""
+    fake_embeddings = CountingFakeEmbeddings()
+    saved = retrieval.get_embeddings, retrieval._embedding_cache
+    retrieval.get_embeddings = lambda: fake_embeddings
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, "embeddings.db")
+
+            retrieval._embedding_cache = EmbeddingCache(max_entries=100, path=path)
+            before = retrieval.embed_query("How do I reset my password?")
+
+            # Restart: a new process starts with an empty in-memory tier
+            retrieval._embedding_cache = EmbeddingCache(max_entries=100, path=path)
+            after = retrieval.embed_query("how do I   reset my password?")
+            stats = retrieval._embedding_cache.stats()
+            print(f"   Provider calls across restart: {fake_embeddings.query_calls}, disk hits after restart: {stats['disk_hits']}")
+
+            assert fake_embeddings.query_calls == 1
+            assert after == before
+            assert stats["disk_hits"] == 1 and stats["misses"] == 0
+    finally:
+        retrieval.get_embeddings, retrieval._embedding_cache = saved
+
+
+def test_keys_and_memory_eviction():
+    """Entries are keyed per model; LRU-evicted vectors are promoted back from disk."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = EmbeddingCache(max_entries=2, path=os.path.join(cache_dir, "embeddings.db"))
+        for i in range(3):
+            cache.put("text-embedding-3-small", f"query {i}", [float(i), 0.5])
+
+        assert cache.get("text-embedding-3-large", "query 0") is None
+        oldest = cache.get("text-embedding-3-small", "QUERY 0")  # evicted from memory
+        newest = cache.get("text-embedding-3-small", "query 2")
+        stats = cache.stats()
+        print(f"   Memory entries {stats['entries']}, memory hits {stats['memory_hits']}, disk hits {stats['disk_hits']}")
+
+        assert oldest == [0.0, 0.5] and newest == [2.0, 0.5]
+        assert stats["entries"] == 2
+        assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1 and stats["misses"] == 1
+
+    # Without a path the cache is memory only
+    cache = EmbeddingCache(max_entries=1)
+    cache.put("text-embedding-3-small", "a", [1.0])
+    cache.put("text-embedding-3-small", "b", [2.0])
+    assert cache.get("text-embedding-3-small", "a") is None
+    assert cache.stats()["persistent"] is False
+
+
+def test_disk_store_is_bounded():
+    """The disk tier keeps at most max_disk_entries rows, dropping the least recently used."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        path = os.path.join(cache_dir, "embeddings.db")
+        cache = EmbeddingCache(max_entries=1, path=path, max_disk_entries=4)
+        for i in range(4):
+            cache.put("text-embedding-3-small", f"query {i}", [float(i)])
+        cache.get("text-embedding-3-small", "query 0")  # disk hit refreshes its access time
+        for i in range(4, 6):
+            cache.put("text-embedding-3-small", f"query {i}", [float(i)])
+
+        rows = cache._connect().execute("SELECT query FROM query_embeddings").fetchall()
+        kept = sorted(int(query.split()[-1]) for query, in rows)
+        print(f"   Disk entries after 6 writes with a cap of 4: {kept}, evicted {cache.stats()['disk_evictions']}")
+        assert kept == [0, 3, 4, 5]
+
+        # A restart with a smaller cap prunes the existing file
+        restarted = EmbeddingCache(max_entries=10, path=path, max_disk_entries=2)
+        kept = [i for i in range(6) if restarted.get("text-embedding-3-small", f"query {i}") is not None]
+        print(f"   Kept after restart with a cap of 2: {kept}")
+        assert kept == [4, 5]
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Query Embedding Cache Persistence")
+    print("="*70)
+    test_cache_survives_restart()
+    test_keys_and_memory_eviction()
+    test_disk_store_is_bounded()
+    print("\n✅ Query embeddings are reused across restarts")
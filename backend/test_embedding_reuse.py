@@ -0,0 +1,231 @@
+"""
+Embedding reuse test
+Verifies that every user turn embeds the query at most once, whichever stages
+run (routing, speculative prefetch, response cache, retrieval), and that
+rebuilding the shared billing context after a re-ingest happens once and is
+not charged to the waiting turns. Also checks that a finished request only
+discards its own speculative prefetch. Provider calls
+are replaced by local fakes, so no API keys or ingested ChromaDB collection
+are required.
+"""
+
+import os
+import asyncio
+from contextlib import contextmanager
+from typing import Any, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import httpx
+from langchain_core.messages import AIMessage
+
+import main
+import utils.llm_config as llm_config
+import utils.retrieval as retrieval
+import utils.response_cache as response_cache
+import utils.speculative_retrieval as speculative_retrieval
+import agents.orchestrator as orchestrator
+from models.schemas import AgentState
+from utils.embedding_cache import EmbeddingCache
+from utils.response_cache import ResponseCache
+from test_concurrency import PATCHED_GLOBALS, SlowFakeChatModel, BlockingFakeCollection, restoring_globals
+
+
+# (message, expected agent); each message is new, so nothing is cached yet
+TURNS = [
+    ("What does the Premium plan cost per month?", "billing"),
+    ("The API returns a 504 timeout on large exports", "technical"),
+    ("How long do you retain my personal data?", "policy"),
+    ("What does the Premium plan cost per month?", "billing"),  # response cache hit
+]
+
+
+class CountingFakeEmbeddings:
+    """Fake embeddings client that counts query embedding calls."""
+
+    def __init__(self):
+        self.query_calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        return [float((hash(text) >> shift) & 0xFF) + 1.0 for shift in range(0, 64, 8)]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls += 1
+        return self._vector(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.query_calls += 1
+        return self._vector(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+
+class KeywordRoutingModel:
+    """Routing LLM stand-in that answers with the agent named in TURNS."""
+
+    async def ainvoke(self, messages: Any) -> AIMessage:
+        prompt = messages[-1].content
+        for message, agent in TURNS:
+            if message in prompt:
+                return AIMessage(content=agent)
+        return AIMessage(content="technical")
+
+    def invoke(self, messages: Any) -> AIMessage:
+        return asyncio.run(self.ainvoke(messages))
+
+
+# Also rebuilt with fake embeddings by the startup warm-up, or set by the tests
+TURN_PATCHED_GLOBALS = PATCHED_GLOBALS + [
+    (retrieval, "_policy_cache"),
+    (retrieval, "_policy_documents"),
+    (retrieval, "_policy_section_index"),
+    (retrieval, "_policy_version"),
+    (retrieval, "_policy_checked_at"),
+    (orchestrator, "ROUTER_CONFIDENCE_THRESHOLD"),
+    (orchestrator, "SPECULATIVE_RETRIEVAL"),
+]
+
+
+@contextmanager
+def fake_turn_providers():
+    """Swap provider clients for local fakes and build the graph (restored on exit)."""
+    with restoring_globals(TURN_PATCHED_GLOBALS):
+        llm_config.response_llm = SlowFakeChatModel(
+            latency=0.0,
+            messages=iter([AIMessage(content=f"Answer {i}") for i in range(100)])
+        )
+        routing_llm = KeywordRoutingModel()
+        orchestrator.get_orchestrator_llm = lambda: routing_llm
+
+        fake_embeddings = CountingFakeEmbeddings()
+        fake_collection = BlockingFakeCollection()
+        fake_collection.query = lambda **kwargs: {
+            "ids": [["billing_pricing_plans.txt_0"]],
+            "documents": [["Premium: $99 per month."]],
+            "metadatas": [[{"source_document": "pricing_plans.txt"}]],
+            "distances": [[0.1]],
+        }
+        retrieval.get_embeddings = lambda: fake_embeddings
+        retrieval.get_collection = lambda: fake_collection
+        # Memory-only: every pass starts with uncached queries and fake
+        # vectors never reach the on-disk cache
+        retrieval._embedding_cache = EmbeddingCache(path=None)
+        retrieval._billing_general_context = None
+        # The repeated last turn is answered from the response cache
+        response_cache._response_cache = ResponseCache(max_entries=100)
+
+        # Startup work, outside any user turn
+        retrieval.warm_billing_context()
+        retrieval.warm_policy_sections()
+
+        main.agent_graph = orchestrator.create_agent_graph()
+        yield fake_embeddings
+
+
+async def run_turns(fake_embeddings: CountingFakeEmbeddings) -> List[int]:
+    """Send every turn and return the provider embedding calls per turn."""
+    calls_per_turn = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for message, _ in TURNS:
+            before = fake_embeddings.query_calls
+            response = await client.post("/chat", json={"message": message})
+            assert '"type": "complete"' in response.text, response.text
+            calls_per_turn.append(fake_embeddings.query_calls - before)
+    return calls_per_turn
+
+
+def check_turns(label: str, speculative: bool) -> None:
+    with fake_turn_providers() as fake_embeddings:
+        # Routing LLM on every turn
+        orchestrator.ROUTER_CONFIDENCE_THRESHOLD = 2.0
+        orchestrator.SPECULATIVE_RETRIEVAL = speculative
+        turns_before = retrieval.EMBEDDING_TURN_STATS["turns"]
+        max_before = retrieval.EMBEDDING_TURN_STATS["max_calls_per_turn"]
+        retrieval.EMBEDDING_TURN_STATS["max_calls_per_turn"] = 0
+
+        provider_calls = asyncio.run(run_turns(fake_embeddings))
+        stats = retrieval.get_embedding_turn_stats()
+        retrieval.EMBEDDING_TURN_STATS["max_calls_per_turn"] = max(max_before, stats["max_calls_per_turn"])
+
+    print(f"   {label}: provider calls per turn {provider_calls}, "
+          f"max embed calls per turn {stats['max_calls_per_turn']}")
+
+    assert stats["turns"] - turns_before == len(TURNS)
+    assert stats["max_calls_per_turn"] <= 1, f"{label}: query embedded more than once in a turn"
+    assert all(calls <= 1 for calls in provider_calls), f"{label}: more than one embedding API call in a turn"
+
+
+def test_query_embedded_at_most_once_per_turn():
+    """Each user turn embeds its query at most once."""
+    print("\n" + "="*70)
+    print("🧪 Testing Query Embedding Reuse")
+    print("="*70)
+
+    # With and without speculative prefetching
+    for speculative in (False, True):
+        check_turns("speculative retrieval" if speculative else "sequential", speculative)
+
+    print("\n✅ Query embedded at most once per turn")
+
+
+def test_billing_context_rebuilt_once_after_reingest():
+    """Concurrent billing turns share one rebuild of the general billing context."""
+    async def billing_turn() -> tuple:
+        counter = retrieval.track_embedding_calls()
+        shared = await retrieval.aget_general_billing_context()
+        return counter["calls"], shared
+
+    async def concurrent_turns() -> List[tuple]:
+        return await asyncio.gather(*[billing_turn() for _ in range(10)])
+
+    with fake_turn_providers() as fake_embeddings:
+        # A fresh memory-only cache, so the warm-up did not already cache the query
+        retrieval._embedding_cache = EmbeddingCache(path=None)
+        retrieval._billing_general_context = None  # as after a re-ingest
+
+        before = fake_embeddings.query_calls
+        turns = asyncio.run(concurrent_turns())
+        provider_calls = fake_embeddings.query_calls - before
+        shared_context = retrieval._billing_general_context
+
+    print(f"   10 concurrent billing turns: {provider_calls} provider embedding call(s), "
+          f"turn embed counts {[calls for calls, _ in turns]}")
+
+    assert provider_calls == 1
+    assert all(calls == 0 for calls, _ in turns)
+    assert all(shared is turns[0][1] for _, shared in turns)
+    assert shared_context is turns[0][1]
+
+
+def test_discard_keeps_concurrent_speculation():
+    """Discarding one request's prefetch leaves a concurrent request of the session alone."""
+    finished = AgentState(session_id="speculation-test", current_message="What does the Premium plan cost per month?")
+    concurrent = AgentState(session_id="speculation-test", current_message="How long do you retain my personal data?")
+
+    async def two_requests() -> tuple:
+        speculative_retrieval.start_speculative_retrieval(finished)
+        speculative_retrieval.start_speculative_retrieval(concurrent)
+        # The first request ends on a response cache hit
+        speculative_retrieval.discard_speculative_retrieval(finished.session_id, finished.current_message)
+        still_pending = (concurrent.session_id, concurrent.current_message) in speculative_retrieval._pending
+        used_before = speculative_retrieval.SPECULATION_STATS["used"]
+        context = await speculative_retrieval.use_prefetched_context(
+            concurrent, "policy", lambda: retrieval.aget_policy_context(query=concurrent.current_message)
+        )
+        return still_pending, speculative_retrieval.SPECULATION_STATS["used"] - used_before, context
+
+    with fake_turn_providers():
+        still_pending, used, context = asyncio.run(two_requests())
+    print(f"   Concurrent prefetch pending after discard: {still_pending}, used: {used == 1}")
+
+    assert still_pending
+    assert used == 1 and context
+    assert (finished.session_id, finished.current_message) not in speculative_retrieval._pending
+
+
+if __name__ == "__main__":
+    test_query_embedded_at_most_once_per_turn()
+    test_billing_context_rebuilt_once_after_reingest()
+    test_discard_keeps_concurrent_speculation()
@@ -0,0 +1,178 @@
+"""
+Hedged LLM request test
+Verifies that a routing or response call that is slower than the recent
+first-token percentile is duplicated on the secondary model, that the first
+answer wins and the slow call is cancelled, that only the winner's tokens
+reach the SSE client, and that the hedging budget bounds the extra calls.
+All models are local fakes, so no API keys are required.
+"""
+
+import os
+import time
+import json
+import asyncio
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import httpx
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import main
+import utils.hedging as hedging
+import utils.llm_config as llm_config
+import utils.retrieval as retrieval
+import agents.orchestrator as orchestrator
+from utils.hedging import HedgePolicy
+from utils.metrics import render_metrics
+from test_concurrency import fake_providers
+
+
+class DelayedModel(GenericFakeChatModel):
+    """Fake chat model that waits before answering (or streaming) its text."""
+
+    messages: Any = iter([])
+    text: str = ""
+    first_token_delay: float = 0.0
+    calls: int = 0
+    cancelled: int = 0
+
+    async def _agenerate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.first_token_delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.text))])
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.first_token_delay)
+            for word in self.text.split():
+                yield ChatGenerationChunk(message=AIMessageChunk(content=f"{word} "))
+                await asyncio.sleep(0.005)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+@contextmanager
+def hedging_enabled(kind: str, **policy_settings):
+    """Turn hedging on with a fresh policy for one kind of call."""
+    settings = dict(percentile=95, min_delay=0.01, min_samples=5, budget_ratio=1.0, budget_burst=1.0)
+    settings.update(policy_settings)
+    policy = HedgePolicy(kind, **settings)
+    previous_enabled, previous_policy = hedging.LLM_HEDGING, hedging._hedge_policies.get(kind)
+    hedging.LLM_HEDGING = True
+    hedging._hedge_policies[kind] = policy
+    try:
+        yield policy
+    finally:
+        hedging.LLM_HEDGING = previous_enabled
+        if previous_policy is None:
+            hedging._hedge_policies.pop(kind, None)
+        else:
+            hedging._hedge_policies[kind] = previous_policy
+
+
+async def invoke_many(primary: DelayedModel, hedge: DelayedModel, count: int) -> List[DelayedModel]:
+    """Make hedged calls one after another and return the model that answered each."""
+    answered_by = []
+    for _ in range(count):
+        _, model = await llm_config.ainvoke_llm_hedged(primary, hedge, [HumanMessage(content="Refund?")])
+        answered_by.append(model)
+    return answered_by
+
+
+def test_slow_call_is_hedged():
+    """A call slower than the recent p95 is answered by the secondary model."""
+    primary = DelayedModel(text="billing", first_token_delay=0.01)
+    hedge = DelayedModel(text="billing", first_token_delay=0.01)
+    with hedging_enabled("routing") as policy:
+        # Warm-up calls set the delay and are never hedged
+        asyncio.run(invoke_many(primary, hedge, 5))
+        assert hedge.calls == 0
+
+        primary.first_token_delay = 2.0
+        start = time.perf_counter()
+        answered_by = asyncio.run(invoke_many(primary, hedge, 1))
+        elapsed = time.perf_counter() - start
+        stats = policy.stats()
+        print(f"   Slow primary: answered by the {'hedge' if answered_by[0] is hedge else 'primary'} in {elapsed * 1000:.0f} ms "
+              f"(hedge delay {stats['hedge_delay_ms']:.0f} ms)")
+
+        assert answered_by == [hedge]
+        assert elapsed < 0.5
+        assert primary.cancelled == 1
+        assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+        assert 'llm_hedges_total{kind="routing",result="won"}' in render_metrics()
+
+
+def test_budget_bounds_hedges():
+    """Hedges stay within budget_ratio of calls (plus the burst)."""
+    primary = DelayedModel(text="billing", first_token_delay=0.01)
+    hedge = DelayedModel(text="billing", first_token_delay=0.3)
+    with hedging_enabled("routing", percentile=50, budget_ratio=0.2) as policy:
+        asyncio.run(invoke_many(primary, hedge, 5))
+        primary.first_token_delay = 0.1
+        answered_by = asyncio.run(invoke_many(primary, hedge, 8))
+        stats = policy.stats()
+        print(f"   {stats['calls']} calls: {stats['hedges']} hedges fired, {stats['over_budget']} skipped over budget, "
+              f"{stats['hedge_wins']} won")
+
+        # The slower hedges lose and are cancelled
+        assert answered_by == [primary] * 8
+        assert hedge.cancelled == hedge.calls
+        assert 1 <= stats["hedges"] <= 1 + 0.2 * 8
+        assert stats["over_budget"] >= 1
+
+
+def test_hedged_stream_reaches_client_once():
+    """Only the winning model's tokens are streamed to the SSE client."""
+    with fake_providers():
+        routing_llm = GenericFakeChatModel(messages=iter([AIMessage(content="billing")] * 10))
+        orchestrator.get_orchestrator_llm = lambda: routing_llm
+        retrieval.warm_billing_context()
+
+        primary = DelayedModel(text="slow primary answer", first_token_delay=2.0)
+        hedge = DelayedModel(text="fast hedged answer", first_token_delay=0.01)
+        llm_config.response_llm = primary
+        previous_hedge_llm, llm_config._response_hedge_llm = llm_config._response_hedge_llm, hedge
+        try:
+            with hedging_enabled("response") as policy:
+                for _ in range(5):
+                    policy.observe(0.05)
+
+                async def chat() -> List[dict]:
+                    transport = httpx.ASGITransport(app=main.app)
+                    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                        response = await client.post("/chat", json={"message": "What does the Premium plan cost?"})
+                    return [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+                start = time.perf_counter()
+                events = asyncio.run(chat())
+                elapsed = time.perf_counter() - start
+                streamed = "".join(event["content"] for event in events if event["type"] == "token")
+                print(f"   Streamed {streamed!r} in {elapsed * 1000:.0f} ms")
+
+                assert streamed == "fast hedged answer "
+                assert primary.cancelled == 1
+                assert elapsed < 1.5
+                assert policy.stats()["hedge_wins"] == 1
+        finally:
+            llm_config._response_hedge_llm = previous_hedge_llm
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Hedged LLM Requests")
+    print("="*70)
+    test_slow_call_is_hedged()
+    test_budget_bounds_hedges()
+    test_hedged_stream_reaches_client_once()
+    print("\n✅ Slow LLM calls are hedged within budget")
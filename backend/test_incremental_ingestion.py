@@ -0,0 +1,137 @@
+"""
+Incremental ingestion test
+Verifies that re-running ingestion embeds nothing for unchanged files, only
+the changed chunks of an edited file, and removes the chunks of a deleted
+file from the collection, manifest and NumPy index. Runs against a temporary
+data directory and ChromaDB with fake embeddings, so no API keys are required.
+"""
+
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import chromadb
+from chromadb.config import Settings
+
+import ingest_data
+
+
+def paragraph(topic: str) -> str:
+    """A paragraph long enough to be its own chunk."""
+    return " ".join(f"{topic} sentence {i} explains the {topic} rules in detail." for i in range(10))
+
+
+DOCUMENTS = {
+    "billing/refunds.txt": "\n\n".join(paragraph(topic) for topic in ["refund", "invoice", "proration"]),
+    "technical/login.txt": "\n\n".join(paragraph(topic) for topic in ["password", "sso"]),
+    "policy/privacy.txt": "\n\n".join(paragraph(topic) for topic in ["retention", "erasure"]),
+}
+
+
+class FakeEmbeddings:
+    """OpenAIEmbeddings stand-in that records every embedded text."""
+
+    embedded: List[str] = []
+
+    def __init__(self, **kwargs: Any):
+        pass
+
+    def _vector(self, text: str) -> List[float]:
+        return [float(len(text) % 97) + 1.0, float(sum(map(ord, text[:50])) % 89) + 1.0, 1.0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        FakeEmbeddings.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+@contextmanager
+def ingestion_sandbox():
+    """Point ingest_data at a temporary corpus and ChromaDB directory."""
+    names = ["DATA_DIR", "CHROMA_PERSIST_DIR", "CORPUS_VERSION_FILE", "MANIFEST_FILE", "VECTOR_INDEX_DIR", "OpenAIEmbeddings"]
+    saved = {name: getattr(ingest_data, name) for name in names}
+    with tempfile.TemporaryDirectory() as root:
+        data_dir, chroma_dir = Path(root) / "data", Path(root) / "chroma_db"
+        for relative_path, content in DOCUMENTS.items():
+            (data_dir / relative_path).parent.mkdir(parents=True, exist_ok=True)
+            (data_dir / relative_path).write_text(content, encoding="utf-8")
+        chroma_dir.mkdir()
+
+        ingest_data.DATA_DIR = data_dir
+        ingest_data.CHROMA_PERSIST_DIR = str(chroma_dir)
+        ingest_data.CORPUS_VERSION_FILE = chroma_dir / "corpus_version.json"
+        ingest_data.MANIFEST_FILE = chroma_dir / "ingest_manifest.json"
+        ingest_data.VECTOR_INDEX_DIR = chroma_dir / "vector_index"
+        ingest_data.OpenAIEmbeddings = FakeEmbeddings
+        try:
+            yield data_dir, chroma_dir
+        finally:
+            for name, value in saved.items():
+                setattr(ingest_data, name, value)
+
+
+def run_ingestion() -> List[str]:
+    """Run one ingestion pass and return the texts it embedded."""
+    FakeEmbeddings.embedded = []
+    ingest_data.ingest_documents()
+    return list(FakeEmbeddings.embedded)
+
+
+def stored_chunks(chroma_dir: Path) -> Dict[str, str]:
+    """Chunk id -> source document of everything in the collection."""
+    client = chromadb.PersistentClient(path=str(chroma_dir), settings=Settings(anonymized_telemetry=False))
+    stored = client.get_collection(ingest_data.COLLECTION_NAME).get(include=["metadatas"])
+    return {chunk_id: metadata["source_document"] for chunk_id, metadata in zip(stored["ids"], stored["metadatas"])}
+
+
+def test_incremental_ingestion():
+    """Unchanged files are skipped, edited files re-embed changed chunks, deleted files are removed."""
+    with ingestion_sandbox() as (data_dir, chroma_dir):
+        first = run_ingestion()
+        chunks = stored_chunks(chroma_dir)
+        print(f"   Initial run: {len(first)} chunks embedded, {len(chunks)} stored")
+        assert len(first) == len(chunks) == 7
+
+        unchanged = run_ingestion()
+        print(f"   Unchanged corpus: {len(unchanged)} chunks embedded")
+        assert unchanged == []
+
+        # Edit one paragraph of the billing file and delete the policy file
+        refunds = data_dir / "billing" / "refunds.txt"
+        refunds.write_text(refunds.read_text(encoding="utf-8").replace(paragraph("invoice"), paragraph("dunning")), encoding="utf-8")
+        (data_dir / "policy" / "privacy.txt").unlink()
+        version_before = json.loads(ingest_data.CORPUS_VERSION_FILE.read_text())["version"]
+
+        edited = run_ingestion()
+        chunks = stored_chunks(chroma_dir)
+        manifest = json.loads(ingest_data.MANIFEST_FILE.read_text())
+        sources = sorted(set(chunks.values()))
+        print(f"   After edit + delete: {len(edited)} chunk(s) embedded, {len(chunks)} stored from {sources}")
+
+        assert edited == [paragraph("dunning")]
+        assert len(chunks) == 5
+        assert sources == ["login.txt", "refunds.txt"]
+        assert sorted(manifest["files"]) == ["billing/refunds.txt", "technical/login.txt"]
+        assert sorted(manifest["files"]["billing/refunds.txt"]["chunk_ids"]) == sorted(
+            chunk_id for chunk_id, source in chunks.items() if source == "refunds.txt"
+        )
+        assert json.loads(ingest_data.CORPUS_VERSION_FILE.read_text())["version"] != version_before
+
+        # The exported NumPy index no longer contains the deleted file
+        policy_chunks = json.loads((ingest_data.VECTOR_INDEX_DIR / "policy_chunks.json").read_text())
+        assert not policy_chunks["ids"]
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Incremental Ingestion")
+    print("="*70)
+    test_incremental_ingestion()
+    print("\n✅ Only new and changed chunks are embedded; deleted files are removed")
@@ -0,0 +1,53 @@
+"""
+Prometheus exposition test
+Verifies that /metrics output types every sample family: counters are
+announced (HELP/TYPE) under their exported _total name, histograms and
+gauges under their own name. No API keys are required.
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import utils.metrics as metrics
+from utils.metrics import Counter, Gauge, Histogram, render_metrics
+
+
+def test_type_lines_name_sample_families():
+    """Every sample line belongs to a family declared by a TYPE line."""
+    # The test metrics are removed again so they never reach a real /metrics scrape
+    saved_registry = list(metrics._registry)
+    try:
+        Counter("test_exposition_events", "Test counter", ["kind"]).inc(kind="a")
+        Gauge("test_exposition_depth", "Test gauge").set(3)
+        Histogram("test_exposition_seconds", "Test histogram").observe(0.2)
+
+        lines = render_metrics().splitlines()
+    finally:
+        metrics._registry[:] = saved_registry
+    types = {line.split()[2]: line.split()[3] for line in lines if line.startswith("# TYPE ")}
+    print(f"   {len(types)} metric families: test counter typed as {types.get('test_exposition_events_total')}")
+
+    assert types["test_exposition_events_total"] == "counter"
+    assert "test_exposition_events" not in types
+    assert types["test_exposition_depth"] == "gauge"
+    assert types["test_exposition_seconds"] == "histogram"
+
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        sample = line.split("{")[0].split()[0]
+        family = next((name for name in types if sample == name or (
+            types[name] == "histogram" and sample in (f"{name}_bucket", f"{name}_sum", f"{name}_count")
+        )), None)
+        assert family is not None, f"Sample {sample} has no TYPE line"
+
+    assert "test_exposition" not in render_metrics()
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Prometheus Exposition")
+    print("="*70)
+    test_type_lines_name_sample_families()
+    print("\n✅ Every sample family is typed")
@@ -0,0 +1,189 @@
+"""
+Routing LLM failover test
+Verifies that the orchestrator picks its routing LLM without blocking on a
+probe, moves traffic to OpenAI while Bedrock fails or is much slower, retries
+a failed routing call on the other provider and returns to Bedrock once the
+background health checks see it recover.
+Both providers are local fakes, so no API keys are required.
+"""
+
+import os
+import time
+import asyncio
+import itertools
+from typing import Any, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatResult
+
+import agents.orchestrator as orchestrator
+import utils.llm_config as llm_config
+import utils.routing_cache as routing_cache
+from models.schemas import AgentState
+from utils.provider_health import ProviderRouter
+from utils.routing_cache import RoutingCache
+
+
+class FlakyRoutingModel(GenericFakeChatModel):
+    """Fake routing LLM that answers "billing" after a delay, or fails."""
+
+    model_name: str = "fake"
+    latency: float = 0.0
+    failing: bool = False
+    calls: int = 0
+
+    def _generate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.failing:
+            raise ConnectionError(f"{self.model_name} unavailable")
+        return super()._generate(*args, **kwargs)
+
+
+def make_router(bedrock_latency: float, openai_latency: float, probe_interval: float = 30.0,
+                idle_probe_interval: float = 900.0) -> ProviderRouter:
+    clients = {
+        name: FlakyRoutingModel(messages=itertools.cycle([AIMessage(content="billing")]), model_name=name, latency=latency)
+        for name, latency in [("bedrock", bedrock_latency), ("openai", openai_latency)]
+    }
+    return ProviderRouter(
+        clients,
+        preference=["bedrock", "openai"],
+        default="openai",
+        probe=llm_config._probe_llm,
+        probe_interval=probe_interval,
+        probe_timeout=0.1,
+        idle_probe_interval=idle_probe_interval
+    )
+
+
+def route(messages: List[str]) -> List[str]:
+    """Route each message with a fresh state and return the selected agents."""
+    agents = []
+    for message in messages:
+        state = AgentState(session_id="failover-test", current_message=message)
+        agents.append(orchestrator.route_query(state).current_agent)
+    return agents
+
+
+def test_selection_never_blocks():
+    """Selection uses OpenAI until probes confirm Bedrock, and never calls a provider itself."""
+    router = make_router(bedrock_latency=0.05, openai_latency=0.04)
+    bedrock, openai = router.clients["bedrock"], router.clients["openai"]
+
+    start = time.perf_counter()
+    selected = router.select()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"   Before any probe: {selected} selected in {elapsed_ms:.3f} ms")
+    assert selected == "openai"
+    assert bedrock.calls == 0 and openai.calls == 0
+
+    asyncio.run(router.probe_due())
+    print(f"   After probing: {router.select()} selected")
+    assert router.select() == "bedrock"
+
+    # A hung provider fails its probe on timeout and stays out of rotation
+    router = make_router(bedrock_latency=0.3, openai_latency=0.0)
+    asyncio.run(router.probe_due())
+    print(f"   Bedrock probe timing out: bedrock is {router.health['bedrock'].state}, {router.select()} selected")
+    assert router.health["bedrock"].state == "down"
+    assert router.select() == "openai"
+
+
+def test_healthy_providers_not_probed_while_idle():
+    """Only providers that are not up are probed until the idle probe interval has passed."""
+    router = make_router(bedrock_latency=0.0, openai_latency=0.0)
+    asyncio.run(router.probe_due())
+    router.clients["bedrock"].failing = True
+    for _ in range(3):
+        router.record(router.clients["bedrock"], 0.0, ConnectionError("bedrock unavailable"))
+
+    asyncio.run(router.probe_due())
+    probes = {name: health.probes for name, health in router.health.items()}
+    print(f"   Second round with bedrock down: probes {probes}")
+    assert router.health["bedrock"].state == "down"
+    assert probes == {"bedrock": 2, "openai": 1}
+
+    # Past the idle interval a healthy provider is probed again to refresh its latency
+    router.idle_probe_interval = 0.0
+    asyncio.run(router.probe_due())
+    assert router.health["openai"].probes == 2
+
+
+def test_slow_preferred_provider_loses_traffic():
+    """Bedrock is skipped while it is ORCHESTRATOR_LATENCY_RATIO times slower than OpenAI."""
+    router = make_router(bedrock_latency=0.01, openai_latency=0.01)
+    asyncio.run(router.probe_due())
+    assert router.select() == "bedrock"
+
+    bedrock = router.clients["bedrock"]
+    for _ in range(10):
+        router.record(bedrock, 0.2)
+    latency_ms = router.health["bedrock"].latency_ewma * 1000
+    print(f"   Bedrock averaging {latency_ms:.0f} ms: {router.select()} selected")
+    assert router.select() == "openai"
+
+    # Regains traffic once its calls (or probes) are fast again
+    for _ in range(30):
+        router.record(bedrock, 0.01)
+    assert router.select() == "bedrock"
+
+
+def test_failover_and_recovery():
+    """Routing survives a Bedrock outage and returns to Bedrock when it recovers."""
+    router = make_router(bedrock_latency=0.0, openai_latency=0.0, probe_interval=0.05)
+    bedrock, openai = router.clients["bedrock"], router.clients["openai"]
+
+    previous_router, previous_get_llm = llm_config._orchestrator_router, orchestrator.get_orchestrator_llm
+    threshold, cache = orchestrator.ROUTER_CONFIDENCE_THRESHOLD, routing_cache._routing_cache
+    llm_config._orchestrator_router = router
+    orchestrator.get_orchestrator_llm = llm_config.get_orchestrator_llm
+    # Every message goes to the routing LLM
+    orchestrator.ROUTER_CONFIDENCE_THRESHOLD = 2.0
+    routing_cache._routing_cache = RoutingCache(max_entries=0)
+    try:
+        asyncio.run(router.probe_due())
+        assert router.select() == "bedrock"
+
+        bedrock.failing = True
+        agents = route(["Refund?", "Invoice?", "Upgrade?", "Downgrade?"])
+        print(f"   Bedrock down: routed to {agents}; bedrock calls {bedrock.calls}, openai calls {openai.calls}")
+        assert agents == ["billing"] * 4
+        assert router.health["bedrock"].state == "down"
+        assert router.select() == "openai"
+        # Three failed calls (each retried on OpenAI) mark Bedrock down; the fourth skips it
+        assert bedrock.calls == 1 + 3
+
+        bedrock.failing = False
+
+        async def run_health_checks():
+            llm_config.start_orchestrator_health_checks()
+            await asyncio.sleep(0.2)
+            await llm_config.stop_orchestrator_health_checks()
+
+        asyncio.run(run_health_checks())
+        calls_before = bedrock.calls
+        agents = route(["Refund?"])
+        print(f"   Bedrock recovered: {router.select()} selected, {router.switches} provider switches")
+        assert agents == ["billing"]
+        assert router.select() == "bedrock"
+        assert bedrock.calls > calls_before
+    finally:
+        llm_config._orchestrator_router = previous_router
+        orchestrator.get_orchestrator_llm = previous_get_llm
+        orchestrator.ROUTER_CONFIDENCE_THRESHOLD = threshold
+        routing_cache._routing_cache = cache
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Routing LLM Failover")
+    print("="*70)
+    test_selection_never_blocks()
+    test_healthy_providers_not_probed_while_idle()
+    test_slow_preferred_provider_loses_traffic()
+    test_failover_and_recovery()
+    print("\n✅ Routing LLM provider is selected per request and fails over")
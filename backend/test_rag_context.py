@@ -0,0 +1,100 @@
+"""
+RAG context assembly test
+Verifies that retrieved chunks are de-duplicated, that adjacent chunks of a
+document are merged without their overlap, and that the formatted context
+stays within its token budget. Uses hand-written chunks, so no API keys or
+ChromaDB are required.
+"""
+
+from typing import Dict, Optional
+
+from utils.rag_context import NO_RESULTS_MESSAGE, build_rag_context, merge_chunks, merge_overlapping_text
+from utils.token_utils import count_tokens
+
+
+def chunk(chunk_id: Optional[str], source: str, index: Optional[int], content: str, content_hash: Optional[str] = None) -> Dict:
+    """Retrieved chunk in the shape returned by query_rag."""
+    metadata = {"source_document": source}
+    if index is not None:
+        metadata["chunk_index"] = index
+    if content_hash is not None:
+        metadata["content_hash"] = content_hash
+    return {"id": chunk_id, "content": content, "metadata": metadata}
+
+
+OVERLAP = "Refunds are issued to the original payment method"
+FIRST = "Annual plans can be refunded within 30 days. " + OVERLAP
+SECOND = OVERLAP + " within 5-10 business days."
+
+
+def test_overlapping_chunks_are_merged():
+    """Consecutive chunks of one source become one block without the repeated span."""
+    assert merge_overlapping_text(FIRST, SECOND) == FIRST + " within 5-10 business days."
+    assert merge_overlapping_text(FIRST, OVERLAP) == FIRST  # contained
+    assert merge_overlapping_text("Plans renew monthly", ". Cancel anytime.") == "Plans renew monthly. Cancel anytime."
+    assert merge_overlapping_text("Plans renew monthly.", "Cancel anytime.") == "Plans renew monthly.\n\nCancel anytime."
+
+    # Retrieved out of order, with an unrelated chunk in between
+    blocks = merge_chunks([
+        chunk("refund_1", "refund_policy.txt", 1, SECOND),
+        chunk("pricing_0", "pricing.txt", 0, "Premium costs $99 per month."),
+        chunk("refund_0", "refund_policy.txt", 0, FIRST),
+        chunk("refund_5", "refund_policy.txt", 5, "Enterprise refunds follow the contract."),
+    ])
+    print(f"   {len(blocks)} blocks: {[(block['source'], len(block['keys'])) for block in blocks]}")
+
+    assert [block["source"] for block in blocks] == ["refund_policy.txt", "pricing.txt", "refund_policy.txt"]
+    assert blocks[0]["content"] == FIRST + " within 5-10 business days."
+    assert blocks[0]["content"].count(OVERLAP) == 1
+    assert len(blocks[0]["keys"]) == 2
+
+
+def test_duplicates_are_dropped():
+    """The same chunk retrieved twice (by id or content hash) appears once."""
+    results = [
+        chunk("pricing_0", "pricing.txt", 0, "Premium costs $99 per month."),
+        chunk("pricing_0", "pricing.txt", 0, "Premium costs $99 per month."),
+        chunk(None, "faq.txt", None, "Basic is free.", content_hash="abc"),
+        chunk(None, "faq.txt", None, "Basic is free.", content_hash="abc"),
+    ]
+    context = build_rag_context(results)
+    print(f"   4 results -> {context.count('[Source')} sources")
+
+    assert context.count("Premium costs $99 per month.") == 1
+    assert context.count("Basic is free.") == 1
+    assert "[Source 1: pricing.txt]" in context and "[Source 2: faq.txt]" in context
+    assert build_rag_context([]) == NO_RESULTS_MESSAGE
+
+
+def test_token_budget():
+    """Blocks that do not fit are skipped for smaller ones; the top block is truncated, not dropped."""
+    long_text = " ".join(f"Clause {i}: usage is billed per seat each month." for i in range(60))
+    results = [
+        chunk("terms_0", "terms.txt", 0, "Invoices are due within 30 days."),
+        chunk("terms_9", "terms.txt", 9, long_text),
+        chunk("pricing_0", "pricing.txt", 0, "Premium costs $99 per month."),
+    ]
+    unlimited = build_rag_context(results)
+    budget = count_tokens(unlimited) // 2
+    context = build_rag_context(results, max_tokens=budget)
+    print(f"   Unlimited context {count_tokens(unlimited)} tokens; with a {budget} token budget: {count_tokens(context)}")
+
+    assert count_tokens(context) <= budget
+    assert "Invoices are due" in context and "Premium costs $99" in context
+    assert "Clause 0" not in context
+
+    # A most relevant block larger than the whole budget is cut to fit
+    truncated = build_rag_context([chunk("terms_9", "terms.txt", 9, long_text)], max_tokens=100)
+    print(f"   Oversized top block truncated to {count_tokens(truncated)} tokens")
+    assert truncated.startswith("[Source 1: terms.txt]\nClause 0")
+    assert count_tokens(truncated) <= 100
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing RAG Context Assembly")
+    print("="*70)
+    test_overlapping_chunks_are_merged()
+    test_duplicates_are_dropped()
+    test_token_budget()
+    print("\n✅ RAG context is de-duplicated, merged and within budget")
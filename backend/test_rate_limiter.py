@@ -0,0 +1,177 @@
+"""
+Provider rate limiter test
+Verifies that the shared token buckets pace provider calls and that a
+throttled call is retried on its own (honouring retry-after) instead of the
+whole graph being re-run. Provider clients are local fakes, so no API keys
+are required.
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, AsyncIterator, Iterator
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import httpx
+import openai
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+import ingest_data
+import utils.rate_limiter as rate_limiter
+from utils.llm_config import astream_llm_response, stream_llm_response
+from utils.rate_limiter import ProviderLimiter, TokenBucket
+
+
+def rate_limit_error(retry_after_ms: int) -> openai.RateLimitError:
+    """Build the error the OpenAI client raises on HTTP 429."""
+    response = httpx.Response(
+        429,
+        headers={"retry-after-ms": str(retry_after_ms)},
+        request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    )
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+class ThrottledFakeChatModel(GenericFakeChatModel):
+    """Fake chat model that is throttled a number of times before streaming."""
+
+    failures: int = 1
+    failures_after_first_chunk: int = 0
+    empty_first_chunk: bool = False
+    attempts: int = 0
+
+    def _stream(self, *args: Any, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.attempts += 1
+        if self.empty_first_chunk:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=""))
+        if self.attempts <= self.failures:
+            raise rate_limit_error(50)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="Plans "))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="start at $29."))
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.attempts += 1
+        if self.empty_first_chunk:
+            # Like OpenAI's leading role delta
+            yield ChatGenerationChunk(message=AIMessageChunk(content=""))
+        if self.attempts <= self.failures:
+            raise rate_limit_error(50)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="Plans "))
+        if self.failures_after_first_chunk:
+            raise rate_limit_error(50)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="start at $29."))
+
+
+def test_token_bucket_paces_calls():
+    """Reservations beyond the burst wait for the refill rate."""
+    bucket = TokenBucket(per_minute=600, burst_seconds=1)  # 10/s, burst of 10
+    waits = [bucket.reserve(1) for _ in range(15)]
+    print(f"   Waits for 15 requests at 10/s (burst 10): {[round(w, 2) for w in waits]}")
+
+    assert all(wait == 0 for wait in waits[:10])
+    assert 0.45 <= waits[-1] <= 0.55
+
+
+def test_throttled_call_is_retried_individually():
+    """A 429 before the first streamed token retries just that call."""
+    rate_limiter.RETRY_BASE_SECONDS = 0.01
+    llm = ThrottledFakeChatModel(messages=iter([AIMessage(content="unused")]), failures=2)
+
+    start = time.perf_counter()
+    text = asyncio.run(astream_llm_response(llm, [HumanMessage(content="What do plans cost?")]))
+    elapsed = time.perf_counter() - start
+    print(f"   Response after {llm.attempts} attempts in {elapsed * 1000:.0f} ms: {text!r}")
+
+    assert text == "Plans start at $29."
+    assert llm.attempts == 3
+    assert elapsed >= 0.1  # two retry-after hints of 50 ms
+    assert rate_limiter.get_limiter("openai").throttled >= 2
+
+
+def test_partial_stream_is_not_retried():
+    """Once text has been streamed, a failure is raised instead of retried."""
+    llm = ThrottledFakeChatModel(
+        messages=iter([AIMessage(content="unused")]),
+        failures=0,
+        failures_after_first_chunk=1
+    )
+    try:
+        asyncio.run(astream_llm_response(llm, [HumanMessage(content="What do plans cost?")]))
+        raised = False
+    except openai.RateLimitError:
+        raised = True
+    print(f"   Failure after the first chunk raised: {raised} (attempts: {llm.attempts})")
+
+    assert raised and llm.attempts == 1
+
+
+def test_empty_leading_delta_still_retried():
+    """An empty role delta before a 429 does not count as streamed text."""
+    rate_limiter.RETRY_BASE_SECONDS = 0.01
+    llm = ThrottledFakeChatModel(messages=iter([AIMessage(content="unused")]), failures=1, empty_first_chunk=True)
+    text = asyncio.run(astream_llm_response(llm, [HumanMessage(content="What do plans cost?")]))
+    sync_llm = ThrottledFakeChatModel(messages=iter([AIMessage(content="unused")]), failures=1, empty_first_chunk=True)
+    sync_text = stream_llm_response(sync_llm, [HumanMessage(content="What do plans cost?")])
+    print(f"   After an empty delta and a 429: {llm.attempts} async / {sync_llm.attempts} sync attempts, {text!r}")
+
+    assert text == sync_text == "Plans start at $29."
+    assert llm.attempts == sync_llm.attempts == 2
+
+
+def test_throttling_pauses_every_caller():
+    """A 429 seen by one caller delays the next call of every caller."""
+    limiter = ProviderLimiter("test", requests_per_minute=0, tokens_per_minute=0)
+    limiter.pause(0.2)
+    wait = limiter.reserve(100)
+    print(f"   Wait after a 200 ms pause: {wait * 1000:.0f} ms")
+
+    assert 0.15 <= wait <= 0.2
+
+
+class FailingFakeEmbeddings:
+    """Embeddings client that raises the given errors, then embeds."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[0.0, 1.0] for _ in texts]
+
+
+def test_ingestion_batches_retry_only_retryable_errors():
+    """Ingestion embedding batches retry throttling but fail fast on permanent errors."""
+    rate_limiter.RETRY_BASE_SECONDS = 0.01
+    throttled = FailingFakeEmbeddings([rate_limit_error(20), rate_limit_error(20)])
+    vectors = ingest_data.embed_batch(throttled, ["chunk one", "chunk two"])
+
+    response = httpx.Response(401, request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+    unauthorized = FailingFakeEmbeddings([openai.AuthenticationError("Invalid API key", response=response, body=None)])
+    try:
+        ingest_data.embed_batch(unauthorized, ["chunk one"])
+        raised = False
+    except openai.AuthenticationError:
+        raised = True
+    print(f"   Throttled batch: {throttled.calls} attempts; unauthorized batch: {unauthorized.calls} attempt, raised {raised}")
+
+    assert len(vectors) == 2 and throttled.calls == 3
+    assert raised and unauthorized.calls == 1
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Provider Rate Limiter")
+    print("="*70)
+    test_token_bucket_paces_calls()
+    test_throttled_call_is_retried_individually()
+    test_partial_stream_is_not_retried()
+    test_empty_leading_delta_still_retried()
+    test_throttling_pauses_every_caller()
+    test_ingestion_batches_retry_only_retryable_errors()
+    print("\n✅ Provider calls are paced and retried individually")
@@ -0,0 +1,108 @@
+"""
+Semantic response cache test
+Verifies the cosine similarity threshold, per-agent partitions, invalidation
+when an agent's corpus version changes and LRU eviction, using fixed fake
+embeddings, so no API keys are required.
+"""
+
+import math
+from typing import List
+
+import utils.response_cache as response_cache
+from utils.response_cache import ResponseCache
+
+
+def embedding(angle_degrees: float) -> List[float]:
+    """Fake 3-d query embedding; cosine similarity of two is the cosine of their angle."""
+    angle = math.radians(angle_degrees)
+    return [math.cos(angle), math.sin(angle), 0.0]
+
+
+def test_similarity_threshold():
+    """Only questions at or above the threshold are served from the cache."""
+    cache = ResponseCache(max_entries=10, threshold=0.95)
+    cache.put("billing", "What does Premium cost?", embedding(0), "Premium is $99 per month.", "v1")
+
+    close = cache.get("billing", embedding(15), "v1")    # cos 15° ≈ 0.966
+    far = cache.get("billing", embedding(25), "v1")      # cos 25° ≈ 0.906
+    other_agent = cache.get("technical", embedding(0), "v1")
+    print(f"   Similarity {close['similarity']:.3f}: hit; cos 25°: {'hit' if far else 'miss'}; "
+          f"other agent: {'hit' if other_agent else 'miss'}")
+
+    assert close["response"] == "Premium is $99 per month."
+    assert math.isclose(close["similarity"], math.cos(math.radians(15)), rel_tol=1e-5)
+    assert far is None and other_agent is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    # Re-storing an equivalent question replaces its entry instead of adding one
+    cache.put("billing", "How much is Premium?", embedding(5), "Premium costs $99.", "v1")
+    assert cache.stats()["entries"] == 1
+    assert cache.get("billing", embedding(0), "v1")["response"] == "Premium costs $99."
+
+
+def test_version_invalidation():
+    """A corpus version change drops that agent's entries only."""
+    cache = ResponseCache(max_entries=10, threshold=0.95)
+    cache.put("billing", "Refund window?", embedding(0), "30 days.", "v1")
+    cache.put("policy", "Data retention?", embedding(90), "Two years.", "p1")
+
+    stale = cache.get("billing", embedding(0), "v2")
+    policy = cache.get("policy", embedding(90), "p1")
+    print(f"   After billing re-ingest: billing {'hit' if stale else 'miss'}, policy {'hit' if policy else 'miss'}, "
+          f"{cache.stats()['invalidations']} invalidation(s)")
+
+    assert stale is None
+    assert policy["response"] == "Two years."
+    assert cache.stats()["invalidations"] == 1
+
+    # Answers generated from the new version are cached again
+    cache.put("billing", "Refund window?", embedding(0), "14 days.", "v2")
+    assert cache.get("billing", embedding(0), "v2")["response"] == "14 days."
+
+
+def test_lru_eviction():
+    """A full agent partition evicts its least recently used entry."""
+    cache = ResponseCache(max_entries=3, threshold=0.95)
+    for i, angle in enumerate([0, 40, 80]):
+        cache.put("technical", f"question {i}", embedding(angle), f"answer {i}", "v1")
+
+    cache.get("technical", embedding(0), "v1")  # question 1 is now the least recently used
+    cache.put("technical", "question 3", embedding(120), "answer 3", "v1")
+
+    answers = [cache.get("technical", embedding(angle), "v1") for angle in [0, 40, 80, 120]]
+    print(f"   Cached after eviction: {[a['response'] if a else None for a in answers]}")
+
+    assert [a["response"] if a else None for a in answers] == ["answer 0", None, "answer 2", "answer 3"]
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 3
+
+
+def test_disabled_cache():
+    """RESPONSE_CACHE_SIZE=0 stores and serves nothing."""
+    cache = ResponseCache(max_entries=0)
+    cache.put("billing", "Refund window?", embedding(0), "30 days.", "v1")
+    assert cache.get("billing", embedding(0), "v1") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_opt_in():
+    """The process-wide cache is only enabled with RESPONSE_CACHE=true."""
+    saved = response_cache.RESPONSE_CACHE, response_cache._response_cache
+    try:
+        for flag in (False, True):
+            response_cache.RESPONSE_CACHE = flag
+            response_cache._response_cache = None
+            assert response_cache.get_response_cache().enabled is flag
+    finally:
+        response_cache.RESPONSE_CACHE, response_cache._response_cache = saved
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Semantic Response Cache")
+    print("="*70)
+    test_similarity_threshold()
+    test_version_invalidation()
+    test_lru_eviction()
+    test_disabled_cache()
+    test_opt_in()
+    print("\n✅ Response cache honours its threshold, versions and capacity")
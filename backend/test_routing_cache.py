@@ -0,0 +1,152 @@
+"""
+Routing decision cache test
+Verifies that repeated (textually near-identical) messages are routed from
+the decision cache instead of the routing LLM, and that the cache expires
+entries and keeps decisions apart per routing prompt and model.
+The routing LLM is a local fake, so no API keys are required.
+"""
+
+import os
+import time
+import itertools
+from typing import Any, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatResult
+
+import agents.orchestrator as orchestrator
+import utils.routing_cache as routing_cache
+from models.schemas import AgentState
+from utils.routing_cache import RoutingCache, normalize_routing_text
+
+
+class CountingRoutingModel(GenericFakeChatModel):
+    """Fake routing LLM that always answers "billing" and counts its calls."""
+
+    model_name: str = "fake-router-1"
+    calls: int = 0
+
+    def _generate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+
+def route(messages: List[str]) -> List[str]:
+    """Route each message with a fresh state and return the selected agents."""
+    agents = []
+    for message in messages:
+        state = AgentState(session_id="routing-cache-test", current_message=message)
+        agents.append(orchestrator.route_query(state).current_agent)
+    return agents
+
+
+def install_routing_llm(model_name: str = "fake-router-1") -> CountingRoutingModel:
+    llm = CountingRoutingModel(messages=itertools.cycle([AIMessage(content="billing")]), model_name=model_name)
+    orchestrator.get_orchestrator_llm = lambda: llm
+    return llm
+
+
+def test_normalization():
+    """Case, punctuation, whitespace and plural/tense variants share a key."""
+    variants = [
+        ("I can't log in!", "i cant   log in"),
+        ("Refund?", "refunds"),
+        ("Why was I charged twice?", "why was i charge twice"),
+    ]
+    for first, second in variants:
+        print(f"   {first!r} / {second!r} -> {normalize_routing_text(first)!r}")
+        assert normalize_routing_text(first) == normalize_routing_text(second)
+    assert normalize_routing_text("?!") == ""
+
+
+def test_repeated_messages_skip_routing_llm():
+    """Only the first of several equivalent messages reaches the routing LLM."""
+    routing_cache._routing_cache = RoutingCache(max_entries=100, ttl_seconds=60)
+    # Keep the local classifier out of the way so every message needs the LLM
+    threshold = orchestrator.ROUTER_CONFIDENCE_THRESHOLD
+    orchestrator.ROUTER_CONFIDENCE_THRESHOLD = 2.0
+    try:
+        llm = install_routing_llm()
+        agents = route(["Refund?", "refund", "  REFUNDS!! ", "What does Premium cost?"])
+        stats = routing_cache._routing_cache.stats()
+        print(f"   Routed to {agents} with {llm.calls} routing LLM calls; cache {stats['hits']} hits / {stats['misses']} misses")
+
+        assert agents == ["billing"] * 4
+        assert llm.calls == 2
+        assert stats["hits"] == 2 and stats["entries"] == 2
+    finally:
+        orchestrator.ROUTER_CONFIDENCE_THRESHOLD = threshold
+
+
+def test_prompt_or_model_change_gets_own_decisions():
+    """A new routing prompt or model is not served another version's decisions."""
+    routing_cache._routing_cache = RoutingCache(max_entries=100, ttl_seconds=60)
+    threshold, prompt = orchestrator.ROUTER_CONFIDENCE_THRESHOLD, orchestrator.ROUTING_PROMPT
+    orchestrator.ROUTER_CONFIDENCE_THRESHOLD = 2.0
+    try:
+        llm = install_routing_llm()
+        route(["Refund?", "Refund?"])
+        assert llm.calls == 1
+
+        orchestrator.ROUTING_PROMPT = prompt + "\n"
+        route(["Refund?"])
+        assert llm.calls == 2
+
+        llm = install_routing_llm("fake-router-2")
+        route(["Refund?", "Refund?"])
+        assert llm.calls == 1
+    finally:
+        orchestrator.ROUTER_CONFIDENCE_THRESHOLD = threshold
+        orchestrator.ROUTING_PROMPT = prompt
+
+
+def test_provider_switches_keep_decisions():
+    """Alternating routing providers (failover, hedging) reuse each provider's decisions."""
+    routing_cache._routing_cache = RoutingCache(max_entries=100, ttl_seconds=60)
+    threshold = orchestrator.ROUTER_CONFIDENCE_THRESHOLD
+    orchestrator.ROUTER_CONFIDENCE_THRESHOLD = 2.0
+    try:
+        bedrock = CountingRoutingModel(messages=itertools.cycle([AIMessage(content="billing")]), model_name="fake-bedrock")
+        openai = CountingRoutingModel(messages=itertools.cycle([AIMessage(content="billing")]), model_name="fake-openai")
+        for llm in [openai, bedrock, openai, bedrock, openai]:
+            orchestrator.get_orchestrator_llm = lambda llm=llm: llm
+            route(["Refund?", "What does Premium cost?"])
+
+        stats = routing_cache._routing_cache.stats()
+        print(f"   Five provider switches: {openai.calls + bedrock.calls} routing LLM calls, {stats['hits']} cache hits")
+        assert openai.calls == 2 and bedrock.calls == 2
+        assert stats["entries"] == 4
+    finally:
+        orchestrator.ROUTER_CONFIDENCE_THRESHOLD = threshold
+
+
+def test_entries_expire_and_evict():
+    """Entries older than the TTL miss; the least recently used entry is evicted."""
+    cache = RoutingCache(max_entries=2, ttl_seconds=0.05)
+    cache.put("refund?", "billing", "v1")
+    assert cache.get("Refund", "v1") == "billing"
+    time.sleep(0.06)
+    assert cache.get("Refund", "v1") is None
+
+    cache.put("refund?", "billing", "v1")
+    cache.put("login issue", "technical", "v1")
+    cache.put("privacy policy", "policy", "v1")
+    stats = cache.stats()
+    print(f"   After expiry and overflow: {stats['expirations']} expired, {stats['evictions']} evicted")
+    assert cache.get("refund", "v1") is None
+    assert stats["expirations"] == 1 and stats["evictions"] == 1
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Routing Decision Cache")
+    print("="*70)
+    test_normalization()
+    test_repeated_messages_skip_routing_llm()
+    test_prompt_or_model_change_gets_own_decisions()
+    test_provider_switches_keep_decisions()
+    test_entries_expire_and_evict()
+    print("\n✅ Repeated messages are routed without the routing LLM")
@@ -0,0 +1,135 @@
+"""
+Session store test
+Verifies LRU eviction by entry count, the byte budget, idle TTL expiry and the
+background sweeper for the in-memory and SQLite session stores, without the
+API or any providers.
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+from typing import Callable, List
+
+from models.schemas import AgentState
+from utils.session_store import InMemorySessionStore, SQLiteSessionStore, SessionStore
+
+
+def make_state(session_id: str) -> AgentState:
+    """Session of the same size for every id of the same length."""
+    return AgentState(session_id=session_id, current_message="How do I reset my password?")
+
+
+def store_factories(db_dir: str) -> List[Callable[..., SessionStore]]:
+    """Builders for each locally testable backend (Redis needs a server)."""
+    counter = iter(range(1000))
+    return [
+        InMemorySessionStore,
+        lambda **limits: SQLiteSessionStore(path=os.path.join(db_dir, f"sessions_{next(counter)}.db"), **limits)
+    ]
+
+
+def put_in_order(store: SessionStore, session_ids: List[str]) -> None:
+    for session_id in session_ids:
+        store.put(session_id, make_state(session_id))
+        time.sleep(0.002)  # distinct last-access times for the SQLite store
+
+
+def test_lru_eviction():
+    """The least recently used session is evicted once max_entries is exceeded."""
+    with tempfile.TemporaryDirectory() as db_dir:
+        for factory in store_factories(db_dir):
+            store = factory(max_entries=3)
+            put_in_order(store, ["s1", "s2", "s3"])
+            store.get("s1")  # s2 is now the least recently used
+            time.sleep(0.002)
+            store.put("s4", make_state("s4"))
+
+            stats = store.stats()
+            print(f"   {stats['backend']}: {len(store)} sessions after 4 puts, {stats['evictions_lru']} evicted")
+            assert "s2" not in store
+            assert all(session_id in store for session_id in ["s1", "s3", "s4"])
+            assert len(store) == 3 and stats["evictions_lru"] == 1
+
+
+def test_byte_budget():
+    """Sessions are evicted to stay within max_bytes, never the one just written."""
+    with tempfile.TemporaryDirectory() as db_dir:
+        for factory in store_factories(db_dir):
+            probe = factory()
+            probe.put("s0", make_state("s0"))
+            session_bytes = probe.stats()["bytes"]
+
+            store = factory(max_bytes=int(session_bytes * 2.5))
+            put_in_order(store, ["s1", "s2", "s3", "s4"])
+            stats = store.stats()
+            print(f"   {stats['backend']}: {stats['bytes']} bytes held with a {stats['max_bytes']} byte budget")
+            assert stats["bytes"] <= stats["max_bytes"]
+            assert [session_id in store for session_id in ["s1", "s2", "s3", "s4"]] == [False, False, True, True]
+
+            # A single session larger than the budget is still kept
+            tiny = factory(max_bytes=1)
+            tiny.put("s1", make_state("s1"))
+            assert "s1" in tiny
+
+
+def test_ttl_expiry():
+    """A session idle for longer than the TTL is gone on its next read."""
+    with tempfile.TemporaryDirectory() as db_dir:
+        for factory in store_factories(db_dir):
+            store = factory(ttl_seconds=0.05)
+            put_in_order(store, ["idle", "active"])
+            for _ in range(4):
+                time.sleep(0.02)
+                assert store.get("active") is not None  # reads keep it alive
+
+            stats = store.stats()
+            print(f"   {stats['backend']}: idle expired {store.get('idle') is None}, active kept {'active' in store}")
+            assert store.get("idle") is None
+            assert store.get("active") is not None
+            assert store.stats()["evictions_ttl"] == 1
+
+
+def test_background_sweeper():
+    """The sweeper removes expired sessions that are never read again."""
+    async def sweep_in_background(store: SessionStore) -> None:
+        store.start_sweeper()
+        await asyncio.sleep(0.2)
+        await store.stop_sweeper()
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        for factory in store_factories(db_dir):
+            store = factory(ttl_seconds=0.05, sweep_interval=0.02)
+            put_in_order(store, ["s1", "s2", "s3"])
+            asyncio.run(sweep_in_background(store))
+
+            stats = store.stats()
+            print(f"   {stats['backend']}: {stats['sessions']} sessions left, {stats['evictions_ttl']} swept")
+            assert len(store) == 0 and stats["evictions_ttl"] == 3
+            assert store._sweeper_task is None
+
+
+def test_base_class_is_abstract():
+    """A store that does not implement the whole interface cannot be created."""
+    class IncompleteStore(SessionStore):
+        def get(self, session_id: str, touch: bool = True):
+            return None
+
+    try:
+        IncompleteStore()
+    except TypeError as e:
+        print(f"   Incomplete store rejected: {e}")
+    else:
+        raise AssertionError("SessionStore subclass without put/delete/sweep/stats was instantiated")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing Session Stores")
+    print("="*70)
+    test_lru_eviction()
+    test_byte_budget()
+    test_ttl_expiry()
+    test_background_sweeper()
+    test_base_class_is_abstract()
+    print("\n✅ Session stores enforce their entry, byte and idle limits")
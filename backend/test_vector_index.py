@@ -0,0 +1,110 @@
+"""
+NumPy vector index re-export test
+Verifies that re-exporting the index while a backend has the old matrix
+memory-mapped leaves the old mapping intact (files are replaced, not
+rewritten), that vector search reloads the index once the corpus version
+changes, and that a document type without chunks exports an empty partition.
+Uses a fake collection, so no API keys or ChromaDB are required.
+"""
+
+import os
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import numpy as np
+
+import utils.retrieval as retrieval
+from utils.vector_index import DOCUMENT_TYPES, NumpyVectorIndex, export_vector_index
+
+
+class FakeCollection:
+    """Collection.get() over fixed rows per document type."""
+
+    def __init__(self, rows_per_type: int, value: float):
+        self.rows: Dict[str, List] = {
+            document_type: [
+                (f"{document_type}-{i}", f"{document_type} chunk {i} v{value}", [value + i, 0.0, 0.0])
+                for i in range(rows_per_type)
+            ]
+            for document_type in DOCUMENT_TYPES
+        }
+
+    def get(self, where: Dict, include: List[str]) -> Dict:
+        rows = self.rows[where["document_type"]]
+        return {
+            "ids": [row[0] for row in rows],
+            "documents": [row[1] for row in rows],
+            "metadatas": [{"document_type": where["document_type"], "source": "fake.md"} for _ in rows],
+            "embeddings": [row[2] for row in rows]
+        }
+
+
+def test_reexport_keeps_mapped_index_readable():
+    """An index loaded before a (shorter) re-export keeps serving its own rows."""
+    with tempfile.TemporaryDirectory() as index_dir:
+        export_vector_index(FakeCollection(rows_per_type=50, value=1.0), Path(index_dir))
+        old_index = NumpyVectorIndex(Path(index_dir))
+
+        export_vector_index(FakeCollection(rows_per_type=5, value=100.0), Path(index_dir))
+        new_index = NumpyVectorIndex(Path(index_dir))
+
+        # Reading every row of the old mapping would fault if the file had been truncated
+        old_rows = np.asarray(old_index.partitions["billing"].embeddings)
+        print(f"   Old index: {len(old_index)} chunks, new index: {len(new_index)} chunks")
+        assert old_rows.shape == (50, 3) and old_rows[49, 0] == 50.0
+        assert old_index.query([49.0, 0.0, 0.0], "billing", top_k=1)[0]["id"] == "billing-48"
+        assert len(new_index) == 5 * len(DOCUMENT_TYPES)
+        assert not [name for name in os.listdir(index_dir) if name.endswith(".tmp")]
+
+
+def test_empty_document_type_exports():
+    """A document type whose files were all deleted exports (and searches) as empty."""
+    collection = FakeCollection(rows_per_type=3, value=1.0)
+    collection.rows["policy"] = []
+    with tempfile.TemporaryDirectory() as index_dir:
+        counts = export_vector_index(collection, Path(index_dir))
+        index = NumpyVectorIndex(Path(index_dir))
+        print(f"   Exported {counts}")
+        assert counts["policy"] == 0 and len(index.partitions["policy"]) == 0
+        assert index.query([1.0, 0.0, 0.0], "policy", top_k=3) == []
+        assert len(index.query([1.0, 0.0, 0.0], top_k=3)) == 3
+
+
+def test_search_reloads_after_reingest():
+    """search_by_vector picks up a re-exported index when the corpus version changes."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        index_dir, version_file = Path(data_dir) / "vector_index", Path(data_dir) / "corpus_version.json"
+        saved = (retrieval.RETRIEVAL_ENGINE, retrieval.VECTOR_INDEX_DIR, retrieval.CORPUS_VERSION_FILE,
+                 retrieval._vector_index, retrieval._corpus_version, retrieval._billing_general_context)
+        retrieval.RETRIEVAL_ENGINE, retrieval.VECTOR_INDEX_DIR, retrieval.CORPUS_VERSION_FILE = "numpy", index_dir, version_file
+        retrieval._vector_index, retrieval._corpus_version = None, None
+        try:
+            export_vector_index(FakeCollection(rows_per_type=3, value=1.0), index_dir)
+            version_file.write_text(json.dumps({"version": "v1"}))
+            first = retrieval.search_by_vector([1.0, 0.0, 0.0], "technical", top_k=1)
+
+            export_vector_index(FakeCollection(rows_per_type=3, value=100.0), index_dir)
+            version_file.write_text(json.dumps({"version": "v2"}))
+            os.utime(version_file, ns=(1, 1))  # make sure the mtime differs
+            second = retrieval.search_by_vector([1.0, 0.0, 0.0], "technical", top_k=1)
+
+            print(f"   Before re-ingest: {first[0]['content']!r}; after: {second[0]['content']!r}")
+            assert first[0]["content"].endswith("v1.0")
+            assert second[0]["content"].endswith("v100.0")
+        finally:
+            (retrieval.RETRIEVAL_ENGINE, retrieval.VECTOR_INDEX_DIR, retrieval.CORPUS_VERSION_FILE,
+             retrieval._vector_index, retrieval._corpus_version, retrieval._billing_general_context) = saved
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🧪 Testing NumPy Vector Index Re-export")
+    print("="*70)
+    test_reexport_keeps_mapped_index_readable()
+    test_empty_document_type_exports()
+    test_search_reloads_after_reingest()
+    print("\n✅ Re-ingestion never rewrites a mapped index and searches reload it")
@@ -0,0 +1,218 @@
+"""
+Admission control for the chat endpoint
+Bounds the requests a worker serves at once; further requests wait in a
+bounded queue until a slot frees up or their queue deadline passes, and
+requests beyond the queue are rejected immediately (HTTP 429)
+"""
+
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional
+from dotenv import load_dotenv
+
+from utils.metrics import Counter, Gauge, Histogram
+
+load_dotenv()
+
+# Configuration (MAX_INFLIGHT_REQUESTS=0 disables admission control)
+MAX_INFLIGHT_REQUESTS = int(os.getenv("MAX_INFLIGHT_REQUESTS", "32"))  # per worker
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "64"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "10"))
+
+# Retry-After bounds (seconds) and weight of the newest sample in the
+# average request duration used to estimate it
+MIN_RETRY_AFTER_SECONDS = 1
+MAX_RETRY_AFTER_SECONDS = 60
+SERVICE_TIME_SMOOTHING = 0.2
+
+INFLIGHT = Gauge("chat_inflight_requests", "Chat requests being served")
+QUEUE_DEPTH = Gauge("chat_queued_requests", "Chat requests waiting for an admission slot")
+QUEUE_WAIT_SECONDS = Histogram("chat_queue_wait_seconds", "Time admitted chat requests waited in the queue")
+REJECTED = Counter("chat_rejected_requests", "Chat requests rejected with 429", ["reason"])
+
+_admission_controller = None
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted (queue full or queue deadline passed)."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"request rejected ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionSlot:
+    """Permission to serve one request; release() is idempotent."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(time.monotonic() - self._acquired_at)
+
+
+class AdmissionController:
+    """
+    In-flight limit with a bounded FIFO wait queue.
+
+    Used from the worker's event loop only (no locking). A released slot is
+    handed directly to the oldest waiter, so queued requests are served in
+    arrival order and new arrivals cannot overtake them.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = MAX_INFLIGHT_REQUESTS,
+        max_queued: int = MAX_QUEUED_REQUESTS,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_inflight = max_inflight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+
+        self._inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_service_seconds: Optional[float] = None
+
+        # Counters
+        self.admitted = 0
+        self.queued = 0
+        self.admitted_from_queue = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_inflight > 0
+
+    async def acquire(self) -> AdmissionSlot:
+        """
+        Wait for a slot to serve a request.
+
+        Returns:
+            Slot to release once the response is finished
+
+        Raises:
+            AdmissionRejected: Queue full, or no slot within queue_timeout
+        """
+        if not self.enabled or (self._inflight < self.max_inflight and not self._waiters):
+            return self._admit(0.0)
+
+        if len(self._waiters) >= self.max_queued:
+            self.rejected_queue_full += 1
+            REJECTED.inc(reason="queue_full")
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        self._update_gauges()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter):
+                self.rejected_timeout += 1
+                REJECTED.inc(reason="queue_timeout")
+                raise AdmissionRejected("queue_timeout", self.retry_after())
+        except asyncio.CancelledError:
+            # Client gave up while queued; pass on a slot that was already handed over
+            if self._abandon(waiter):
+                self._release(None)
+            raise
+
+        # The releasing request handed its slot over (in-flight count unchanged)
+        return self._admit(time.perf_counter() - start, handed_over=True)
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a new request could be admitted."""
+        service_seconds = self._avg_service_seconds or 1.0
+        backlog = (len(self._waiters) + 1) / max(self.max_inflight, 1)
+        estimate = math.ceil(service_seconds * backlog)
+        return max(MIN_RETRY_AFTER_SECONDS, min(MAX_RETRY_AFTER_SECONDS, estimate))
+
+    def stats(self) -> Dict:
+        """Return admission limits, current load and counters."""
+        return {
+            "enabled": self.enabled,
+            "max_inflight": self.max_inflight,
+            "max_queued": self.max_queued,
+            "queue_timeout_seconds": self.queue_timeout,
+            "inflight": self._inflight,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_queue_wait_ms": (self.wait_seconds / self.admitted_from_queue) * 1000 if self.admitted_from_queue else 0.0,
+            "avg_service_ms": self._avg_service_seconds * 1000 if self._avg_service_seconds else None
+        }
+
+    def _admit(self, waited: float, handed_over: bool = False) -> AdmissionSlot:
+        if not handed_over:
+            self._inflight += 1
+        self.admitted += 1
+        if handed_over:
+            self.admitted_from_queue += 1
+            self.wait_seconds += waited
+            QUEUE_WAIT_SECONDS.observe(waited)
+        self._update_gauges()
+        return AdmissionSlot(self)
+
+    def _abandon(self, waiter: asyncio.Future) -> bool:
+        """
+        Remove a waiter that stopped waiting.
+
+        Returns:
+            True if a slot had already been handed to it
+        """
+        if waiter.done() and not waiter.cancelled():
+            return True
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+        return False
+
+    def _release(self, service_seconds: Optional[float]) -> None:
+        if service_seconds is not None:
+            if self._avg_service_seconds is None:
+                self._avg_service_seconds = service_seconds
+            else:
+                self._avg_service_seconds += SERVICE_TIME_SMOOTHING * (service_seconds - self._avg_service_seconds)
+
+        # Hand the slot to the oldest waiter still waiting
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+
+        self._inflight -= 1
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        INFLIGHT.set(self._inflight)
+        QUEUE_DEPTH.set(len(self._waiters))
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the worker's admission controller."""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
@@ -0,0 +1,55 @@
+"""
+Async helpers for the request path
+Offloads blocking library calls (ChromaDB, file I/O) to a bounded thread pool
+"""
+
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "16"))
+
+T = TypeVar("T")
+
+_blocking_executor = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Get or create the bounded executor for blocking calls."""
+    global _blocking_executor
+    if _blocking_executor is None:
+        _blocking_executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_EXECUTOR_WORKERS,
+            thread_name_prefix="blocking-io"
+        )
+    return _blocking_executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking callable on the bounded executor without stalling the event loop.
+
+    At most BLOCKING_EXECUTOR_WORKERS calls run at once; further calls wait in
+    the executor queue. Context variables are propagated like asyncio.to_thread.
+
+    Args:
+        func: Blocking callable
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Result of func
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_blocking_executor(),
+        functools.partial(ctx.run, func, *args, **kwargs)
+    )
@@ -0,0 +1,184 @@
+"""
+Query embedding cache
+Bounded in-memory LRU in front of an optional bounded on-disk SQLite store,
+keyed by embedding model and normalized query text
+"""
+
+import re
+import time
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# The disk tier is pruned back to max_disk_entries after this share of the
+# cap in new writes, so it never exceeds the cap by more than that
+DISK_PRUNE_FRACTION = 1 / 16
+
+
+def normalize_query_text(text: str) -> str:
+    """Casefold and collapse whitespace so trivially different queries share a key."""
+    return WHITESPACE_PATTERN.sub(" ", text).strip().casefold()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of query embeddings.
+
+    Lookups check the in-memory LRU first, then the SQLite file (if a path is
+    configured), promoting disk hits into memory. Vectors are stored on disk as
+    packed float32 so cache hits survive restarts. The disk tier keeps the
+    max_disk_entries most recently written or read entries, since every
+    distinct user query would otherwise add a row forever.
+    """
+
+    def __init__(self, max_entries: int = 2048, path: Optional[str] = None, max_disk_entries: int = 20000):
+        self.max_entries = max_entries
+        self.path = path or None
+        self.max_disk_entries = max_disk_entries
+        self._prune_every = max(1, int(max_disk_entries * DISK_PRUNE_FRACTION))
+        self._writes_since_prune = 0
+
+        self._memory: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+
+        if self.path:
+            conn = self._connect()
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    model TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (model, query)
+                )
+                """
+            )
+            # Files written before the disk tier was bounded lack the column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(query_embeddings)")}
+            if "last_access" not in columns:
+                conn.execute("ALTER TABLE query_embeddings ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_access ON query_embeddings (last_access)"
+            )
+            self._prune_disk()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        Look up a cached embedding.
+
+        Args:
+            model: Embedding model name
+            text: Query text (normalized internally)
+
+        Returns:
+            Embedding vector, or None on a miss
+        """
+        key = (model, normalize_query_text(text))
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+        if self.path:
+            row = self._connect().execute(
+                "SELECT vector FROM query_embeddings WHERE model = ? AND query = ?",
+                key
+            ).fetchone()
+            if row is not None:
+                self._connect().execute(
+                    "UPDATE query_embeddings SET last_access = ? WHERE model = ? AND query = ?",
+                    (time.time(), key[0], key[1])
+                )
+                vector = array("f", row[0]).tolist()
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store_in_memory(key, vector)
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model: str, text: str, vector: List[float]) -> None:
+        """
+        Cache an embedding in memory and, if configured, on disk.
+
+        Args:
+            model: Embedding model name
+            text: Query text (normalized internally)
+            vector: Embedding vector
+        """
+        key = (model, normalize_query_text(text))
+
+        with self._lock:
+            self._store_in_memory(key, vector)
+
+        if self.path:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO query_embeddings (model, query, vector, last_access) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], array("f", vector).tobytes(), time.time())
+            )
+            with self._lock:
+                self._writes_since_prune += 1
+                prune = self._writes_since_prune >= self._prune_every
+                if prune:
+                    self._writes_since_prune = 0
+            if prune:
+                self._prune_disk()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "persistent": self.path is not None,
+            "max_disk_entries": self.max_disk_entries if self.path else 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "disk_evictions": self.disk_evictions,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+    def _prune_disk(self) -> int:
+        """Delete the least recently used disk entries beyond max_disk_entries."""
+        cursor = self._connect().execute(
+            "DELETE FROM query_embeddings WHERE rowid IN ("
+            "SELECT rowid FROM query_embeddings ORDER BY last_access DESC, rowid DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+        with self._lock:
+            self.disk_evictions += cursor.rowcount
+        return cursor.rowcount
+
+    def _store_in_memory(self, key: tuple, vector: List[float]) -> None:
+        # Caller must hold the lock
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
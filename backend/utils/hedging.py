@@ -0,0 +1,265 @@
+"""
+Hedged LLM requests
+When a call has not produced its first token within a high percentile of
+recent first-token latencies, the same request is sent to a second provider
+or model; whichever produces a first token first wins and the other is
+cancelled. Hedges are paid for from a budget that grows with the number of
+calls, so the extra cost stays bounded
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from dotenv import load_dotenv
+
+from utils.metrics import Counter
+
+load_dotenv()
+
+# Configuration (opt-in)
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+# Hedge once the call is slower than this percentile of recent first tokens...
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+# ...but never earlier than this, and only after this many calls were observed
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_MS", "100")) / 1000
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+# Every call earns HEDGE_BUDGET_RATIO hedges, at most HEDGE_BUDGET_BURST saved up
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.05"))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", "5"))
+
+# First-token latencies kept per kind of call
+HEDGE_LATENCY_WINDOW = 500
+
+LLM_HEDGES = Counter("llm_hedges", "Hedged LLM requests (fired, won, skipped_budget)", ["kind", "result"])
+
+T = TypeVar("T")
+# An attempt receives a callback to call when its first token arrives
+Attempt = Callable[[Callable[[], None]], Awaitable[T]]
+
+_hedge_policies: Dict[str, "HedgePolicy"] = {}
+_hedge_policies_lock = threading.Lock()
+
+
+class HedgePolicy:
+    """
+    Hedge delay and budget for one kind of call (routing, response).
+
+    The delay is the HEDGE_PERCENTILE of the last HEDGE_LATENCY_WINDOW
+    first-token latencies; no hedges are sent until HEDGE_MIN_SAMPLES were
+    observed. Each call adds budget_ratio credits (up to budget_burst) and
+    each hedge spends one, so hedges stay below budget_ratio of calls plus
+    the burst.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        percentile: float = HEDGE_PERCENTILE,
+        min_delay: float = HEDGE_MIN_DELAY_SECONDS,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        budget_ratio: float = HEDGE_BUDGET_RATIO,
+        budget_burst: float = HEDGE_BUDGET_BURST
+    ):
+        self.kind = kind
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+
+        self._latencies = deque(maxlen=HEDGE_LATENCY_WINDOW)
+        self._credits = 0.0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Register a call and return how long to wait for its first token.
+
+        Returns:
+            Seconds before hedging, or None while warming up
+        """
+        with self._lock:
+            self.calls += 1
+            self._credits = min(self.budget_burst, self._credits + self.budget_ratio)
+            if not self._latencies or len(self._latencies) < self.min_samples:
+                return None
+            return max(self.min_delay, _percentile(sorted(self._latencies), self.percentile))
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget if it has one."""
+        with self._lock:
+            if self._credits < 1.0:
+                self.over_budget += 1
+                spent = False
+            else:
+                self._credits -= 1.0
+                self.hedges += 1
+                spent = True
+        LLM_HEDGES.inc(kind=self.kind, result="fired" if spent else "skipped_budget")
+        return spent
+
+    def observe(self, seconds: float) -> None:
+        """Record a first-token latency."""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def record_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+        LLM_HEDGES.inc(kind=self.kind, result="won")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            delay = None
+            if latencies and len(latencies) >= self.min_samples:
+                delay = max(self.min_delay, _percentile(latencies, self.percentile))
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_rate": self.hedges / self.calls if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "over_budget": self.over_budget,
+                "budget_credits": round(self._credits, 2),
+                "hedge_delay_ms": delay * 1000 if delay is not None else None,
+                "samples": len(latencies)
+            }
+
+
+class _RunningAttempt:
+    """One in-flight copy of a hedged call."""
+
+    def __init__(self, name: str, attempt: Attempt, start: float, progress: asyncio.Event):
+        self.name = name
+        self.first_token_seconds: Optional[float] = None
+        self._start = start
+        self._progress = progress
+        self.task = asyncio.ensure_future(attempt(self.on_first_token))
+        self.task.add_done_callback(self._on_done)
+
+    def on_first_token(self) -> None:
+        if self.first_token_seconds is None:
+            self.first_token_seconds = time.perf_counter() - self._start
+            self._progress.set()
+
+    def _on_done(self, task: asyncio.Future) -> None:
+        # A call that returned without streaming counts its completion as its first token
+        if not task.cancelled() and task.exception() is None:
+            self.on_first_token()
+        self._progress.set()
+
+
+async def hedged_call(kind: str, primary: Attempt, hedge: Optional[Attempt] = None) -> Tuple[T, bool]:
+    """
+    Run an LLM call, hedged on a second provider or model if it is slow.
+
+    Each attempt is an async function taking an on_first_token callback
+    (streaming calls call it on their first token; for other calls,
+    returning counts). Without LLM_HEDGING or a hedge, the primary is
+    simply awaited.
+
+    Args:
+        kind: Kind of call (routing, response), for delay and budget
+        primary: The call on the primary model
+        hedge: The same call on the secondary model
+
+    Returns:
+        Tuple of (result of the winning attempt, True if the hedge won)
+    """
+    if not LLM_HEDGING or hedge is None:
+        return await primary(lambda: None), False
+
+    policy = get_hedge_policy(kind)
+    delay = policy.hedge_delay()
+    start = time.perf_counter()
+
+    if delay is None:
+        first_token: List[float] = []
+
+        def on_first_token() -> None:
+            if not first_token:
+                first_token.append(time.perf_counter() - start)
+
+        result = await primary(on_first_token)
+        policy.observe(first_token[0] if first_token else time.perf_counter() - start)
+        return result, False
+
+    progress = asyncio.Event()
+    attempts = [_RunningAttempt("primary", primary, start, progress)]
+    can_hedge = True
+    try:
+        while True:
+            started = [a for a in attempts if a.first_token_seconds is not None]
+            if started:
+                winner = min(started, key=lambda a: a.first_token_seconds)
+                break
+            if all(a.task.done() for a in attempts):
+                # Every attempt failed before its first token: raise the primary's error
+                return await attempts[0].task, False
+
+            timeout = max(0.0, delay - (time.perf_counter() - start)) if can_hedge else None
+            progress.clear()
+            try:
+                await asyncio.wait_for(progress.wait(), timeout)
+            except asyncio.TimeoutError:
+                can_hedge = False
+                if policy.try_spend():
+                    attempts.append(_RunningAttempt("hedge", hedge, start, progress))
+    except BaseException:
+        for attempt in attempts:
+            attempt.task.cancel()
+        raise
+
+    # A primary that lost is known to be at least this slow
+    primary_attempt = attempts[0]
+    if primary_attempt.first_token_seconds is not None:
+        policy.observe(primary_attempt.first_token_seconds)
+    elif not primary_attempt.task.done():
+        policy.observe(time.perf_counter() - start)
+    for attempt in attempts:
+        if attempt is not winner:
+            attempt.task.cancel()
+    if winner.name == "hedge":
+        policy.record_win()
+        print(f"⚡ Hedged {kind} request won on the secondary model ({winner.first_token_seconds * 1000:.0f} ms to first token)")
+
+    try:
+        return await winner.task, winner.name == "hedge"
+    except asyncio.CancelledError:
+        winner.task.cancel()
+        raise
+
+
+def get_hedge_policy(kind: str) -> HedgePolicy:
+    """Get or create the hedge policy for a kind of call."""
+    with _hedge_policies_lock:
+        if kind not in _hedge_policies:
+            _hedge_policies[kind] = HedgePolicy(kind)
+        return _hedge_policies[kind]
+
+
+def get_hedging_stats() -> Dict:
+    """Return hedge counts, win rates and current delays per kind of call."""
+    with _hedge_policies_lock:
+        policies = list(_hedge_policies.values())
+    return {
+        "enabled": LLM_HEDGING,
+        "percentile": HEDGE_PERCENTILE,
+        "budget_ratio": HEDGE_BUDGET_RATIO,
+        **{policy.kind: policy.stats() for policy in policies}
+    }
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of a sorted, non-empty list."""
+    rank = max(1, int(-(-percentile * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
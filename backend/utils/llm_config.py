@@ -4,11 +4,18 @@ OpenAI for response generation, AWS Bedrock for routing
 """
 
 import os
-from typing import Optional, Union
+import asyncio
+from typing import Optional, Union, List, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_aws import ChatBedrock
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import HumanMessage, BaseMessage
+from botocore.config import Config
 from dotenv import load_dotenv
+from utils.metrics import time_stage, current_agent, LLM_CANCELLED, LLM_TOKENS_SAVED
+from utils.token_utils import count_tokens
+from utils.rate_limiter import call_with_retries, acall_with_retries, estimate_tokens
+from utils.provider_health import ProviderRouter
+from utils import hedging
 
 load_dotenv()
 
@@ -33,7 +40,8 @@ def get_openai_llm(
         model=model,
         temperature=temperature,
         streaming=streaming,
-        openai_api_key=os.getenv("OPENAI_API_KEY")
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=0  # Retried per call behind the shared rate limiter
     )
 
 
@@ -65,6 +73,7 @@ def get_bedrock_llm(
         },
         region_name=os.getenv("AWS_DEFAULT_REGION", "us-east-1"),
         credentials_profile_name=None,  # Use environment variables
+        config=Config(retries={"max_attempts": 1}),  # Retried per call behind the shared rate limiter
     )
 
 
@@ -76,48 +85,296 @@ response_llm = get_openai_llm(
     streaming=True
 )
 
-# Orchestrator LLM (lazy initialization)
-_orchestrator_llm = None
-_orchestrator_fallback = False
+# Secondary model for hedged response generation (with LLM_HEDGING=true)
+RESPONSE_HEDGE_PROVIDER = os.getenv("RESPONSE_HEDGE_PROVIDER", "bedrock")  # bedrock | openai
+RESPONSE_HEDGE_MODEL = os.getenv("RESPONSE_HEDGE_MODEL", "anthropic.claude-3-haiku-20240307-v1:0")
 
+# Orchestrator LLM clients (lazy initialization, probed in the background)
+_orchestrator_router = None
+_response_hedge_llm = None
 
-def get_orchestrator_llm():
-    """
-    Get the orchestrator LLM with automatic fallback.
-    Try AWS Bedrock first (cost-effective), fall back to OpenAI if unavailable.
+
+async def _probe_llm(llm) -> None:
+    """Send a one-word health probe to a routing LLM (not retried)."""
+    test_messages = [HumanMessage(content="test")]
+    await acall_with_retries(
+        llm_provider(llm),
+        lambda: llm.ainvoke(test_messages),
+        estimate_tokens(test_messages, 500),
+        can_retry=lambda: False
+    )
+
+
+def get_orchestrator_router() -> ProviderRouter:
     """
-    global _orchestrator_llm, _orchestrator_fallback
+    Get or create the routing LLM provider router.
     
-    if _orchestrator_llm is not None:
-        return _orchestrator_llm
+    Constructs the Bedrock (preferred, cost-effective) and OpenAI clients
+    without calling either; their health is learned from background probes
+    and real routing calls.
+    """
+    global _orchestrator_router
     
-    # Try Bedrock first
-    if not _orchestrator_fallback:
+    if _orchestrator_router is None:
+        clients = {}
         try:
-            _orchestrator_llm = get_bedrock_llm(
+            clients["bedrock"] = get_bedrock_llm(
                 model="anthropic.claude-3-haiku-20240307-v1:0",
                 temperature=0.0,
                 max_tokens=500
             )
-            # Test the connection
-            _orchestrator_llm.invoke([HumanMessage(content="test")])
-            print("✓ Using AWS Bedrock for orchestrator")
-            return _orchestrator_llm
         except Exception as e:
-            print(f"⚠️  Bedrock unavailable, using OpenAI fallback")
-            _orchestrator_fallback = True
-    
-    # Fallback to OpenAI
-    _orchestrator_llm = get_openai_llm(
-        model="gpt-3.5-turbo",
-        temperature=0.0,
-        streaming=False
-    )
-    print("✓ Using OpenAI GPT-3.5-turbo for orchestrator")
-    return _orchestrator_llm
+            print(f"⚠️  Bedrock client unavailable, orchestrator will use OpenAI: {str(e)}")
+        clients["openai"] = get_openai_llm(
+            model="gpt-3.5-turbo",
+            temperature=0.0,
+            streaming=False
+        )
+        _orchestrator_router = ProviderRouter(
+            clients,
+            preference=["bedrock", "openai"],
+            default="openai",
+            probe=_probe_llm
+        )
+    return _orchestrator_router
+
+
+def get_orchestrator_llm():
+    """
+    Get the orchestrator LLM for the next routing call.
+    
+    Never blocks on the network: AWS Bedrock is used while its probes and
+    recent calls show it healthy and not much slower than OpenAI, and
+    OpenAI GPT-3.5-turbo otherwise (including before Bedrock's first probe).
+    """
+    return get_orchestrator_router().client()
+
+
+def get_orchestrator_hedge(llm):
+    """Orchestrator LLM on another provider to hedge a slow routing call with, or None."""
+    if not hedging.LLM_HEDGING:
+        return None
+    return get_orchestrator_router().alternative(llm)
+
+
+def get_orchestrator_failover(llm):
+    """Another orchestrator LLM to retry with after `llm` failed, or None."""
+    return get_orchestrator_router().failover(llm)
+
+
+def record_orchestrator_call(llm, seconds: float, error: Optional[BaseException] = None) -> None:
+    """
+    Feed the outcome of a routing call into provider selection.
+    
+    Args:
+        llm: Orchestrator LLM the call was made with
+        seconds: Call duration
+        error: Exception the call failed with, if any
+    """
+    get_orchestrator_router().record(llm, seconds, error)
+
+
+def start_orchestrator_health_checks() -> None:
+    """Start probing the orchestrator LLM providers in the background."""
+    get_orchestrator_router().start_health_checks()
+
+
+async def stop_orchestrator_health_checks() -> None:
+    """Stop the orchestrator LLM health checks."""
+    if _orchestrator_router is not None:
+        await _orchestrator_router.stop_health_checks()
 
 
 def get_response_llm() -> ChatOpenAI:
     """Get the response generation LLM (OpenAI GPT-4 for quality)."""
     return response_llm
 
+
+def get_response_hedge_llm():
+    """
+    Get the secondary response LLM that slow responses are hedged on.
+    
+    Returns:
+        RESPONSE_HEDGE_MODEL on RESPONSE_HEDGE_PROVIDER, or None if hedging
+        is off or the client cannot be created
+    """
+    global _response_hedge_llm
+    
+    if not hedging.LLM_HEDGING:
+        return None
+    if _response_hedge_llm is None:
+        try:
+            if RESPONSE_HEDGE_PROVIDER == "openai":
+                _response_hedge_llm = get_openai_llm(model=RESPONSE_HEDGE_MODEL, temperature=0.7, streaming=True)
+            else:
+                _response_hedge_llm = get_bedrock_llm(model=RESPONSE_HEDGE_MODEL, temperature=0.7)
+        except Exception as e:
+            print(f"⚠️  Response hedge model unavailable, responses are not hedged: {str(e)}")
+            return None
+    return _response_hedge_llm
+
+
+def llm_provider(llm) -> str:
+    """Rate limiter name for a chat model (bedrock or openai)."""
+    return "bedrock" if isinstance(llm, ChatBedrock) else "openai"
+
+
+def invoke_llm(llm, messages: List[BaseMessage], **kwargs):
+    """
+    Invoke a chat model behind its provider's shared rate limiter.
+    
+    Retryable failures (throttling, timeouts, server errors) are retried
+    here with jittered backoff.
+    
+    Args:
+        llm: Chat model
+        messages: Prompt messages
+        **kwargs: Extra call options (e.g. max_tokens)
+        
+    Returns:
+        Model response message
+    """
+    return call_with_retries(
+        llm_provider(llm),
+        lambda: llm.invoke(messages, **kwargs),
+        estimate_tokens(messages, kwargs.get("max_tokens"))
+    )
+
+
+async def ainvoke_llm(llm, messages: List[BaseMessage], **kwargs):
+    """Async variant of invoke_llm."""
+    return await acall_with_retries(
+        llm_provider(llm),
+        lambda: llm.ainvoke(messages, **kwargs),
+        estimate_tokens(messages, kwargs.get("max_tokens"))
+    )
+
+
+async def ainvoke_llm_hedged(
+    llm,
+    hedge_llm,
+    messages: List[BaseMessage],
+    kind: str = "routing",
+    call=None,
+    **kwargs
+) -> Tuple[BaseMessage, object]:
+    """
+    Async invoke_llm that is hedged on a second model when the first is slow.
+    
+    With LLM_HEDGING=true and a hedge model, a copy of the request goes to
+    hedge_llm once llm is slower than the recent HEDGE_PERCENTILE (budget
+    permitting); the first answer wins and the other call is cancelled.
+    
+    Args:
+        llm: Primary chat model
+        hedge_llm: Secondary chat model (None disables hedging)
+        messages: Prompt messages
+        kind: Hedge policy the delay and budget come from
+        call: Async function(model) making the call (default: ainvoke_llm)
+        **kwargs: Extra call options (e.g. max_tokens)
+        
+    Returns:
+        Tuple of (response message, model that produced it)
+    """
+    if call is None:
+        call = lambda model: ainvoke_llm(model, messages, **kwargs)
+    
+    hedge = (lambda on_first_token: call(hedge_llm)) if hedge_llm is not None else None
+    response, hedge_won = await hedging.hedged_call(kind, lambda on_first_token: call(llm), hedge)
+    return response, hedge_llm if hedge_won else llm
+
+
+def stream_llm_response(llm, messages: List[BaseMessage], **kwargs) -> str:
+    """
+    Generate a response by streaming deltas from the LLM.
+    
+    Each delta fires the LLM callbacks as it arrives, so when called inside a
+    LangGraph node the tokens surface through the graph's "messages" stream
+    mode while generation is still in progress. The call waits for the
+    provider's rate limiter and is retried only if it failed before the
+    first delta (streamed text cannot be taken back).
+    
+    Args:
+        llm: Chat model to stream from
+        messages: Prompt messages
+        **kwargs: Extra call options (e.g. max_tokens)
+        
+    Returns:
+        Complete response text
+    """
+    parts = []
+    
+    def generate() -> str:
+        for chunk in llm.stream(messages, **kwargs):
+            # Empty deltas (e.g. OpenAI's leading role delta) do not count as streamed text
+            if isinstance(chunk.content, str) and chunk.content:
+                parts.append(chunk.content)
+        return "".join(parts)
+    
+    with time_stage("llm_generation"):
+        return call_with_retries(
+            llm_provider(llm),
+            generate,
+            estimate_tokens(messages, kwargs.get("max_tokens")),
+            can_retry=lambda: not parts
+        )
+
+
+async def astream_llm_response(llm, messages: List[BaseMessage], hedge_llm=None, **kwargs) -> str:
+    """
+    Async variant of stream_llm_response using the model's native async client.
+    
+    Cancelling the caller (client disconnect) closes the model's HTTP stream.
+    With LLM_HEDGING=true and a hedge model, a slow first token is hedged on
+    hedge_llm: whichever model streams first continues, the other is cancelled
+    before its first token reaches the client.
+    
+    Args:
+        llm: Chat model to stream from
+        messages: Prompt messages
+        hedge_llm: Secondary chat model for hedging (optional)
+        **kwargs: Extra call options (e.g. max_tokens)
+        
+    Returns:
+        Complete response text
+    """
+    streams: List[List[str]] = []
+    
+    def attempt(model):
+        async def stream(on_first_token) -> str:
+            parts = []
+            streams.append(parts)
+            
+            async def generate() -> str:
+                async for chunk in model.astream(messages, **kwargs):
+                    # Empty deltas (e.g. OpenAI's leading role delta) do not count as streamed text
+                    if isinstance(chunk.content, str) and chunk.content:
+                        on_first_token()
+                        parts.append(chunk.content)
+                return "".join(parts)
+            
+            return await acall_with_retries(
+                llm_provider(model),
+                generate,
+                estimate_tokens(messages, kwargs.get("max_tokens")),
+                can_retry=lambda: not parts
+            )
+        return stream
+    
+    with time_stage("llm_generation"):
+        try:
+            response_text, _ = await hedging.hedged_call(
+                "response",
+                attempt(llm),
+                attempt(hedge_llm) if hedge_llm is not None else None
+            )
+            return response_text
+        except asyncio.CancelledError:
+            # Client went away: the HTTP stream is closed, so the rest is never generated
+            agent = current_agent()
+            LLM_CANCELLED.inc(agent=agent)
+            if kwargs.get("max_tokens"):
+                streamed = max(("".join(parts) for parts in streams), key=len, default="")
+                saved = max(0, kwargs["max_tokens"] - count_tokens(streamed))
+                LLM_TOKENS_SAVED.inc(saved, agent=agent)
+            raise
@@ -0,0 +1,249 @@
+"""
+In-process request metrics
+Latency histograms and counters per pipeline stage, labelled by agent and
+exposed in the Prometheus text format (served at /metrics)
+"""
+
+import time
+import bisect
+import threading
+import contextvars
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Agent label used before routing has picked an agent (e.g. speculative work)
+UNROUTED_AGENT = "none"
+
+# Agent of the request being served; a dict so that the choice made by the
+# orchestrator is visible to stages running in copied contexts
+_request_labels: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar(
+    "request_metric_labels", default=None
+)
+
+_registry: List["_Metric"] = []
+
+
+class _Metric(ABC):
+    """Base class for labelled metrics."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _format_labels(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @property
+    def family_name(self) -> str:
+        """Name the HELP and TYPE lines are written under."""
+        return self.name
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Sample lines in the Prometheus text format."""
+
+
+class Counter(_Metric):
+    """Monotonic counter (exported with a _total suffix)."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    @property
+    def family_name(self) -> str:
+        return f"{self.name}_total"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.family_name}{self._format_labels(key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down (e.g. queue depth)."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """Latency histogram with fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bound_label = 'le="%s"' % ("+Inf" if bound == float("inf") else _number(bound))
+                lines.append(f"{self.name}_bucket{self._format_labels(key, bound_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+# Pipeline metrics
+STAGE_SECONDS = Histogram(
+    "chat_stage_duration_seconds",
+    "Duration of a request pipeline stage (routing, embedding, chroma_query, numpy_query, policy_selection, llm_generation)",
+    ["stage", "agent"]
+)
+FIRST_TOKEN_SECONDS = Histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from receiving a chat request to sending its first SSE token",
+    ["agent"]
+)
+REQUEST_SECONDS = Histogram(
+    "chat_request_duration_seconds",
+    "Total time to serve a chat request",
+    ["agent", "cached"]
+)
+REQUESTS = Counter(
+    "chat_requests",
+    "Chat requests by agent and outcome",
+    ["agent", "status"]
+)
+CANCELLED = Counter(
+    "chat_cancelled_requests",
+    "Chat requests cancelled because the client disconnected, by pipeline phase",
+    ["agent", "phase"]
+)
+LLM_CANCELLED = Counter(
+    "llm_generations_cancelled",
+    "LLM generations cancelled before completion",
+    ["agent"]
+)
+LLM_TOKENS_SAVED = Counter(
+    "llm_completion_tokens_saved",
+    "Completion tokens not generated because a generation was cancelled (estimated from max_tokens)",
+    ["agent"]
+)
+
+
+def start_request_metrics() -> Dict:
+    """
+    Start labelling stage metrics for the current request.
+
+    Returns:
+        Label dict of the request (agent is filled in by the orchestrator)
+    """
+    labels = {"agent": UNROUTED_AGENT}
+    _request_labels.set(labels)
+    return labels
+
+
+def set_request_agent(agent: str) -> None:
+    """Record the agent chosen for the current request."""
+    labels = _request_labels.get()
+    if labels is not None:
+        labels["agent"] = agent
+
+
+def current_agent() -> str:
+    """Agent of the current request (UNROUTED_AGENT before routing)."""
+    labels = _request_labels.get()
+    return labels["agent"] if labels is not None else UNROUTED_AGENT
+
+
+def observe_stage(stage: str, seconds: float, agent: Optional[str] = None) -> None:
+    """
+    Record the duration of a pipeline stage.
+
+    Args:
+        stage: Stage name
+        seconds: Elapsed time
+        agent: Agent label (defaults to the current request's agent)
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage, agent=agent or current_agent())
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Time the enclosed block as a pipeline stage (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.family_name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.family_name} {metric.type_name}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
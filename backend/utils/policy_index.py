@@ -0,0 +1,233 @@
+"""
+Section-level policy index
+Splits policy documents into headed sections and ranks them by keyword (BM25)
+and, when section embeddings are available, embedding similarity
+"""
+
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.query_classifier import tokenize
+from utils.token_utils import count_tokens
+
+
+# Section headings are a short leading phrase followed by a colon,
+# e.g. "Data Retention: We retain ..."
+SECTION_HEADING_PATTERN = re.compile(r"^([A-Z][^.:\n]{2,80}):\s")
+PARAGRAPH_SEPARATOR = re.compile(r"\n\s*\n")
+
+# Heading tokens count this many times in the keyword index
+HEADING_TOKEN_WEIGHT = 3
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Reciprocal rank fusion constant for combining keyword and embedding ranks
+RRF_K = 60
+
+
+def split_policy_sections(filename: str, text: str) -> List[Dict]:
+    """
+    Split a policy document into headed sections.
+
+    A paragraph starting with "Heading:" opens a new section; paragraphs
+    without a heading continue the previous section (or form the document's
+    "Overview"). A single-line first paragraph is taken as the document title.
+
+    Args:
+        filename: Policy file name (e.g. privacy_policy.txt)
+        text: Document text
+
+    Returns:
+        List of sections with source, title, heading, text and token count
+    """
+    paragraphs = [p.strip() for p in PARAGRAPH_SEPARATOR.split(text.strip()) if p.strip()]
+    title = filename.rsplit(".", 1)[0].replace("_", " ").title()
+    if paragraphs and "\n" not in paragraphs[0] and not SECTION_HEADING_PATTERN.match(paragraphs[0]):
+        title = paragraphs.pop(0)
+
+    sections = []
+    for paragraph in paragraphs:
+        heading_match = SECTION_HEADING_PATTERN.match(paragraph)
+        if heading_match:
+            sections.append({"heading": heading_match.group(1), "paragraphs": [paragraph]})
+        elif sections:
+            sections[-1]["paragraphs"].append(paragraph)
+        else:
+            sections.append({"heading": "Overview", "paragraphs": [paragraph]})
+
+    result = []
+    for position, section in enumerate(sections):
+        section_text = "\n\n".join(section["paragraphs"])
+        result.append({
+            "source": filename,
+            "title": title,
+            "heading": section["heading"],
+            "position": position,
+            "text": section_text,
+            "tokens": count_tokens(section_text)
+        })
+    return result
+
+
+class PolicySectionIndex:
+    """
+    Keyword and (optional) embedding index over policy sections.
+
+    Keyword scores are BM25 over section tokens (heading tokens weighted
+    higher) plus a per-file boost from the curated policy keywords. When
+    section embeddings are set, the keyword and cosine-similarity rankings are
+    combined with reciprocal rank fusion.
+    """
+
+    def __init__(self, sections: List[Dict]):
+        self.sections = sections
+        self.embeddings: Optional[np.ndarray] = None
+        # Set when embedding the sections failed (keyword-only until rebuilt)
+        self.embeddings_unavailable = False
+
+        self._term_counts: List[Counter] = []
+        document_frequency = Counter()
+        for section in sections:
+            terms = Counter(tokenize(section["text"]))
+            for token in tokenize(section["heading"]):
+                terms[token] += HEADING_TOKEN_WEIGHT
+            self._term_counts.append(terms)
+            document_frequency.update(terms.keys())
+
+        self._lengths = [sum(terms.values()) for terms in self._term_counts]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        section_count = len(sections)
+        self._idf = {
+            token: math.log(1 + (section_count - freq + 0.5) / (freq + 0.5))
+            for token, freq in document_frequency.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def set_embeddings(self, vectors: List[List[float]]) -> None:
+        """Store section embeddings (unit-normalized, in section order)."""
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(self.sections), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.embeddings = matrix / np.where(norms == 0, 1.0, norms)
+
+    def keyword_scores(self, query: str, file_boosts: Optional[Dict[str, float]] = None) -> List[float]:
+        """
+        Score every section against the query.
+
+        Args:
+            query: User query
+            file_boosts: Extra score per source file (e.g. curated keyword matches)
+
+        Returns:
+            Score per section, in section order
+        """
+        query_terms = [token for token in set(tokenize(query)) if token in self._idf]
+        file_boosts = file_boosts or {}
+
+        scores = []
+        for terms, length, section in zip(self._term_counts, self._lengths, self.sections):
+            score = file_boosts.get(section["source"], 0.0)
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self._average_length)
+            for token in query_terms:
+                frequency = terms.get(token, 0)
+                if frequency:
+                    score += self._idf[token] * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+            scores.append(score)
+        return scores
+
+    def rank(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]] = None,
+        file_boosts: Optional[Dict[str, float]] = None
+    ) -> List[int]:
+        """
+        Rank sections by relevance to the query.
+
+        Args:
+            query: User query
+            query_embedding: Query vector (used only if section embeddings are set)
+            file_boosts: Extra keyword score per source file
+
+        Returns:
+            Section indices, most relevant first (sections with no keyword match
+            are omitted unless embeddings are used)
+        """
+        keyword_scores = self.keyword_scores(query, file_boosts)
+        keyword_ranking = sorted(
+            (i for i, score in enumerate(keyword_scores) if score > 0),
+            key=lambda i: keyword_scores[i],
+            reverse=True
+        )
+
+        if self.embeddings is None or query_embedding is None:
+            return keyword_ranking
+
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector = query_vector / (np.linalg.norm(query_vector) or 1.0)
+        similarities = self.embeddings @ query_vector
+        embedding_ranking = np.argsort(-similarities).tolist()
+
+        fused = Counter()
+        for ranking in (keyword_ranking, embedding_ranking):
+            for rank, i in enumerate(ranking):
+                fused[i] += 1.0 / (RRF_K + rank + 1)
+        return [i for i, _ in fused.most_common()]
+
+    def overview_ranking(self) -> List[int]:
+        """First section of every document (fallback when nothing matches)."""
+        return [i for i, section in enumerate(self.sections) if section["position"] == 0]
+
+    def select(self, ranking: List[int], max_tokens: int) -> List[Dict]:
+        """
+        Take ranked sections until the token budget is spent.
+
+        Sections that do not fit are skipped in favour of smaller, lower ranked
+        ones; the best section is always included.
+
+        Args:
+            ranking: Section indices, most relevant first
+            max_tokens: Token budget for the selected sections
+
+        Returns:
+            Selected sections in document order
+        """
+        selected = []
+        used_tokens = 0
+        for i in ranking:
+            section = self.sections[i]
+            if selected and used_tokens + section["tokens"] > max_tokens:
+                continue
+            selected.append(i)
+            used_tokens += section["tokens"]
+            if used_tokens >= max_tokens:
+                break
+
+        return [self.sections[i] for i in sorted(selected)]
+
+
+def render_policy_sections(sections: List[Dict]) -> str:
+    """
+    Format selected sections as prompt context, grouped by document.
+
+    Args:
+        sections: Sections in document order
+
+    Returns:
+        Context string
+    """
+    parts = []
+    current_source = None
+    for section in sections:
+        if section["source"] != current_source:
+            current_source = section["source"]
+            parts.append(f"=== {section['title']} ({current_source}) ===")
+        parts.append(section["text"] + "\n")
+    return "\n".join(parts)
@@ -0,0 +1,291 @@
+"""
+Routing LLM provider health and selection
+Tracks the latency and error rate of each routing LLM provider (Bedrock,
+OpenAI), probes them in the background and picks one per request: the
+preferred (cheaper) provider while it is healthy and not much slower than
+the alternative, another one while it is down
+"""
+
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+from utils.metrics import Counter, Gauge
+
+load_dotenv()
+
+# Configuration
+ORCHESTRATOR_PROBE_INTERVAL = float(os.getenv("ORCHESTRATOR_PROBE_INTERVAL", "30"))  # seconds
+# Healthy providers are only probed after this long without a success, so an
+# idle deployment does not pay for a routing call per provider every interval
+ORCHESTRATOR_IDLE_PROBE_INTERVAL = float(os.getenv("ORCHESTRATOR_IDLE_PROBE_INTERVAL", "900"))  # seconds
+ORCHESTRATOR_PROBE_TIMEOUT = float(os.getenv("ORCHESTRATOR_PROBE_TIMEOUT", "10"))  # seconds
+# A provider is taken out of rotation above this recent error rate...
+ORCHESTRATOR_MAX_ERROR_RATE = float(os.getenv("ORCHESTRATOR_MAX_ERROR_RATE", "0.5"))
+# ...or when it is this many times slower than the alternative
+ORCHESTRATOR_LATENCY_RATIO = float(os.getenv("ORCHESTRATOR_LATENCY_RATIO", "2.0"))
+
+# Weight of the newest observation in the latency and error rate averages
+HEALTH_EWMA_ALPHA = 0.2
+# Consecutive failures that mark a provider down regardless of its error rate
+FAILURES_BEFORE_DOWN = 3
+
+PROVIDER_UP = Gauge("orchestrator_provider_up", "Routing LLM provider health (1 up, 0 down)", ["provider"])
+ORCHESTRATOR_CALLS = Counter("orchestrator_llm_calls", "Routing LLM calls and probes", ["provider", "kind", "status"])
+ORCHESTRATOR_FAILOVERS = Counter(
+    "orchestrator_failovers",
+    "Routing LLM calls retried on another provider after a failure",
+    ["from_provider", "to_provider"]
+)
+
+
+class ProviderHealth:
+    """
+    Recent health of one provider.
+
+    State is "unknown" until the first call or probe, "up" after a success
+    and "down" after FAILURES_BEFORE_DOWN consecutive failures, an error rate
+    above ORCHESTRATOR_MAX_ERROR_RATE or a failure while not up. A down
+    provider returns to "up" (with a clean error rate) on its next success.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "unknown"
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.consecutive_failures = 0
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        # Counters
+        self.calls = 0
+        self.failures = 0
+        self.probes = 0
+
+    def record_success(self, seconds: float) -> None:
+        if self.state != "up":
+            self.error_ewma = 0.0
+        else:
+            self.error_ewma *= 1 - HEALTH_EWMA_ALPHA
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += HEALTH_EWMA_ALPHA * (seconds - self.latency_ewma)
+        self.consecutive_failures = 0
+        self.last_success = time.monotonic()
+        self.state = "up"
+
+    def record_failure(self, error: BaseException) -> None:
+        self.error_ewma += HEALTH_EWMA_ALPHA * (1.0 - self.error_ewma)
+        self.consecutive_failures += 1
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {str(error)[:200]}"
+        if (
+            self.state != "up"
+            or self.consecutive_failures >= FAILURES_BEFORE_DOWN
+            or self.error_ewma > ORCHESTRATOR_MAX_ERROR_RATE
+        ):
+            self.state = "down"
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "latency_ms": self.latency_ewma * 1000 if self.latency_ewma is not None else None,
+            "error_rate": round(self.error_ewma, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "probes": self.probes,
+            "last_error": self.last_error
+        }
+
+
+class ProviderRouter:
+    """
+    Per-request choice between routing LLM clients.
+
+    Providers are listed in order of preference (cheapest first). Selection
+    never makes a network call: it reads the health recorded from real calls
+    and from background probes. Until a probe has confirmed any provider,
+    the default provider is used. Providers that are not up are probed every
+    probe_interval seconds, so traffic returns to the preferred provider once
+    it recovers; healthy ones only after idle_probe_interval without a
+    success, to refresh their latency.
+    """
+
+    def __init__(
+        self,
+        clients: Dict[str, Any],
+        preference: List[str],
+        default: str,
+        probe: Callable[[Any], Awaitable[Any]],
+        probe_interval: float = ORCHESTRATOR_PROBE_INTERVAL,
+        probe_timeout: float = ORCHESTRATOR_PROBE_TIMEOUT,
+        idle_probe_interval: float = ORCHESTRATOR_IDLE_PROBE_INTERVAL
+    ):
+        self.clients = {name: client for name, client in clients.items() if client is not None}
+        self.preference = [name for name in preference if name in self.clients]
+        self.default = default if default in self.clients else self.preference[0]
+        self.health = {name: ProviderHealth(name) for name in self.preference}
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.idle_probe_interval = idle_probe_interval
+
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._selected: Optional[str] = None
+        self.switches = 0
+
+    def select(self) -> str:
+        """Name of the provider to use for the next routing call."""
+        with self._lock:
+            up = [name for name in self.preference if self.health[name].state == "up"]
+            if up:
+                choice = up[0]
+                fastest = min(up, key=lambda name: self.health[name].latency_ewma or 0.0)
+                if (self.health[choice].latency_ewma or 0.0) > ORCHESTRATOR_LATENCY_RATIO * (self.health[fastest].latency_ewma or 0.0):
+                    choice = fastest
+            elif self.health[self.default].state != "down":
+                choice = self.default
+            else:
+                not_down = [name for name in self.preference if self.health[name].state != "down"]
+                choice = not_down[0] if not_down else self.default
+
+            if choice != self._selected:
+                if self._selected is not None:
+                    self.switches += 1
+                    print(f"🔀 Routing LLM switched from {self._selected} to {choice}")
+                self._selected = choice
+            return choice
+
+    def client(self) -> Any:
+        """Client of the provider to use for the next routing call."""
+        return self.clients[self.select()]
+
+    def name_of(self, client: Any) -> Optional[str]:
+        for name, candidate in self.clients.items():
+            if candidate is client:
+                return name
+        return None
+
+    def alternative(self, client: Any) -> Optional[Any]:
+        """
+        Pick a provider other than the one `client` belongs to.
+
+        Returns:
+            Client of the healthiest other provider that is not down, or None
+        """
+        current = self.name_of(client)
+        if current is None:
+            return None
+        with self._lock:
+            others = [name for name in self.preference if name != current and self.health[name].state != "down"]
+        if not others:
+            return None
+        others.sort(key=lambda name: self.health[name].state != "up")
+        return self.clients[others[0]]
+
+    def failover(self, client: Any) -> Optional[Any]:
+        """
+        Pick another provider after `client` failed a call.
+
+        Returns:
+            Client of the healthiest other provider that is not down, or None
+        """
+        fallback = self.alternative(client)
+        if fallback is not None:
+            ORCHESTRATOR_FAILOVERS.inc(from_provider=self.name_of(client), to_provider=self.name_of(fallback))
+        return fallback
+
+    def record(self, client: Any, seconds: float, error: Optional[BaseException] = None) -> None:
+        """Record the outcome of a routing call made with `client` (unknown clients are ignored)."""
+        name = self.name_of(client)
+        if name is not None:
+            self._record(name, seconds, error, kind="request")
+
+    async def probe(self, name: str) -> bool:
+        """
+        Send a health probe to one provider.
+
+        Returns:
+            True if the provider answered within probe_timeout
+        """
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._probe(self.clients[name]), timeout=self.probe_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record(name, time.perf_counter() - start, e, kind="probe")
+            return False
+        self._record(name, time.perf_counter() - start, None, kind="probe")
+        return True
+
+    async def probe_due(self) -> None:
+        """Probe every provider that is not up or has had no success for an idle probe interval."""
+        now = time.monotonic()
+        due = [
+            name for name, health in self.health.items()
+            if health.state != "up" or now - health.last_success >= self.idle_probe_interval
+        ]
+        await asyncio.gather(*[self.probe(name) for name in due])
+
+    def start_health_checks(self) -> None:
+        """Start probing providers in the background on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._health_check_loop())
+
+    async def stop_health_checks(self) -> None:
+        """Stop the background probes."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        """Return the selected provider and each provider's health."""
+        selected = self.select()
+        with self._lock:
+            return {
+                "selected": selected,
+                "preference": self.preference,
+                "switches": self.switches,
+                "probe_interval_seconds": self.probe_interval,
+                "idle_probe_interval_seconds": self.idle_probe_interval,
+                "providers": {name: health.stats() for name, health in self.health.items()}
+            }
+
+    async def _health_check_loop(self) -> None:
+        while True:
+            try:
+                await self.probe_due()
+            except Exception as e:
+                print(f"⚠️  Routing LLM health check failed: {str(e)}")
+            await asyncio.sleep(self.probe_interval)
+
+    def _record(self, name: str, seconds: float, error: Optional[BaseException], kind: str) -> None:
+        with self._lock:
+            health = self.health[name]
+            was = health.state
+            if kind == "probe":
+                health.probes += 1
+            else:
+                health.calls += 1
+            if error is None:
+                health.record_success(seconds)
+            else:
+                health.record_failure(error)
+            state = health.state
+
+        PROVIDER_UP.set(1 if state == "up" else 0, provider=name)
+        ORCHESTRATOR_CALLS.inc(provider=name, kind=kind, status="ok" if error is None else "error")
+        if state != was and was != "unknown":
+            print(f"{'✅' if state == 'up' else '⚠️ '} Routing LLM provider {name} is {state}")
@@ -0,0 +1,133 @@
+"""
+Local query classifier for the orchestrator fast path
+Multinomial naive Bayes keyword model built from the billing, technical and
+policy document corpora - classifies a message in microseconds with no API call
+"""
+
+import os
+import re
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+DATA_DIR = Path(__file__).parent.parent / "data"
+ROUTE_LABELS = ["billing", "technical", "policy"]
+
+# Minimum confidence for the fast path to skip the routing LLM (> 1 disables it)
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.9"))
+
+# File names are strong topic signals (e.g. refund_policy.txt is billing)
+FILENAME_TOKEN_WEIGHT = 20
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]+")
+STOPWORDS = frozenset("""
+    the and for you your with are our can this that from will not have has was
+    were been any all per each what how who does into out about when which their
+    they them then than also may must more such use used using only other its
+""".split())
+
+_classifier = None
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords or very short words."""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 2 and token not in STOPWORDS
+    ]
+
+
+class LocalQueryClassifier:
+    """
+    Naive Bayes classifier over the three agent document corpora.
+
+    Each label's token distribution comes from its data/<label>/*.txt files
+    (Laplace smoothed, uniform priors). Confidence is the posterior probability
+    of the best label, calibrated for the token count: naive Bayes treats the
+    words of a message as independent evidence, which makes raw posteriors
+    overconfident (a single "bug" in a billing question scored 0.965), so the
+    log scores are divided by the square root of the number of tokens.
+    """
+
+    def __init__(self, data_dir: Path = DATA_DIR, labels: List[str] = ROUTE_LABELS):
+        self.labels = labels
+        counts: Dict[str, Counter] = {}
+
+        for label in labels:
+            label_counts = Counter()
+            for doc_path in (data_dir / label).glob("*.txt"):
+                label_counts.update(tokenize(doc_path.read_text(encoding="utf-8")))
+                for token in tokenize(doc_path.stem.replace("_", " ")):
+                    label_counts[token] += FILENAME_TOKEN_WEIGHT
+            counts[label] = label_counts
+
+        vocabulary = set().union(*counts.values())
+        vocab_size = len(vocabulary)
+
+        # Precompute per-token log likelihoods: token -> {label: log P(token|label)}
+        self._log_likelihoods: Dict[str, Dict[str, float]] = {}
+        totals = {label: sum(counts[label].values()) for label in labels}
+        for token in vocabulary:
+            self._log_likelihoods[token] = {
+                label: math.log((counts[label][token] + 1) / (totals[label] + vocab_size))
+                for label in labels
+            }
+
+    def probabilities(self, message: str) -> Dict[str, float]:
+        """
+        Posterior probability of each route label.
+
+        Args:
+            message: User message
+
+        Returns:
+            Label -> calibrated probability (uniform if the message shares no
+            vocabulary with the corpora)
+        """
+        tokens = tokenize(message)
+        scores = {label: 0.0 for label in self.labels}
+        for token in tokens:
+            token_scores = self._log_likelihoods.get(token)
+            if token_scores is None:
+                continue
+            for label, log_likelihood in token_scores.items():
+                scores[label] += log_likelihood
+
+        # Softmax over log scores, tempered by sqrt(token count); unknown
+        # words count towards it, so a message is not judged on one known word
+        temperature = math.sqrt(max(1, len(tokens)))
+        best_score = max(scores.values())
+        weights = {label: math.exp((score - best_score) / temperature) for label, score in scores.items()}
+        total = sum(weights.values())
+        return {label: weight / total for label, weight in weights.items()}
+
+    def classify(self, message: str) -> Tuple[Optional[str], float]:
+        """
+        Classify a message into one of the route labels.
+
+        Args:
+            message: User message
+
+        Returns:
+            Tuple of (label, confidence); label is None if the message shares
+            no vocabulary with the corpora
+        """
+        if not any(token in self._log_likelihoods for token in tokenize(message)):
+            return None, 0.0
+
+        probabilities = self.probabilities(message)
+        best_label = max(probabilities, key=probabilities.get)
+        return best_label, probabilities[best_label]
+
+
+def get_query_classifier() -> LocalQueryClassifier:
+    """Get or build the local query classifier."""
+    global _classifier
+    if _classifier is None:
+        _classifier = LocalQueryClassifier()
+    return _classifier
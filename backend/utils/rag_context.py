@@ -0,0 +1,163 @@
+"""
+Token-budgeted RAG context assembly
+De-duplicates retrieved chunks, merges adjacent and overlapping chunks from the
+same source document, and fits the result into a token budget
+"""
+
+from typing import Dict, List, Optional
+
+from utils.token_utils import count_tokens, truncate_to_tokens
+
+
+# Shortest suffix/prefix match treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+# A block cut to fit the budget must keep at least this many tokens
+MIN_TRUNCATED_TOKENS = 64
+
+NO_RESULTS_MESSAGE = "No relevant information found in the knowledge base."
+
+
+def chunk_key(result: Dict) -> tuple:
+    """
+    Identity of a retrieved chunk.
+
+    Uses the chunk id when the engine returns one, otherwise the source
+    document with the chunk's content hash (or text).
+    """
+    if result.get("id"):
+        return ("id", result["id"])
+    metadata = result.get("metadata") or {}
+    return (
+        "content",
+        metadata.get("source_document"),
+        metadata.get("content_hash") or result["content"]
+    )
+
+
+def merge_overlapping_text(first: str, second: str) -> str:
+    """
+    Join two consecutive chunks, dropping the text they share.
+
+    Args:
+        first: Earlier chunk
+        second: Following chunk
+
+    Returns:
+        Merged text
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+
+    for size in range(min(len(first), len(second)) - 1, MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+
+    # No shared span: the splitter keeps sentence punctuation at the start
+    # of the next chunk, otherwise chunks break at paragraphs
+    if second[:1] in ".,;:":
+        return first + second
+    return first + "\n\n" + second
+
+
+def merge_chunks(results: List[Dict]) -> List[Dict]:
+    """
+    De-duplicate chunks and merge runs of adjacent chunks per source.
+
+    Args:
+        results: Retrieved chunks, most relevant first
+
+    Returns:
+        Blocks with source, content and the chunk keys they cover, ordered by
+        their most relevant chunk
+    """
+    seen = set()
+    unique = []
+    for rank, result in enumerate(results):
+        key = chunk_key(result)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append((rank, key, result))
+
+    # Group by source; chunks with consecutive chunk_index values form one block
+    by_source: Dict[str, List[tuple]] = {}
+    for rank, key, result in unique:
+        source = (result.get("metadata") or {}).get("source_document", "Unknown")
+        by_source.setdefault(source, []).append((rank, key, result))
+
+    blocks = []
+    for source, chunks in by_source.items():
+        chunks.sort(key=lambda chunk: _chunk_index(chunk[2], chunk[0]))
+        block = None
+        for rank, key, result in chunks:
+            index = _chunk_index(result, None)
+            previous_index = block["last_index"] if block is not None else None
+            if index is not None and previous_index is not None and index == previous_index + 1:
+                block["content"] = merge_overlapping_text(block["content"], result["content"])
+                block["rank"] = min(block["rank"], rank)
+                block["keys"].append(key)
+                block["last_index"] = index
+                continue
+            if block is not None and result["content"] in block["content"]:
+                # Same text stored under another id (overlapping span)
+                block["keys"].append(key)
+                continue
+
+            block = {
+                "source": source,
+                "content": result["content"],
+                "rank": rank,
+                "keys": [key],
+                "last_index": index
+            }
+            blocks.append(block)
+
+    blocks.sort(key=lambda block: block["rank"])
+    return blocks
+
+
+def build_rag_context(results: List[Dict], max_tokens: Optional[int] = None) -> str:
+    """
+    Format retrieved chunks as LLM context within a token budget.
+
+    Blocks are added in relevance order; a block that does not fit is skipped
+    in favour of smaller ones, except that the most relevant block is
+    truncated rather than dropped.
+
+    Args:
+        results: Retrieved chunks, most relevant first
+        max_tokens: Token budget for the whole context (unlimited if None)
+
+    Returns:
+        Formatted context string
+    """
+    blocks = merge_chunks(results)
+    if not blocks:
+        return NO_RESULTS_MESSAGE
+
+    context_parts = []
+    used_tokens = 0
+    for block in blocks:
+        part = f"[Source {len(context_parts) + 1}: {block['source']}]\n{block['content']}\n"
+        if max_tokens is None:
+            context_parts.append(part)
+            continue
+
+        tokens = count_tokens(part) + 1
+        if used_tokens + tokens <= max_tokens:
+            context_parts.append(part)
+            used_tokens += tokens
+        elif not context_parts and max_tokens >= MIN_TRUNCATED_TOKENS:
+            context_parts.append(truncate_to_tokens(part, max_tokens - 1).rstrip() + "\n")
+            used_tokens = max_tokens
+
+    return "\n".join(context_parts)
+
+
+def _chunk_index(result: Dict, default):
+    """Position of a chunk within its source document (default if unknown)."""
+    index = (result.get("metadata") or {}).get("chunk_index")
+    return index if isinstance(index, int) else default
@@ -0,0 +1,335 @@
+"""
+Client-side rate limiting for provider calls
+Process-wide token buckets (requests and tokens per minute) in front of the
+OpenAI chat, OpenAI embeddings and Bedrock clients, with per-call retries
+using jittered exponential backoff that honours provider retry-after hints
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import botocore.exceptions
+import openai
+from dotenv import load_dotenv
+
+from utils.metrics import Counter, Histogram
+from utils.token_utils import count_tokens
+
+load_dotenv()
+
+# Configuration: limits per process (0 = unlimited); set them to your
+# account's quota divided by the number of workers
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "150000"))
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "3000"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+BEDROCK_REQUESTS_PER_MINUTE = int(os.getenv("BEDROCK_REQUESTS_PER_MINUTE", "200"))
+BEDROCK_TOKENS_PER_MINUTE = int(os.getenv("BEDROCK_TOKENS_PER_MINUTE", "200000"))
+
+# Retries of a single failed provider call
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "3"))
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", "0.5"))
+RETRY_MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", "20"))
+
+# Seconds of traffic a bucket may absorb at once
+BURST_SECONDS = 10
+
+# Responses worth retrying (timeouts, conflicts, throttling, server errors)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+T = TypeVar("T")
+
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "provider_rate_limit_wait_seconds",
+    "Time provider calls waited for the client-side rate limiter",
+    ["provider"]
+)
+PROVIDER_RETRIES = Counter(
+    "provider_retries",
+    "Provider calls retried after a retryable error",
+    ["provider", "status"]
+)
+
+_limiters: Dict[str, "ProviderLimiter"] = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    reserve() always takes the amount and returns how long the caller must
+    wait for the bucket to cover it, so concurrent callers queue up in
+    reservation order instead of polling.
+    """
+
+    def __init__(self, per_minute: int, burst_seconds: float = BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take amount from the bucket.
+
+        Returns:
+            Seconds until the reservation is covered (0 if available now)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class ProviderLimiter:
+    """Request and token budgets of one provider, shared by every caller in the process."""
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.calls = 0
+        self.delayed_calls = 0
+        self.wait_seconds = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserve one request and an estimated number of tokens.
+
+        Returns:
+            Seconds to wait before sending the request
+        """
+        wait = 0.0
+        if self._requests is not None:
+            wait = max(wait, self._requests.reserve(1))
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+            self.calls += 1
+            if wait > 0:
+                self.delayed_calls += 1
+                self.wait_seconds += wait
+        RATE_LIMIT_WAIT_SECONDS.observe(max(wait, 0.0), provider=self.name)
+        return max(wait, 0.0)
+
+    def acquire(self, tokens: int) -> None:
+        """Block until a call may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        """Wait (without blocking the event loop) until a call may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller after the provider throttled us."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.throttled += 1
+
+    def stats(self) -> Dict:
+        """Return limits and counters."""
+        return {
+            "requests_per_minute": self.requests_per_minute or None,
+            "tokens_per_minute": self.tokens_per_minute or None,
+            "calls": self.calls,
+            "delayed_calls": self.delayed_calls,
+            "avg_wait_ms": (self.wait_seconds / self.calls) * 1000 if self.calls else 0.0,
+            "retries": self.retries,
+            "throttled": self.throttled
+        }
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """
+    Get the process-wide limiter of a provider.
+
+    Args:
+        provider: openai, embeddings or bedrock
+
+    Returns:
+        Shared ProviderLimiter
+    """
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        limits = {
+            "openai": (OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE),
+            "embeddings": (EMBEDDING_REQUESTS_PER_MINUTE, EMBEDDING_TOKENS_PER_MINUTE),
+            "bedrock": (BEDROCK_REQUESTS_PER_MINUTE, BEDROCK_TOKENS_PER_MINUTE)
+        }
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                limiter = _limiters[provider] = ProviderLimiter(provider, *limits[provider])
+    return limiter
+
+
+def get_rate_limit_stats() -> Dict:
+    """Return the stats of every limiter used so far."""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def estimate_tokens(texts: List[Any], max_output_tokens: Optional[int] = None) -> int:
+    """
+    Estimate the tokens a call will consume.
+
+    Args:
+        texts: Prompt strings or chat messages
+        max_output_tokens: Completion limit of the call (if any)
+
+    Returns:
+        Prompt tokens plus the completion limit
+    """
+    prompt_tokens = sum(
+        count_tokens(text if isinstance(text, str) else str(getattr(text, "content", text)))
+        for text in texts
+    )
+    return prompt_tokens + (max_output_tokens or 0)
+
+
+def call_with_retries(
+    provider: str,
+    call: Callable[[], T],
+    tokens: int,
+    can_retry: Callable[[], bool] = lambda: True
+) -> T:
+    """
+    Run a provider call under the provider's rate limit, retrying retryable errors.
+
+    Args:
+        provider: Limiter name (openai, embeddings, bedrock)
+        call: The provider call
+        tokens: Estimated tokens of the call
+        can_retry: Checked before retrying (e.g. nothing was streamed yet)
+
+    Returns:
+        Result of call
+    """
+    limiter = get_limiter(provider)
+    for attempt in range(PROVIDER_MAX_RETRIES + 1):
+        limiter.acquire(tokens)
+        try:
+            return call()
+        except Exception as e:
+            delay = _retry_delay(limiter, e, attempt, can_retry)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def acall_with_retries(
+    provider: str,
+    call: Callable[[], Awaitable[T]],
+    tokens: int,
+    can_retry: Callable[[], bool] = lambda: True
+) -> T:
+    """
+    Async variant of call_with_retries.
+
+    Args:
+        provider: Limiter name (openai, embeddings, bedrock)
+        call: Returns a new awaitable of the provider call on every attempt
+        tokens: Estimated tokens of the call
+        can_retry: Checked before retrying (e.g. nothing was streamed yet)
+
+    Returns:
+        Result of call
+    """
+    limiter = get_limiter(provider)
+    for attempt in range(PROVIDER_MAX_RETRIES + 1):
+        await limiter.aacquire(tokens)
+        try:
+            return await call()
+        except Exception as e:
+            delay = _retry_delay(limiter, e, attempt, can_retry)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+def _retry_delay(
+    limiter: ProviderLimiter,
+    error: Exception,
+    attempt: int,
+    can_retry: Callable[[], bool]
+) -> Optional[float]:
+    """
+    Backoff before retrying a failed call.
+
+    Returns:
+        Seconds to wait, or None if the error must be raised
+    """
+    status = _error_status(error)
+    if status is None or attempt >= PROVIDER_MAX_RETRIES or not can_retry():
+        return None
+
+    # Full jitter, but never earlier than the provider asked for
+    backoff = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+    hint = _retry_after_hint(error)
+    delay = max(backoff, hint or 0.0)
+    if status == 429:
+        # Every caller of this provider backs off, not just this one
+        limiter.pause(hint or backoff)
+
+    limiter.retries += 1
+    PROVIDER_RETRIES.inc(provider=limiter.name, status=str(status))
+    print(f"⚠️  {limiter.name} call failed ({status}), retrying in {delay:.1f}s "
+          f"(attempt {attempt + 1}/{PROVIDER_MAX_RETRIES})")
+    return delay
+
+
+def _error_status(error: Exception) -> Optional[int]:
+    """HTTP-like status of a retryable provider error, None if not retryable."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return 408
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code if error.status_code in RETRYABLE_STATUS_CODES else None
+    if isinstance(error, botocore.exceptions.ClientError):
+        if error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+            return 429
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return status if status in RETRYABLE_STATUS_CODES else None
+    if isinstance(error, (botocore.exceptions.ConnectionError, botocore.exceptions.ReadTimeoutError)):
+        return 408
+    return None
+
+
+def _retry_after_hint(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait (retry-after-ms / retry-after headers)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None and isinstance(response, dict):
+        headers = response.get("ResponseMetadata", {}).get("HTTPHeaders")
+    if not headers:
+        return None
+
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return min(float(value) * scale, RETRY_MAX_SECONDS)
+        except ValueError:
+            continue  # HTTP-date form
+    return None
@@ -0,0 +1,208 @@
+"""
+Semantic response cache
+Serves previously generated answers to semantically equivalent questions,
+keyed by agent and query embedding (cosine similarity above a threshold)
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration. Opt-in: questions that differ only in an entity ("Pro plan
+# price" vs "Basic plan price") can embed above the threshold and would be
+# served each other's answer
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "false").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))  # entries per agent
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+
+_response_cache = None
+
+
+class _AgentPartition:
+    """Cached responses of one agent: unit embedding matrix plus LRU slot order."""
+
+    def __init__(self, capacity: int, dimensions: int, version: str):
+        self.version = version
+        self.embeddings = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.in_use = np.zeros(capacity, dtype=bool)
+        self.entries: "OrderedDict[int, Dict]" = OrderedDict()  # slot -> entry, LRU first
+        self.free_slots = list(range(capacity - 1, -1, -1))
+
+
+class ResponseCache:
+    """
+    Bounded per-agent cache of generated responses.
+
+    Lookups compare the query embedding against every cached query of the
+    same agent (one matrix-vector product). Entries are tagged with the
+    corpus version they were generated from; a version change drops the
+    agent's entries. The least recently used entry is evicted when an
+    agent's partition is full.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, threshold: float = RESPONSE_CACHE_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+
+        self._partitions: Dict[str, _AgentPartition] = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lookup_seconds = 0.0
+        self.hit_request_seconds = 0.0
+        self.miss_request_seconds = 0.0
+        self.hit_requests = 0
+        self.miss_requests = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, agent: str, query_embedding: List[float], version: str) -> Optional[Dict]:
+        """
+        Find a cached response for a semantically equivalent question.
+
+        Args:
+            agent: Agent type (billing, technical, policy)
+            query_embedding: Embedding of the user's question
+            version: Current corpus version for this agent
+
+        Returns:
+            Entry with query, response and similarity, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        query = _unit_vector(query_embedding)
+
+        with self._lock:
+            entry = None
+            partition = self._get_partition(agent, version)
+            if partition is not None and partition.entries and partition.embeddings.shape[1] == len(query):
+                similarities = partition.embeddings @ query
+                similarities[~partition.in_use] = -1.0
+                slot = int(np.argmax(similarities))
+                if similarities[slot] >= self.threshold:
+                    partition.entries.move_to_end(slot)
+                    entry = dict(partition.entries[slot], similarity=float(similarities[slot]))
+
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.lookup_seconds += time.perf_counter() - start
+
+        return entry
+
+    def put(self, agent: str, query: str, query_embedding: List[float], response: str, version: str) -> None:
+        """
+        Cache a generated response.
+
+        Args:
+            agent: Agent type (billing, technical, policy)
+            query: User's question
+            query_embedding: Embedding of the question
+            response: Generated response
+            version: Corpus version the response was generated from
+        """
+        if not self.enabled:
+            return
+
+        vector = _unit_vector(query_embedding)
+
+        with self._lock:
+            partition = self._get_partition(agent, version)
+            if partition is None or partition.embeddings.shape[1] != len(vector):
+                partition = _AgentPartition(self.max_entries, len(vector), version)
+                self._partitions[agent] = partition
+
+            # Equivalent question already cached: refresh it in place
+            if partition.entries:
+                similarities = partition.embeddings @ vector
+                similarities[~partition.in_use] = -1.0
+                slot = int(np.argmax(similarities))
+                if similarities[slot] >= self.threshold:
+                    partition.entries.pop(slot)
+                    partition.free_slots.append(slot)
+
+            if not partition.free_slots:
+                slot, _ = partition.entries.popitem(last=False)
+                partition.free_slots.append(slot)
+                self.evictions += 1
+
+            slot = partition.free_slots.pop()
+            partition.embeddings[slot] = vector
+            partition.in_use[slot] = True
+            partition.entries[slot] = {"query": query, "response": response, "version": version}
+            self.stores += 1
+
+    def record_request(self, hit: bool, seconds: float) -> None:
+        """Record the end-to-end latency of a request served from (or past) the cache."""
+        with self._lock:
+            if hit:
+                self.hit_requests += 1
+                self.hit_request_seconds += seconds
+            else:
+                self.miss_requests += 1
+                self.miss_request_seconds += seconds
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._partitions.clear()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and latencies."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": sum(len(partition.entries) for partition in self._partitions.values()),
+            "max_entries_per_agent": self.max_entries,
+            "similarity_threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "avg_lookup_ms": (self.lookup_seconds / lookups) * 1000 if lookups else 0.0,
+            "avg_hit_request_ms": (self.hit_request_seconds / self.hit_requests) * 1000 if self.hit_requests else 0.0,
+            "avg_miss_request_ms": (self.miss_request_seconds / self.miss_requests) * 1000 if self.miss_requests else 0.0
+        }
+
+    def _get_partition(self, agent: str, version: str) -> Optional[_AgentPartition]:
+        # Caller must hold the lock
+        partition = self._partitions.get(agent)
+        if partition is not None and partition.version != version:
+            print(f"🔄 Response cache for {agent} invalidated (corpus version {version})")
+            del self._partitions[agent]
+            self.invalidations += 1
+            return None
+        return partition
+
+
+def _unit_vector(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the process-wide response cache (disabled unless RESPONSE_CACHE=true)."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE if RESPONSE_CACHE else 0)
+    return _response_cache
@@ -4,12 +4,28 @@ Handles ChromaDB queries and document caching
 """
 
 import os
+import json
+import re
+import time
+import hashlib
+import asyncio
+import threading
+import contextvars
 from typing import List, Dict, Optional
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings
 from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
+from models.schemas import AgentState
+from utils.async_utils import run_blocking
+from utils.embedding_cache import EmbeddingCache
+from utils.metrics import time_stage
+from utils.rate_limiter import call_with_retries, acall_with_retries, estimate_tokens
+from utils.rag_context import build_rag_context, chunk_key
+from utils.policy_index import PolicySectionIndex, render_policy_sections, split_policy_sections
+from utils.token_utils import count_tokens
+from utils.vector_index import NumpyVectorIndex
 
 load_dotenv()
 
@@ -17,12 +33,81 @@ load_dotenv()
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
 COLLECTION_NAME = "customer_service_docs"
 TOP_K = 5  # Number of chunks to retrieve
+CORPUS_VERSION_FILE = Path(CHROMA_PERSIST_DIR) / "corpus_version.json"
+
+# Retrieval engine: "chroma" (query the collection) or "numpy" (in-process exact
+# search over the matrices exported by ingest_data.py)
+RETRIEVAL_ENGINE = os.getenv("RETRIEVAL_ENGINE", "chroma")
+VECTOR_INDEX_DIR = Path(os.getenv("VECTOR_INDEX_DIR", str(Path(CHROMA_PERSIST_DIR) / "vector_index")))
+
+# Policy CAG corpus (held in memory, re-checked for file changes at most this often)
+POLICY_DATA_DIR = Path(__file__).parent.parent / "data" / "policy"
+POLICY_RELOAD_INTERVAL = float(os.getenv("POLICY_RELOAD_INTERVAL", "5"))
+
+# Policy agent context: token budget for the selected sections, and whether
+# sections are also ranked by embedding similarity (one query embedding call)
+POLICY_CONTEXT_TOKENS = int(os.getenv("POLICY_CONTEXT_TOKENS", "1200"))
+POLICY_SECTION_EMBEDDINGS = os.getenv("POLICY_SECTION_EMBEDDINGS", "true").lower() == "true"
+
+# Keyword score added to every section of a file per curated keyword match
+POLICY_FILE_KEYWORD_BOOST = 1.0
+
+# Policy file mapping with keywords (smart selection)
+POLICY_KEYWORDS = {
+    'privacy_policy.txt': ['privacy', 'personal data', 'personal information', 'data collection', 'private'],
+    'gdpr_data_processing.txt': ['gdpr', 'processing', 'data processing', 'lawful basis', 'consent', 'legitimate interest'],
+    'gdpr_data_rights.txt': ['gdpr', 'rights', 'data rights', 'access', 'deletion', 'portability', 'rectification', 'erasure'],
+    'terms_of_service.txt': ['terms', 'service', 'agreement', 'use', 'account', 'termination', 'liability'],
+    'cookie_policy.txt': ['cookie', 'cookies', 'tracking', 'analytics', 'browser'],
+    'acceptable_use_policy.txt': ['acceptable', 'prohibited', 'restrictions', 'abuse', 'misuse', 'violation']
+}
+
+# Single compiled matcher for all policy keywords (longest alternative first)
+_ALL_POLICY_KEYWORDS = sorted({kw for kws in POLICY_KEYWORDS.values() for kw in kws}, key=len, reverse=True)
+_POLICY_KEYWORD_PATTERN = re.compile("(?=(" + "|".join(re.escape(kw) for kw in _ALL_POLICY_KEYWORDS) + "))")
+_POLICY_KEYWORD_PREFIXES = {
+    kw: {other for other in _ALL_POLICY_KEYWORDS if kw.startswith(other)}
+    for kw in _ALL_POLICY_KEYWORDS
+}
+BILLING_GENERAL_QUERY = "pricing plans billing policy payment subscription"
+
+# Per-agent RAG context budgets (tokens); the shared general billing context
+# takes up to half of the billing budget
+BILLING_CONTEXT_TOKENS = int(os.getenv("BILLING_CONTEXT_TOKENS", "1200"))
+TECHNICAL_CONTEXT_TOKENS = int(os.getenv("TECHNICAL_CONTEXT_TOKENS", "1200"))
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Query embedding cache (set EMBEDDING_CACHE_PATH empty to keep it memory-only)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "20000"))  # ~6 KB per 1536-d vector
 
 # Initialize global instances
 _embeddings = None
 _chroma_client = None
 _collection = None
-_policy_cache = None
+_policy_cache = None  # All policies combined
+_policy_documents = {}  # filename -> {"mtime": ..., "rendered": ..., "sections": ...}
+_policy_section_index = None
+_policy_version = None  # Changes whenever a policy file is added, edited or removed
+_policy_checked_at = None
+_policy_lock = threading.Lock()
+_policy_embedding_lock = threading.Lock()
+_embedding_cache = None
+_vector_index = None
+_corpus_version = None  # (version file mtime, version)
+_billing_general_context = None  # {"version": ..., "context": ...}
+_billing_context_lock = threading.Lock()
+_billing_context_rebuild = None  # (version, asyncio.Task) of the in-flight async rebuild
+
+# Embedding calls made during the current user turn (see track_embedding_calls)
+_turn_embedding_calls = contextvars.ContextVar("turn_embedding_calls", default=None)
+EMBEDDING_TURN_STATS = {
+    "turns": 0,
+    "embedding_calls": 0,
+    "max_calls_per_turn": 0,
+    "turns_over_budget": 0  # turns with more than one embedding call
+}
 
 
 def get_embeddings() -> OpenAIEmbeddings:
@@ -30,12 +115,159 @@ def get_embeddings() -> OpenAIEmbeddings:
     global _embeddings
     if _embeddings is None:
         _embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            openai_api_key=os.getenv("OPENAI_API_KEY")
+            model=EMBEDDING_MODEL,
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0  # Retried per call behind the shared rate limiter
         )
     return _embeddings
 
 
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the query embedding cache."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            max_entries=EMBEDDING_CACHE_SIZE,
+            path=EMBEDDING_CACHE_PATH,
+            max_disk_entries=EMBEDDING_CACHE_DISK_SIZE
+        )
+    return _embedding_cache
+
+
+def embed_query(query: str) -> List[float]:
+    """
+    Embed a query, reusing cached vectors for previously seen text.
+    
+    Args:
+        query: Query text
+        
+    Returns:
+        Embedding vector
+    """
+    _count_embedding_call(query)
+    
+    cache = get_embedding_cache()
+    vector = cache.get(EMBEDDING_MODEL, query)
+    if vector is None:
+        with time_stage("embedding"):
+            vector = call_with_retries("embeddings", lambda: get_embeddings().embed_query(query), estimate_tokens([query]))
+        cache.put(EMBEDDING_MODEL, query, vector)
+    return vector
+
+
+async def aembed_query(query: str) -> List[float]:
+    """
+    Async variant of embed_query (disk cache access runs on the bounded executor).
+    
+    Args:
+        query: Query text
+        
+    Returns:
+        Embedding vector
+    """
+    _count_embedding_call(query)
+    
+    cache = get_embedding_cache()
+    if cache.path:
+        vector = await run_blocking(cache.get, EMBEDDING_MODEL, query)
+    else:
+        vector = cache.get(EMBEDDING_MODEL, query)
+    
+    if vector is None:
+        with time_stage("embedding"):
+            vector = await acall_with_retries("embeddings", lambda: get_embeddings().aembed_query(query), estimate_tokens([query]))
+        if cache.path:
+            await run_blocking(cache.put, EMBEDDING_MODEL, query, vector)
+        else:
+            cache.put(EMBEDDING_MODEL, query, vector)
+    return vector
+
+
+def track_embedding_calls() -> Dict:
+    """
+    Start counting embedding calls for the current user turn.
+    
+    The counter is carried by a context variable, so calls made in graph
+    nodes, executor threads and background tasks of the turn are included.
+    
+    Returns:
+        Counter dict ({"calls": ..., "queries": [...]}) updated in place
+    """
+    counter = {"calls": 0, "queries": []}
+    _turn_embedding_calls.set(counter)
+    return counter
+
+
+def record_turn_embedding_calls(counter: Dict) -> None:
+    """
+    Add a finished turn's embedding calls to EMBEDDING_TURN_STATS.
+    
+    Args:
+        counter: Counter returned by track_embedding_calls
+    """
+    calls = counter["calls"]
+    EMBEDDING_TURN_STATS["turns"] += 1
+    EMBEDDING_TURN_STATS["embedding_calls"] += calls
+    EMBEDDING_TURN_STATS["max_calls_per_turn"] = max(EMBEDDING_TURN_STATS["max_calls_per_turn"], calls)
+    if calls > 1:
+        EMBEDDING_TURN_STATS["turns_over_budget"] += 1
+        print(f"⚠️  {calls} embedding calls in one turn (expected at most 1): {counter['queries']}")
+
+
+def get_embedding_turn_stats() -> Dict:
+    """Return per-turn embedding call statistics."""
+    turns = EMBEDDING_TURN_STATS["turns"]
+    return {
+        **EMBEDDING_TURN_STATS,
+        "avg_calls_per_turn": EMBEDDING_TURN_STATS["embedding_calls"] / turns if turns else 0.0
+    }
+
+
+def _count_embedding_call(query: str) -> None:
+    counter = _turn_embedding_calls.get()
+    if counter is not None:
+        counter["calls"] += 1
+        counter["queries"].append(query)
+
+
+def get_query_embedding(state: AgentState) -> Optional[List[float]]:
+    """
+    Embedding of the state's current message, computed at most once per turn.
+    
+    The vector is stored on the state so later stages reuse it.
+    
+    Args:
+        state: Current agent state
+        
+    Returns:
+        Embedding vector, or None if embedding failed
+    """
+    if state.query_embedding is None and state.current_message:
+        try:
+            state.query_embedding = embed_query(state.current_message)
+        except Exception as e:
+            print(f"Error embedding query: {str(e)}")
+    return state.query_embedding
+
+
+async def aget_query_embedding(state: AgentState) -> Optional[List[float]]:
+    """
+    Async variant of get_query_embedding.
+    
+    Args:
+        state: Current agent state
+        
+    Returns:
+        Embedding vector, or None if embedding failed
+    """
+    if state.query_embedding is None and state.current_message:
+        try:
+            state.query_embedding = await aembed_query(state.current_message)
+        except Exception as e:
+            print(f"Error embedding query: {str(e)}")
+    return state.query_embedding
+
+
 def get_chroma_client():
     """Get or create ChromaDB client."""
     global _chroma_client
@@ -56,58 +288,226 @@ def get_collection():
     return _collection
 
 
+def get_vector_index() -> NumpyVectorIndex:
+    """Get or load the in-process vector index (memory-mapped)."""
+    global _vector_index
+    if _vector_index is None:
+        _vector_index = NumpyVectorIndex(VECTOR_INDEX_DIR)
+        print(f"✓ Loaded NumPy vector index ({len(_vector_index)} chunks)")
+    return _vector_index
+
+
 def query_rag(
     query: str,
     document_type: Optional[str] = None,
-    top_k: int = TOP_K
+    top_k: int = TOP_K,
+    query_embedding: Optional[List[float]] = None
 ) -> List[Dict]:
     """
-    Query ChromaDB for relevant documents (Pure RAG).
+    Query the vector store for relevant documents (Pure RAG).
     
     Args:
         query: User query text
         document_type: Filter by document type (billing, technical, policy)
         top_k: Number of results to return
+        query_embedding: Precomputed embedding of the query (embedded if None)
         
     Returns:
         List of relevant document chunks with metadata
     """
     try:
-        # Get embeddings and collection
-        embeddings = get_embeddings()
-        collection = get_collection()
+        # Generate query embedding (cached) unless the caller has it
+        if query_embedding is None:
+            query_embedding = embed_query(query)
+        
+        return search_by_vector(query_embedding, document_type, top_k)
+        
+    except Exception as e:
+        print(f"Error querying RAG: {str(e)}")
+        return []
+
+
+async def aquery_rag(
+    query: str,
+    document_type: Optional[str] = None,
+    top_k: int = TOP_K,
+    query_embedding: Optional[List[float]] = None
+) -> List[Dict]:
+    """
+    Async variant of query_rag.
+    
+    The query embedding uses the client's native async API; a ChromaDB
+    query (blocking sqlite/HNSW) runs on the bounded executor.
+    
+    Args:
+        query: User query text
+        document_type: Filter by document type (billing, technical, policy)
+        top_k: Number of results to return
+        query_embedding: Precomputed embedding of the query (embedded if None)
+        
+    Returns:
+        List of relevant document chunks with metadata
+    """
+    try:
+        # Generate query embedding (cached) unless the caller has it
+        if query_embedding is None:
+            query_embedding = await aembed_query(query)
         
-        # Generate query embedding
-        query_embedding = embeddings.embed_query(query)
+        if RETRIEVAL_ENGINE == "numpy":
+            # Exact in-memory search over a few hundred rows takes microseconds
+            return search_by_vector(query_embedding, document_type, top_k)
         
-        # Prepare filter if document type specified
-        where_filter = None
-        if document_type:
-            where_filter = {"document_type": document_type}
+        # Query ChromaDB off the event loop
+        return await run_blocking(search_by_vector, query_embedding, document_type, top_k)
         
-        # Query ChromaDB
+    except Exception as e:
+        print(f"Error querying RAG: {str(e)}")
+        return []
+
+
+def search_by_vector(
+    query_embedding: List[float],
+    document_type: Optional[str] = None,
+    top_k: int = TOP_K
+) -> List[Dict]:
+    """
+    Find the chunks nearest to a query embedding with the configured engine.
+    
+    Args:
+        query_embedding: Query vector
+        document_type: Filter by document type (billing, technical, policy)
+        top_k: Number of results to return
+        
+    Returns:
+        List of relevant document chunks with metadata
+    """
+    # Drops the cached index / collection handle after a re-ingest
+    get_corpus_version()
+    
+    if RETRIEVAL_ENGINE == "numpy":
+        with time_stage("numpy_query"):
+            return get_vector_index().query(query_embedding, document_type=document_type, top_k=top_k)
+    
+    collection = get_collection()
+    
+    # Prepare filter if document type specified
+    where_filter = None
+    if document_type:
+        where_filter = {"document_type": document_type}
+    
+    # Query ChromaDB
+    with time_stage("chroma_query"):
         results = collection.query(
             query_embeddings=[query_embedding],
             n_results=top_k,
             where=where_filter,
             include=["documents", "metadatas", "distances"]
         )
+    
+    return _format_query_results(results)
+
+
+def _format_query_results(results: Dict) -> List[Dict]:
+    """Convert a raw ChromaDB query response into query_rag's result format."""
+    formatted_results = []
+    if results['documents'] and len(results['documents'][0]) > 0:
+        for i in range(len(results['documents'][0])):
+            formatted_results.append({
+                "id": results['ids'][0][i],
+                "content": results['documents'][0][i],
+                "metadata": results['metadatas'][0][i],
+                "distance": results['distances'][0][i]
+            })
+    
+    return formatted_results
+
+
+def _refresh_policy_corpus(force: bool = False) -> None:
+    """
+    Keep every policy file in memory, pre-rendered with its header and
+    split into sections for the section index.
+    
+    At most once per POLICY_RELOAD_INTERVAL the files' mtimes are checked;
+    only added, changed or removed files are re-read.
+    
+    Args:
+        force: Check mtimes regardless of the reload interval
+    """
+    global _policy_cache, _policy_checked_at, _policy_section_index, _policy_version
+    
+    now = time.monotonic()
+    if not force and _policy_checked_at is not None and now - _policy_checked_at < POLICY_RELOAD_INTERVAL:
+        return
+    
+    with _policy_lock:
+        if not force and _policy_checked_at is not None and time.monotonic() - _policy_checked_at < POLICY_RELOAD_INTERVAL:
+            return
+        
+        changed = False
+        current_files = set()
+        for policy_file in POLICY_DATA_DIR.glob("*.txt"):
+            current_files.add(policy_file.name)
+            mtime = policy_file.stat().st_mtime_ns
+            entry = _policy_documents.get(policy_file.name)
+            if entry is not None and entry["mtime"] == mtime:
+                continue
+            
+            with open(policy_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            _policy_documents[policy_file.name] = {
+                "mtime": mtime,
+                "rendered": f"=== {policy_file.stem} ===\n{content}\n",
+                "sections": split_policy_sections(policy_file.name, content)
+            }
+            changed = True
         
-        # Format results
-        formatted_results = []
-        if results['documents'] and len(results['documents'][0]) > 0:
-            for i in range(len(results['documents'][0])):
-                formatted_results.append({
-                    "content": results['documents'][0][i],
-                    "metadata": results['metadatas'][0][i],
-                    "distance": results['distances'][0][i]
-                })
+        for removed_file in set(_policy_documents) - current_files:
+            del _policy_documents[removed_file]
+            changed = True
         
-        return formatted_results
+        if changed or _policy_cache is None:
+            _policy_cache = "\n".join(entry["rendered"] for entry in _policy_documents.values())
+            _policy_version = hashlib.sha256(json.dumps(
+                sorted((name, entry["mtime"]) for name, entry in _policy_documents.items())
+            ).encode("utf-8")).hexdigest()[:16]
+            _policy_section_index = PolicySectionIndex([
+                section for entry in _policy_documents.values() for section in entry["sections"]
+            ])
+            print(f"✓ Loaded {len(_policy_documents)} policy documents ({len(_policy_section_index)} sections) into CAG cache")
         
-    except Exception as e:
-        print(f"Error querying RAG: {str(e)}")
-        return []
+        _policy_checked_at = time.monotonic()
+
+
+def _match_policy_keywords(query_lower: str) -> set:
+    """
+    Find every policy keyword contained in the query with one regex scan.
+    
+    The lookahead pattern reports the longest keyword starting at each
+    position; shorter keywords starting there are its prefixes, so adding
+    those gives exactly the keywords a substring test would find.
+    
+    Args:
+        query_lower: Lowercased query
+        
+    Returns:
+        Set of matched keywords
+    """
+    matched = set()
+    for match in _POLICY_KEYWORD_PATTERN.finditer(query_lower):
+        matched.update(_POLICY_KEYWORD_PREFIXES[match.group(1)])
+    return matched
+
+
+def _score_policy_files(query: str) -> Dict[str, int]:
+    """Count the curated keywords each policy file matches in the query."""
+    matched_keywords = _match_policy_keywords(query.lower())
+    
+    match_scores = {}
+    for policy_file, keywords in POLICY_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in matched_keywords)
+        if score > 0:
+            match_scores[policy_file] = score
+    return match_scores
 
 
 def load_policy_documents(query: Optional[str] = None) -> str:
@@ -115,58 +515,27 @@ def load_policy_documents(query: Optional[str] = None) -> str:
     Load policy documents into memory for CAG (Context-Augmented Generation).
     With smart selection: only loads relevant policies based on query keywords.
     
+    All files are held in memory (refreshed when their mtime changes), so
+    assembling the context does no disk reads.
+    
     Args:
         query: User query to determine relevant policies (optional)
     
     Returns:
         Combined text of relevant policy documents
     """
-    global _policy_cache
-    
     try:
-        # Path to policy documents
-        data_dir = Path(__file__).parent.parent / "data" / "policy"
+        _refresh_policy_corpus()
         
-        # If no query, load all documents (for initial cache)
+        # If no query, return all documents
         if query is None:
-            # Return cached version if available
-            if _policy_cache is not None:
-                return _policy_cache
-            
-            # Load all policy documents
-            policy_docs = []
-            for policy_file in data_dir.glob("*.txt"):
-                with open(policy_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    policy_docs.append(f"=== {policy_file.stem} ===\n{content}\n")
-            
-            # Combine all documents
-            _policy_cache = "\n".join(policy_docs)
-            print(f"✓ Loaded {len(policy_docs)} policy documents into CAG cache")
-            
             return _policy_cache
         
         # Smart selection based on query keywords
-        query_lower = query.lower()
-        
-        # Policy file mapping with keywords
-        policy_keywords = {
-            'privacy_policy.txt': ['privacy', 'personal data', 'personal information', 'data collection', 'private'],
-            'gdpr_data_processing.txt': ['gdpr', 'processing', 'data processing', 'lawful basis', 'consent', 'legitimate interest'],
-            'gdpr_data_rights.txt': ['gdpr', 'rights', 'data rights', 'access', 'deletion', 'portability', 'rectification', 'erasure'],
-            'terms_of_service.txt': ['terms', 'service', 'agreement', 'use', 'account', 'termination', 'liability'],
-            'cookie_policy.txt': ['cookie', 'cookies', 'tracking', 'analytics', 'browser'],
-            'acceptable_use_policy.txt': ['acceptable', 'prohibited', 'restrictions', 'abuse', 'misuse', 'violation']
-        }
+        match_scores = _score_policy_files(query)
         
         # Determine which policies are relevant
         relevant_policies = []
-        match_scores = {}
-        
-        for policy_file, keywords in policy_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in query_lower)
-            if score > 0:
-                match_scores[policy_file] = score
         
         # If we have matches, use top matches
         if match_scores:
@@ -182,20 +551,18 @@ def load_policy_documents(query: Optional[str] = None) -> str:
                     break
         else:
             # No clear matches - use all policies (fallback)
-            relevant_policies = list(policy_keywords.keys())
+            relevant_policies = list(POLICY_KEYWORDS.keys())
         
-        # Load selected policies
-        policy_docs = []
-        for policy_file in relevant_policies:
-            policy_path = data_dir / policy_file
-            if policy_path.exists():
-                with open(policy_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    policy_docs.append(f"=== {policy_path.stem} ===\n{content}\n")
+        # Assemble selected policies from memory
+        policy_docs = [
+            _policy_documents[policy_file]["rendered"]
+            for policy_file in relevant_policies
+            if policy_file in _policy_documents
+        ]
         
         # Combine selected documents
         result = "\n".join(policy_docs)
-        print(f"   ✓ Selected {len(policy_docs)}/{len(policy_keywords)} relevant policies (Smart CAG)")
+        print(f"   ✓ Selected {len(policy_docs)}/{len(POLICY_KEYWORDS)} relevant policies (Smart CAG)")
         
         return result
         
@@ -204,108 +571,486 @@ def load_policy_documents(query: Optional[str] = None) -> str:
         return ""
 
 
-def format_rag_context(results: List[Dict]) -> str:
+async def aload_policy_documents(query: Optional[str] = None) -> str:
+    """
+    Async variant of load_policy_documents.
+    
+    Runs inline when the in-memory corpus is fresh; file reloads happen on
+    the bounded executor so disk I/O never blocks the event loop.
+    
+    Args:
+        query: User query to determine relevant policies (optional)
+    
+    Returns:
+        Combined text of relevant policy documents
+    """
+    if _policy_checked_at is None or time.monotonic() - _policy_checked_at >= POLICY_RELOAD_INTERVAL:
+        await run_blocking(_refresh_policy_corpus)
+    return load_policy_documents(query)
+
+
+def get_policy_version() -> str:
+    """
+    Return the version of the in-memory policy corpus (derived from the
+    policy files' names and mtimes).
+    
+    Returns:
+        Policy corpus version identifier
+    """
+    _refresh_policy_corpus()
+    return _policy_version
+
+
+async def aget_policy_version() -> str:
+    """
+    Async variant of get_policy_version.
+    
+    Returns:
+        Policy corpus version identifier
+    """
+    if _policy_checked_at is None or time.monotonic() - _policy_checked_at >= POLICY_RELOAD_INTERVAL:
+        await run_blocking(_refresh_policy_corpus)
+    return _policy_version
+
+
+def format_rag_context(results: List[Dict], max_tokens: Optional[int] = None) -> str:
     """
     Format RAG results into context string for LLM.
     
+    Duplicate chunks are dropped and adjacent chunks from the same source are
+    merged (without their overlap) before the token budget is applied.
+    
     Args:
         results: List of document chunks from query_rag
+        max_tokens: Token budget for the context (unlimited if None)
         
     Returns:
         Formatted context string
     """
-    if not results:
-        return "No relevant information found in the knowledge base."
+    return build_rag_context(results, max_tokens=max_tokens)
+
+
+def get_corpus_version() -> str:
+    """
+    Return the version of the ingested corpus.
+    
+    ingest_data.py writes a new version file on every ingestion. When its mtime
+    changes, the cached collection handle, the NumPy vector index and the
+    shared billing context are dropped so the next request (every vector
+    search checks the version) picks up the re-ingested data.
+    
+    Returns:
+        Corpus version identifier ("unversioned" if no version file exists)
+    """
+    global _corpus_version, _collection, _vector_index, _billing_general_context
+    
+    try:
+        mtime = os.stat(CORPUS_VERSION_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    
+    if _corpus_version is not None and _corpus_version[0] == mtime:
+        return _corpus_version[1]
+    
+    version = "unversioned"
+    if mtime is not None:
+        try:
+            with open(CORPUS_VERSION_FILE, 'r', encoding='utf-8') as f:
+                version = json.load(f)["version"]
+        except Exception as e:
+            print(f"Error reading corpus version: {str(e)}")
+    
+    if _corpus_version is not None:
+        print(f"🔄 Corpus version changed to {version}, invalidating shared caches")
+        _collection = None
+        _vector_index = None
+        _billing_general_context = None
+    
+    _corpus_version = (mtime, version)
+    return version
+
+
+def get_general_billing_context() -> Dict:
+    """
+    Get the shared general billing context (CAG part of the hybrid strategy).
+    
+    Built once per corpus version from a fixed general billing query and shared
+    by every session.
+    
+    Returns:
+        Dictionary with version and context
+    """
+    global _billing_general_context
     
-    context_parts = []
-    for i, result in enumerate(results, 1):
-        source = result['metadata'].get('source_document', 'Unknown')
-        content = result['content']
-        context_parts.append(f"[Source {i}: {source}]\n{content}\n")
+    version = get_corpus_version()
+    shared = _billing_general_context
+    if shared is not None and shared["version"] == version:
+        return shared
     
-    return "\n".join(context_parts)
+    with _billing_context_lock:
+        shared = _billing_general_context
+        if shared is not None and shared["version"] == version:
+            return shared
+        
+        # The shared query's embedding is not part of the requesting turn
+        token = _turn_embedding_calls.set(None)
+        try:
+            results = query_rag(BILLING_GENERAL_QUERY, document_type="billing", top_k=5)
+        finally:
+            _turn_embedding_calls.reset(token)
+        return _store_general_billing_context(version, results)
 
 
-def get_billing_context(query: str, cached_info: Optional[str] = None) -> Dict:
+async def aget_general_billing_context() -> Dict:
+    """
+    Async variant of get_general_billing_context.
+    
+    Concurrent callers share a single rebuild per corpus version, so a
+    re-ingest triggers one retrieval rather than one per waiting request.
+    
+    Returns:
+        Dictionary with version and context
+    """
+    global _billing_context_rebuild
+    
+    version = get_corpus_version()
+    shared = _billing_general_context
+    if shared is not None and shared["version"] == version:
+        return shared
+    
+    loop = asyncio.get_running_loop()
+    rebuild = _billing_context_rebuild
+    if rebuild is None or rebuild[0] != version or rebuild[1].done() or rebuild[1].get_loop() is not loop:
+        rebuild = (version, loop.create_task(_arebuild_general_billing_context(version)))
+        _billing_context_rebuild = rebuild
+    
+    # Shielded: a cancelled (disconnected) request must not cancel the other waiters' rebuild
+    return await asyncio.shield(rebuild[1])
+
+
+async def _arebuild_general_billing_context(version: str) -> Dict:
+    global _billing_context_rebuild
+    
+    # Runs in its own task; the shared query's embedding is not part of any turn
+    _turn_embedding_calls.set(None)
+    try:
+        results = await aquery_rag(BILLING_GENERAL_QUERY, document_type="billing", top_k=5)
+        return _store_general_billing_context(version, results)
+    finally:
+        if _billing_context_rebuild is not None and _billing_context_rebuild[0] == version:
+            _billing_context_rebuild = None
+
+
+def _store_general_billing_context(version: str, results: List[Dict]) -> Dict:
+    """Format and share the general billing context (failed retrievals are not shared)."""
+    global _billing_general_context
+    
+    context = format_rag_context(results, max_tokens=BILLING_CONTEXT_TOKENS // 2)
+    shared = {
+        "version": version,
+        "context": context,
+        "tokens": count_tokens(context),
+        "chunk_keys": {chunk_key(result) for result in results}
+    }
+    if results:
+        _billing_general_context = shared
+        print(f"✓ Built shared general billing context (corpus version {version})")
+    return shared
+
+
+def warm_billing_context() -> None:
+    """Precompute the shared general billing context (called at startup)."""
+    get_general_billing_context()
+
+
+def warm_policy_sections() -> None:
+    """Load the policy corpus and embed its sections (called at startup)."""
+    _refresh_policy_corpus(force=True)
+    if POLICY_SECTION_EMBEDDINGS:
+        _embed_policy_sections(_policy_section_index)
+
+
+def get_billing_context(
+    query: str,
+    context_version: Optional[str] = None,
+    query_embedding: Optional[List[float]] = None
+) -> Dict:
     """
     Get context for billing queries using Hybrid RAG/CAG strategy.
     
-    On first query: Perform RAG and cache general billing info
-    On subsequent queries: Use cached info (CAG) + RAG for specific details
+    Combines the shared general billing info (CAG) with RAG for the specific
+    question.
     
     Args:
         query: User query
-        cached_info: Previously cached billing information
+        context_version: Shared context version the session used last (if any)
+        query_embedding: Precomputed embedding of the query (embedded if None)
         
     Returns:
-        Dictionary with context and cache_update
+        Dictionary with context, context_version and whether it was reused
     """
     try:
         # Always query for specific information
-        rag_results = query_rag(query, document_type="billing", top_k=3)
-        rag_context = format_rag_context(rag_results)
-        
-        if cached_info is None:
-            # First query: Build cache from general billing documents
-            general_query = "pricing plans billing policy payment subscription"
-            cache_results = query_rag(general_query, document_type="billing", top_k=5)
-            cache_context = format_rag_context(cache_results)
-            
-            # Combine for response and save cache
-            combined_context = f"General Billing Information (Cached):\n{cache_context}\n\nSpecific Information:\n{rag_context}"
-            
-            return {
-                "context": combined_context,
-                "cache_update": cache_context
-            }
-        else:
-            # Subsequent queries: Use cache + RAG
-            combined_context = f"General Billing Information (Cached):\n{cached_info}\n\nSpecific Information:\n{rag_context}"
+        rag_results = query_rag(query, document_type="billing", top_k=3, query_embedding=query_embedding)
+        general = get_general_billing_context()
+        
+        return _build_billing_context(rag_results, general, context_version)
             
-            return {
-                "context": combined_context,
-                "cache_update": None  # No update needed
-            }
+    except Exception as e:
+        print(f"Error in hybrid RAG/CAG: {str(e)}")
+        return {
+            "context": "Error retrieving billing information.",
+            "context_version": context_version,
+            "reused": False
+        }
+
+
+async def aget_billing_context(
+    query: str,
+    context_version: Optional[str] = None,
+    query_embedding: Optional[List[float]] = None
+) -> Dict:
+    """
+    Async variant of get_billing_context.
+    
+    Args:
+        query: User query
+        context_version: Shared context version the session used last (if any)
+        query_embedding: Precomputed embedding of the query (embedded if None)
+        
+    Returns:
+        Dictionary with context, context_version and whether it was reused
+    """
+    try:
+        rag_results, general = await asyncio.gather(
+            aquery_rag(query, document_type="billing", top_k=3, query_embedding=query_embedding),
+            aget_general_billing_context()
+        )
+        
+        return _build_billing_context(rag_results, general, context_version)
             
     except Exception as e:
         print(f"Error in hybrid RAG/CAG: {str(e)}")
         return {
             "context": "Error retrieving billing information.",
-            "cache_update": None
+            "context_version": context_version,
+            "reused": False
         }
 
 
-def get_technical_context(query: str) -> str:
+def _build_billing_context(
+    rag_results: List[Dict],
+    general: Dict,
+    context_version: Optional[str]
+) -> Dict:
+    """
+    Combine specific RAG results with the shared general billing info.
+    
+    Args:
+        rag_results: Results for the user's specific query
+        general: Shared general billing context (version + context)
+        context_version: Shared context version the session used last (if any)
+        
+    Returns:
+        Dictionary with context, context_version and whether it was reused
+    """
+    # Chunks already in the shared general context are not repeated
+    specific_results = [result for result in rag_results if chunk_key(result) not in general["chunk_keys"]]
+    if rag_results and not specific_results:
+        rag_context = "Covered by the general billing information above."
+    else:
+        rag_context = format_rag_context(
+            specific_results,
+            max_tokens=max(BILLING_CONTEXT_TOKENS - general["tokens"], 0)
+        )
+    combined_context = f"General Billing Information (Cached):\n{general['context']}\n\nSpecific Information:\n{rag_context}"
+    
+    return {
+        "context": combined_context,
+        "context_version": general["version"],
+        "reused": context_version == general["version"]
+    }
+
+
+def get_technical_context(query: str, query_embedding: Optional[List[float]] = None) -> str:
     """
     Get context for technical queries using Pure RAG.
     Always queries the database for latest information.
     
     Args:
         query: User query
+        query_embedding: Precomputed embedding of the query (embedded if None)
         
     Returns:
         Formatted context string
     """
-    results = query_rag(query, document_type="technical", top_k=5)
-    return format_rag_context(results)
+    results = query_rag(query, document_type="technical", top_k=5, query_embedding=query_embedding)
+    return format_rag_context(results, max_tokens=TECHNICAL_CONTEXT_TOKENS)
 
 
-def get_policy_context(query: Optional[str] = None) -> str:
+async def aget_technical_context(query: str, query_embedding: Optional[List[float]] = None) -> str:
     """
-    Get context for policy queries using Pure CAG with smart selection.
-    Returns relevant pre-loaded documents based on query keywords.
+    Async variant of get_technical_context.
     
     Args:
-        query: User query to determine relevant policies (optional)
+        query: User query
+        query_embedding: Precomputed embedding of the query (embedded if None)
+        
+    Returns:
+        Formatted context string
+    """
+    results = await aquery_rag(query, document_type="technical", top_k=5, query_embedding=query_embedding)
+    return format_rag_context(results, max_tokens=TECHNICAL_CONTEXT_TOKENS)
+
+
+def _embed_policy_sections(index: PolicySectionIndex) -> None:
+    """
+    Embed the policy sections once per index build (vectors are reused from
+    the embedding cache across restarts).
+    
+    On failure the index stays keyword-only until the policy files change.
+    
+    Args:
+        index: Policy section index to embed
+    """
+    if index.embeddings is not None or index.embeddings_unavailable:
+        return
+    
+    with _policy_embedding_lock:
+        if index.embeddings is not None or index.embeddings_unavailable:
+            return
+        
+        try:
+            cache = get_embedding_cache()
+            texts = [section["text"] for section in index.sections]
+            vectors = [cache.get(EMBEDDING_MODEL, text) for text in texts]
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            
+            if missing:
+                missing_texts = [texts[i] for i in missing]
+                new_vectors = call_with_retries(
+                    "embeddings",
+                    lambda: get_embeddings().embed_documents(missing_texts),
+                    estimate_tokens(missing_texts)
+                )
+                for i, vector in zip(missing, new_vectors):
+                    vectors[i] = vector
+                    cache.put(EMBEDDING_MODEL, texts[i], vector)
+            
+            index.set_embeddings(vectors)
+            print(f"✓ Embedded {len(index)} policy sections ({len(missing)} new)")
+            
+        except Exception as e:
+            index.embeddings_unavailable = True
+            print(f"Error embedding policy sections, using keyword ranking only: {str(e)}")
+
+
+def build_policy_section_context(query: str, query_embedding: Optional[List[float]] = None) -> str:
+    """
+    Assemble the policy context from the most relevant sections.
+    
+    Sections are ranked by keyword score (plus curated per-file keywords) and,
+    if a query embedding is given and the sections are embedded, by embedding
+    similarity. The best sections are taken up to POLICY_CONTEXT_TOKENS. With
+    no match at all, each document's overview section is used instead.
+    
+    Args:
+        query: User query
+        query_embedding: Query vector (optional)
+    
+    Returns:
+        Policy context string
+    """
+    index = _policy_section_index
+    if index is None or len(index) == 0:
+        return ""
+    
+    with time_stage("policy_selection"):
+        return _select_policy_sections(index, query, query_embedding)
+
+
+def _select_policy_sections(index: PolicySectionIndex, query: str, query_embedding: Optional[List[float]]) -> str:
+    """Rank, select and render policy sections (see build_policy_section_context)."""
+    file_boosts = {
+        policy_file: score * POLICY_FILE_KEYWORD_BOOST
+        for policy_file, score in _score_policy_files(query).items()
+    }
+    ranking = index.rank(query, query_embedding=query_embedding, file_boosts=file_boosts)
+    if not ranking:
+        ranking = index.overview_ranking()
+    
+    sections = index.select(ranking, POLICY_CONTEXT_TOKENS)
+    used_tokens = sum(section["tokens"] for section in sections)
+    documents = len({section["source"] for section in sections})
+    print(f"   ✓ Selected {len(sections)}/{len(index)} policy sections from {documents} documents (~{used_tokens} tokens)")
+    
+    return render_policy_sections(sections)
+
+
+def get_policy_context(query: Optional[str] = None, query_embedding: Optional[List[float]] = None) -> str:
+    """
+    Get context for policy queries using Pure CAG with section-level selection.
+    Returns the most relevant sections of the pre-loaded documents, within a
+    token budget.
+    
+    Args:
+        query: User query to determine relevant sections (optional)
+        query_embedding: Precomputed embedding of the query (embedded if
+            None and the sections are embedded)
     
     Returns:
-        Relevant policy documents as context
+        Relevant policy sections as context
     """
     if query is None:
         # No query provided, return all policies (fallback)
         return load_policy_documents()
     
-    return load_policy_documents(query=query)
+    try:
+        _refresh_policy_corpus()
+        
+        if POLICY_SECTION_EMBEDDINGS:
+            _embed_policy_sections(_policy_section_index)
+            if _policy_section_index.embeddings is not None and query_embedding is None:
+                query_embedding = embed_query(query)
+        
+        return build_policy_section_context(query, query_embedding)
+        
+    except Exception as e:
+        print(f"Error selecting policy sections: {str(e)}")
+        return build_policy_section_context(query) if _policy_section_index is not None else ""
+
+
+async def aget_policy_context(query: Optional[str] = None, query_embedding: Optional[List[float]] = None) -> str:
+    """
+    Async variant of get_policy_context.
+    
+    Args:
+        query: User query to determine relevant sections (optional)
+        query_embedding: Precomputed embedding of the query (embedded if
+            None and the sections are embedded)
+    
+    Returns:
+        Relevant policy sections as context
+    """
+    if query is None:
+        return await aload_policy_documents()
+    
+    try:
+        if _policy_checked_at is None or time.monotonic() - _policy_checked_at >= POLICY_RELOAD_INTERVAL:
+            await run_blocking(_refresh_policy_corpus)
+        
+        if POLICY_SECTION_EMBEDDINGS:
+            index = _policy_section_index
+            if index.embeddings is None and not index.embeddings_unavailable:
+                await run_blocking(_embed_policy_sections, index)
+            if index.embeddings is not None and query_embedding is None:
+                query_embedding = await aembed_query(query)
+        
+        return build_policy_section_context(query, query_embedding)
+        
+    except Exception as e:
+        print(f"Error selecting policy sections: {str(e)}")
+        return build_policy_section_context(query) if _policy_section_index is not None else ""
 
 
 def verify_chromadb_connection() -> bool:
@@ -330,6 +1075,10 @@ def verify_chromadb_connection() -> bool:
         if count == 0:
             raise Exception("ChromaDB collection is empty. Run ingest_data.py first.")
         
+        # Load the in-process index up front when it serves queries
+        if RETRIEVAL_ENGINE == "numpy":
+            get_vector_index()
+        
         return True
         
     except Exception as e:
@@ -0,0 +1,211 @@
+"""
+Routing decision cache
+Bounded LRU/TTL cache from normalized message text to the routing LLM's
+decision, so repeated questions ("I can't log in", "refund?") skip the
+routing call
+"""
+
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+from utils.metrics import Counter
+
+load_dotenv()
+
+# Configuration (ROUTING_CACHE_SIZE=0 disables the cache)
+ROUTING_CACHE_SIZE = int(os.getenv("ROUTING_CACHE_SIZE", "4096"))
+ROUTING_CACHE_TTL_SECONDS = float(os.getenv("ROUTING_CACHE_TTL_SECONDS", "3600"))
+ROUTING_CACHE_STEMMING = os.getenv("ROUTING_CACHE_STEMMING", "true").lower() == "true"
+
+ROUTING_CACHE_LOOKUPS = Counter("routing_cache_lookups", "Routing decision cache lookups", ["result"])
+
+APOSTROPHE_PATTERN = re.compile(r"['’]")
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+# Suffixes stripped by the light stemmer, longest first: (suffix, replacement)
+STEM_SUFFIXES = (
+    ("ational", "ate"), ("ization", "ize"), ("fulness", "ful"), ("iveness", "ive"),
+    ("ments", "ment"), ("ingly", ""), ("ings", ""), ("ies", "y"), ("ing", ""),
+    ("ied", "y"), ("ed", ""), ("es", ""), ("ly", ""), ("s", ""), ("e", ""),
+)
+MIN_STEM_LENGTH = 3
+
+_routing_cache = None
+
+
+def stem_token(token: str) -> str:
+    """Strip one common English suffix ("refunds" -> "refund", "charged" -> "charg")."""
+    for suffix, replacement in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            if suffix == "s" and token.endswith("ss"):
+                return token
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+def normalize_routing_text(text: str, stemming: bool = ROUTING_CACHE_STEMMING) -> str:
+    """
+    Reduce a message to its routing key.
+
+    Casefolds, drops apostrophes ("can't" -> "cant"), turns other punctuation
+    into spaces and collapses whitespace; optionally stems each word.
+
+    Args:
+        text: User message
+        stemming: Strip common suffixes from each word
+
+    Returns:
+        Normalized text (empty if the message has no words)
+    """
+    words = NON_WORD_PATTERN.sub(" ", APOSTROPHE_PATTERN.sub("", text.casefold())).split()
+    if stemming:
+        words = [stem_token(word) for word in words]
+    return " ".join(words)
+
+
+def routing_cache_version(prompt: str, llm) -> str:
+    """
+    Identify the routing prompt and model a decision was made with.
+
+    Args:
+        prompt: Routing prompt template
+        llm: Orchestrator chat model
+
+    Returns:
+        Short hash of the prompt, model class and model ID
+    """
+    model = getattr(llm, "model_id", None) or getattr(llm, "model_name", None) or ""
+    fingerprint = f"{type(llm).__name__}\0{model}\0{prompt}"
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+
+class RoutingCache:
+    """
+    Bounded cache of routing decisions keyed by normalized message text.
+
+    Entries expire after ttl_seconds and the least recently used entry is
+    evicted when the cache is full. Entries are keyed by the version of the
+    routing prompt and model as well as the message, so decisions made by
+    different routing providers coexist (per-request provider selection,
+    failover and hedging never clear the cache) and entries of a retired
+    prompt simply age out.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ROUTING_CACHE_SIZE,
+        ttl_seconds: float = ROUTING_CACHE_TTL_SECONDS,
+        stemming: bool = ROUTING_CACHE_STEMMING
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stemming = stemming
+
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()  # (version, key) -> (agent, stored_at)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, message: str, version: str) -> Optional[str]:
+        """
+        Look up the routing decision for a message.
+
+        Args:
+            message: User message
+            version: Current routing prompt/model version
+
+        Returns:
+            Agent type, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = (version, normalize_routing_text(message, self.stemming))
+
+        with self._lock:
+            agent = None
+            entry = self._entries.get(key) if key[1] else None
+            if entry is not None:
+                if time.monotonic() - entry[1] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    agent = entry[0]
+                else:
+                    del self._entries[key]
+                    self.expirations += 1
+
+            if agent is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        ROUTING_CACHE_LOOKUPS.inc(result="hit" if agent is not None else "miss")
+        return agent
+
+    def put(self, message: str, agent: str, version: str) -> None:
+        """
+        Cache the routing decision for a message.
+
+        Args:
+            message: User message
+            agent: Agent the routing LLM selected
+            version: Routing prompt/model version the decision was made with
+        """
+        if not self.enabled:
+            return
+
+        key = (version, normalize_routing_text(message, self.stemming))
+        if not key[1]:
+            return
+
+        with self._lock:
+            self._entries[key] = (agent, time.monotonic())
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached decision."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stemming": self.stemming,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "expirations": self.expirations,
+            "evictions": self.evictions
+        }
+
+
+def get_routing_cache() -> RoutingCache:
+    """Get or create the process-wide routing decision cache."""
+    global _routing_cache
+    if _routing_cache is None:
+        _routing_cache = RoutingCache()
+    return _routing_cache
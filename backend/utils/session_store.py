@@ -0,0 +1,559 @@
+"""
+Session storage for conversation state
+Pluggable stores with idle TTL, LRU eviction and size accounting:
+in-process memory, shared SQLite (WAL) file, or a Redis-compatible server
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+from models.schemas import AgentState
+from utils.async_utils import run_blocking
+
+load_dotenv()
+
+# Configuration
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # memory | sqlite | redis
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "./sessions.db")
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+
+
+def estimate_state_size(state: AgentState) -> int:
+    """
+    Estimate the memory held by a session as the size of its JSON encoding.
+
+    Dominated by the message history and cached billing context, which is what
+    grows per session.
+
+    Args:
+        state: Session state
+
+    Returns:
+        Approximate size in bytes
+    """
+    return len(state.model_dump_json())
+
+
+def serialize_state(state: AgentState) -> bytes:
+    """Encode a session as zlib-compressed JSON for shared backends."""
+    return zlib.compress(state.model_dump_json().encode("utf-8"))
+
+
+def deserialize_state(data: bytes) -> AgentState:
+    """Decode a session written by serialize_state."""
+    return AgentState.model_validate_json(zlib.decompress(data))
+
+
+class SessionStore(ABC):
+    """
+    Base class for session stores.
+
+    Subclasses implement get/put/delete/sweep/stats; the background TTL
+    sweeper is shared.
+    """
+
+    sweep_interval: float = SESSION_SWEEP_INTERVAL
+    _sweeper_task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id, touch=False) is not None
+
+    @abstractmethod
+    def get(self, session_id: str, touch: bool = True) -> Optional[AgentState]:
+        ...
+
+    @abstractmethod
+    def put(self, session_id: str, state: AgentState) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def sweep(self) -> int:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        ...
+
+    def start_sweeper(self) -> None:
+        """Start the background TTL sweeper on the running event loop."""
+        if self._sweeper_task is None or self._sweeper_task.done():
+            self._sweeper_task = asyncio.create_task(self._sweep_loop())
+
+    async def stop_sweeper(self) -> None:
+        """Stop the background TTL sweeper."""
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            try:
+                await self._sweeper_task
+            except asyncio.CancelledError:
+                pass
+            self._sweeper_task = None
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = await run_blocking(self.sweep)
+            except Exception as e:
+                print(f"⚠️  Session sweep failed: {str(e)}")
+                continue
+            if removed:
+                print(f"🧹 Expired {removed} idle sessions")
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Bounded in-process session store.
+
+    Entries are kept in least-recently-used order. Writes evict the oldest
+    sessions once the entry or byte limit is exceeded, reads drop sessions idle
+    for longer than the TTL, and a background sweeper removes expired sessions
+    that are never read again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        max_bytes: int = SESSION_MAX_BYTES,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        sweep_interval: float = SESSION_SWEEP_INTERVAL
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+
+        # session_id -> (state, size_bytes, last_access)
+        self._entries: "OrderedDict[str, Tuple[AgentState, int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.evictions_lru = 0
+        self.evictions_ttl = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, session_id: str, touch: bool = True) -> Optional[AgentState]:
+        """
+        Look up a session, refreshing its LRU position and idle timer.
+
+        Args:
+            session_id: Session identifier
+            touch: Whether the lookup counts as activity
+
+        Returns:
+            Session state, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+
+            state, size, last_access = entry
+            now = time.monotonic()
+            if now - last_access > self.ttl_seconds:
+                self._remove(session_id)
+                self.evictions_ttl += 1
+                return None
+
+            if touch:
+                self._entries[session_id] = (state, size, now)
+                self._entries.move_to_end(session_id)
+            return state
+
+    def put(self, session_id: str, state: AgentState) -> None:
+        """
+        Store (or re-measure) a session and enforce the entry and byte limits.
+
+        Args:
+            session_id: Session identifier
+            state: Session state
+        """
+        size = estimate_state_size(state)
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+
+            self._entries[session_id] = (state, size, time.monotonic())
+            self._total_bytes += size
+
+            # Evict least recently used sessions, never the one just written
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions_lru += 1
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Remove a session.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if the session existed
+        """
+        with self._lock:
+            if session_id not in self._entries:
+                return False
+            self._remove(session_id)
+            return True
+
+    def sweep(self) -> int:
+        """
+        Remove every session idle for longer than the TTL.
+
+        Returns:
+            Number of sessions removed
+        """
+        cutoff = time.monotonic() - self.ttl_seconds
+        removed = 0
+        with self._lock:
+            # LRU order means idle sessions are at the front
+            while self._entries:
+                oldest_id, (_, _, last_access) = next(iter(self._entries.items()))
+                if last_access > cutoff:
+                    break
+                self._remove(oldest_id)
+                removed += 1
+            self.evictions_ttl += removed
+        return removed
+
+    def stats(self) -> Dict:
+        """Return size and eviction counters (exposed through /health)."""
+        return {
+            "backend": "memory",
+            "sessions": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions_lru": self.evictions_lru,
+            "evictions_ttl": self.evictions_ttl
+        }
+
+    def _remove(self, session_id: str) -> None:
+        # Caller must hold the lock
+        _, size, _ = self._entries.pop(session_id)
+        self._total_bytes -= size
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store shared by every worker process on a host via one SQLite file.
+
+    The database runs in WAL mode so readers never block the writer. Sessions
+    are stored as compressed JSON; last-access times use wall-clock time so
+    TTL and LRU order are consistent across processes. Eviction counters are
+    per process.
+    """
+
+    def __init__(
+        self,
+        path: str = SESSION_DB_PATH,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        max_bytes: int = SESSION_MAX_BYTES,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        sweep_interval: float = SESSION_SWEEP_INTERVAL
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+
+        # One connection per thread (sqlite3 connections are not shareable)
+        self._local = threading.local()
+
+        self.evictions_lru = 0
+        self.evictions_ttl = 0
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        row = self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return row[0]
+
+    def get(self, session_id: str, touch: bool = True) -> Optional[AgentState]:
+        """
+        Look up a session, refreshing its idle timer.
+
+        Args:
+            session_id: Session identifier
+            touch: Whether the lookup counts as activity
+
+        Returns:
+            Session state, or None if missing or expired
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT state, last_access FROM sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        data, last_access = row
+        now = time.time()
+        if now - last_access > self.ttl_seconds:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self.evictions_ttl += 1
+            return None
+
+        if touch:
+            conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?",
+                (now, session_id)
+            )
+        return deserialize_state(data)
+
+    def put(self, session_id: str, state: AgentState) -> None:
+        """
+        Store a session and enforce the entry and byte limits.
+
+        Args:
+            session_id: Session identifier
+            state: Session state
+        """
+        data = serialize_state(state)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (session_id, data, len(data), time.time())
+            )
+            count, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions"
+            ).fetchone()
+
+            if count > self.max_entries or total_bytes > self.max_bytes:
+                # Evict least recently used sessions, never the one just written
+                rows = conn.execute(
+                    "SELECT session_id, size FROM sessions WHERE session_id != ? "
+                    "ORDER BY last_access",
+                    (session_id,)
+                ).fetchall()
+                evict_ids = []
+                for evict_id, size in rows:
+                    if count <= self.max_entries and total_bytes <= self.max_bytes:
+                        break
+                    evict_ids.append((evict_id,))
+                    count -= 1
+                    total_bytes -= size
+                conn.executemany("DELETE FROM sessions WHERE session_id = ?", evict_ids)
+                self.evictions_lru += len(evict_ids)
+
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Remove a session.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if the session existed
+        """
+        cursor = self._connect().execute(
+            "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+        )
+        return cursor.rowcount > 0
+
+    def sweep(self) -> int:
+        """
+        Remove every session idle for longer than the TTL.
+
+        Returns:
+            Number of sessions removed
+        """
+        cursor = self._connect().execute(
+            "DELETE FROM sessions WHERE last_access < ?",
+            (time.time() - self.ttl_seconds,)
+        )
+        self.evictions_ttl += cursor.rowcount
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Return size and eviction counters (exposed through /health)."""
+        count, total_bytes = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions"
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "sessions": count,
+            "bytes": total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions_lru": self.evictions_lru,
+            "evictions_ttl": self.evictions_ttl
+        }
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session store backed by a Redis-compatible key-value server, shared
+    across hosts.
+
+    Idle TTL maps onto key expiry (refreshed on every read); entry and memory
+    limits are delegated to the server's maxmemory / allkeys-lru policy.
+    Requires the optional `redis` package.
+    """
+
+    def __init__(
+        self,
+        url: str = SESSION_REDIS_URL,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        key_prefix: str = "session:"
+    ):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("SESSION_BACKEND=redis requires the 'redis' package (pip install redis)")
+
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}"
+
+    def __len__(self) -> int:
+        # DBSIZE is O(1); it counts every key in the database, so give the
+        # session store a database of its own for an exact figure
+        return self._client.dbsize()
+
+    def get(self, session_id: str, touch: bool = True) -> Optional[AgentState]:
+        """
+        Look up a session, refreshing its expiry.
+
+        Args:
+            session_id: Session identifier
+            touch: Whether the lookup counts as activity
+
+        Returns:
+            Session state, or None if missing or expired
+        """
+        key = self._key(session_id)
+        if touch:
+            data = self._client.getex(key, ex=int(self.ttl_seconds))
+        else:
+            data = self._client.get(key)
+        return deserialize_state(data) if data is not None else None
+
+    def put(self, session_id: str, state: AgentState) -> None:
+        """
+        Store a session with the idle TTL as its expiry.
+
+        Args:
+            session_id: Session identifier
+            state: Session state
+        """
+        self._client.set(self._key(session_id), serialize_state(state), ex=int(self.ttl_seconds))
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Remove a session.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if the session existed
+        """
+        return self._client.delete(self._key(session_id)) > 0
+
+    def sweep(self) -> int:
+        """Expiry is handled by the server."""
+        return 0
+
+    def start_sweeper(self) -> None:
+        """Expiry is handled by the server; no sweeper needed."""
+
+    def stats(self) -> Dict:
+        """Return size counters (exposed through /health)."""
+        info = self._client.info("stats")
+        return {
+            "backend": "redis",
+            "sessions": len(self),
+            "sessions_approximate": True,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions_lru": info.get("evicted_keys", 0),
+            "evictions_ttl": info.get("expired_keys", 0)
+        }
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    """
+    Create the session store selected by SESSION_BACKEND.
+
+    Use "sqlite" to share sessions between uvicorn workers on one host and
+    "redis" to share them across hosts.
+
+    Args:
+        backend: memory, sqlite or redis
+
+    Returns:
+        Configured session store
+    """
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,200 @@
+"""
+Speculative retrieval (opt-in)
+Embeds the query and prefetches agent contexts while the routing LLM is still
+deciding, so the chosen agent can start generating immediately
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+from models.schemas import AgentState
+from utils.query_classifier import get_query_classifier
+from utils.retrieval import aembed_query, aget_billing_context, aget_technical_context, aget_policy_context
+
+load_dotenv()
+
+# Configuration
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+# Number of agents to prefetch for, most likely first by the local classifier (3 = all)
+SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "2"))
+# Prefetches not claimed within this time are dropped
+SPECULATIVE_TTL_SECONDS = 60
+
+# Speculation outcomes
+SPECULATION_STATS = {
+    "started": 0,
+    "used": 0,        # chosen agent's context was prefetched
+    "missed": 0,      # chosen agent was not among the candidates
+    "failed": 0,      # prefetch raised; the agent retrieved normally
+    "discarded": 0    # request ended without claiming the prefetch
+}
+
+# (session_id, message) -> {"created": ..., "embedding": Task, "contexts": {agent: Task}}
+_pending: Dict[tuple, Dict] = {}
+
+
+def candidate_agents(message: str, count: int = SPECULATIVE_CANDIDATES) -> List[str]:
+    """Most likely agents for a message according to the local classifier."""
+    probabilities = get_query_classifier().probabilities(message)
+    return sorted(probabilities, key=probabilities.get, reverse=True)[:count]
+
+
+def start_speculative_retrieval(state: AgentState) -> None:
+    """
+    Start embedding the query and retrieving context for the candidate agents.
+
+    Must be called from the event loop (the work runs as background tasks).
+
+    Args:
+        state: Agent state of the request being routed
+    """
+    _drop_expired()
+
+    query = state.current_message
+    agents = candidate_agents(query)
+    context_version = state.billing_context_version
+    context_factories = {
+        "billing": lambda embedding: aget_billing_context(
+            query=query, context_version=context_version, query_embedding=embedding
+        ),
+        "technical": lambda embedding: aget_technical_context(query=query, query_embedding=embedding),
+        "policy": lambda embedding: aget_policy_context(query=query, query_embedding=embedding)
+    }
+
+    # Contexts wait for the one shared embedding call and reuse its vector
+    embedding_task = _create_task(aembed_query(query))
+    _pending[(state.session_id, query)] = {
+        "created": time.monotonic(),
+        "embedding": embedding_task,
+        "contexts": {
+            agent: _create_task(_after(embedding_task, context_factories[agent]))
+            for agent in agents
+        }
+    }
+    SPECULATION_STATS["started"] += 1
+    print(f"🔮 Speculative retrieval started for: {', '.join(agents)}")
+
+
+async def prefetched_embedding(state: AgentState) -> Optional[List[float]]:
+    """
+    Query embedding computed by a running speculation, if any.
+
+    Args:
+        state: Current agent state
+
+    Returns:
+        Embedding vector, or None if no speculation is pending (or it failed)
+    """
+    entry = _pending.get((state.session_id, state.current_message))
+    if entry is None:
+        return None
+    try:
+        return await asyncio.shield(entry["embedding"])
+    except Exception:
+        return None
+
+
+async def use_prefetched_context(
+    state: AgentState,
+    agent: str,
+    retrieve: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Return the prefetched context for the chosen agent, or retrieve it now.
+
+    Claiming a speculation cancels the prefetches for the other agents.
+
+    Args:
+        state: Current agent state
+        agent: Agent that handles the request
+        retrieve: Retrieval to run if nothing usable was prefetched
+
+    Returns:
+        Agent context (same value as retrieve() would produce)
+    """
+    entry = _pending.pop((state.session_id, state.current_message), None)
+    if entry is None:
+        return await retrieve()
+
+    for other_agent, task in entry["contexts"].items():
+        if other_agent != agent:
+            task.cancel()
+
+    task = entry["contexts"].get(agent)
+    if task is None:
+        SPECULATION_STATS["missed"] += 1
+        return await retrieve()
+
+    try:
+        context = await task
+        SPECULATION_STATS["used"] += 1
+        print(f"   ✓ Using speculatively prefetched {agent} context")
+        return context
+    except Exception as e:
+        SPECULATION_STATS["failed"] += 1
+        print(f"⚠️  Speculative {agent} retrieval failed, retrieving again: {str(e)}")
+        return await retrieve()
+
+
+def discard_speculative_retrieval(session_id: str, message: str) -> None:
+    """
+    Cancel a request's unclaimed prefetch (e.g. after a response cache hit).
+
+    Only the (session_id, message) entry is dropped, so a concurrent request
+    of the same session keeps its own speculation.
+
+    Args:
+        session_id: Session of the finished request
+        message: Message of the finished request
+    """
+    entry = _pending.pop((session_id, message), None)
+    if entry is not None:
+        _cancel(entry)
+        SPECULATION_STATS["discarded"] += 1
+
+
+def get_speculation_stats() -> Dict:
+    """Return speculation counters and the share of requests that used a prefetch."""
+    claimed = SPECULATION_STATS["used"] + SPECULATION_STATS["missed"] + SPECULATION_STATS["failed"]
+    return {
+        "enabled": SPECULATIVE_RETRIEVAL,
+        "candidates": SPECULATIVE_CANDIDATES,
+        **SPECULATION_STATS,
+        "pending": len(_pending),
+        "use_rate": SPECULATION_STATS["used"] / claimed if claimed else 0.0
+    }
+
+
+async def _after(
+    embedding_task: asyncio.Task,
+    retrieve: Callable[[Optional[List[float]]], Awaitable[Any]]
+) -> Any:
+    try:
+        # Shielded: cancelling one agent's prefetch must not cancel the shared embedding
+        embedding = await asyncio.shield(embedding_task)
+    except Exception:
+        embedding = None  # Retrieval embeds (and reports) on its own
+    return await retrieve(embedding)
+
+
+def _create_task(coroutine) -> asyncio.Task:
+    task = asyncio.get_running_loop().create_task(coroutine)
+    # Unclaimed tasks must not log "exception was never retrieved"
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+
+def _cancel(entry: Dict) -> None:
+    entry["embedding"].cancel()
+    for task in entry["contexts"].values():
+        task.cancel()
+
+
+def _drop_expired() -> None:
+    now = time.monotonic()
+    for key in [key for key, entry in _pending.items() if now - entry["created"] > SPECULATIVE_TTL_SECONDS]:
+        _cancel(_pending.pop(key))
+        SPECULATION_STATS["discarded"] += 1
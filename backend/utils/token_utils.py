@@ -0,0 +1,60 @@
+"""
+Token counting helpers
+Counts tokens with the cl100k_base encoding used by the OpenAI models
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tiktoken encoding once (None if the encoding files are unavailable)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in a text.
+
+    Falls back to ~4 characters per token when the encoding files cannot be
+    loaded (e.g. offline).
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Number of tokens
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text down to at most max_tokens tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token limit
+
+    Returns:
+        The text itself if it fits, otherwise its leading max_tokens tokens
+    """
+    if max_tokens <= 0:
+        return ""
+
+    encoding = _get_encoding()
+    if encoding is None:
+        # Inverse of the count_tokens fallback
+        return text if count_tokens(text) <= max_tokens else text[:(max_tokens - 1) * 4]
+
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,183 @@
+"""
+In-process NumPy vector index
+Exact top-k search over per-document-type float32 embedding matrices exported
+from ChromaDB at ingest time (alternative retrieval engine to ChromaDB queries)
+"""
+
+import os
+import json
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+DOCUMENT_TYPES = ["billing", "technical", "policy"]
+
+
+def export_vector_index(collection, index_dir: Path) -> Dict[str, int]:
+    """
+    Export a ChromaDB collection as one embedding matrix per document type.
+
+    Writes <type>_embeddings.npy (contiguous float32, loadable with mmap) and
+    <type>_chunks.json (ids, documents, metadatas in matrix row order). Each
+    file is written next to its target and renamed into place, so a running
+    backend that has the old matrix memory-mapped keeps reading the old file.
+
+    Args:
+        collection: ChromaDB collection to export
+        index_dir: Output directory
+
+    Returns:
+        Number of chunks exported per document type
+    """
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    counts = {}
+    for document_type in DOCUMENT_TYPES:
+        data = collection.get(
+            where={"document_type": document_type},
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if data["ids"]:
+            embeddings = np.ascontiguousarray(
+                np.asarray(data["embeddings"], dtype=np.float32).reshape(len(data["ids"]), -1)
+            )
+        else:
+            # Every document of this type was deleted
+            embeddings = np.zeros((0, 0), dtype=np.float32)
+
+        chunks = {
+            "ids": data["ids"],
+            "documents": data["documents"],
+            "metadatas": data["metadatas"]
+        }
+        _replace_file(index_dir / f"{document_type}_embeddings.npy", lambda f: np.save(f, embeddings))
+        _replace_file(
+            index_dir / f"{document_type}_chunks.json",
+            lambda f: f.write(json.dumps(chunks).encode("utf-8"))
+        )
+
+        counts[document_type] = len(data["ids"])
+
+    return counts
+
+
+def _replace_file(path: Path, write: Callable) -> None:
+    """Write a file through a temporary file in the same directory and atomically rename it."""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class VectorPartition:
+    """Embedding matrix and chunk payloads for one document type."""
+
+    def __init__(self, embeddings: np.ndarray, chunks: Dict):
+        self.embeddings = embeddings
+        self.ids: List[str] = chunks["ids"]
+        self.documents: List[str] = chunks["documents"]
+        self.metadatas: List[Dict] = chunks["metadatas"]
+        # Squared norms for exact L2 distances (same metric as the Chroma collection)
+        self.squared_norms = np.einsum("ij,ij->i", embeddings, embeddings)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: np.ndarray, query_squared_norm: float, top_k: int) -> List[tuple]:
+        """Return (squared L2 distance, row) pairs for the top_k nearest rows."""
+        if len(self) == 0:
+            return []
+
+        distances = self.squared_norms - 2.0 * (self.embeddings @ query) + query_squared_norm
+        k = min(top_k, len(distances))
+        top_rows = np.argpartition(distances, k - 1)[:k]
+        top_rows = top_rows[np.argsort(distances[top_rows])]
+        return [(float(distances[row]), int(row)) for row in top_rows]
+
+
+class NumpyVectorIndex:
+    """
+    Exact nearest-neighbour index over the exported embedding matrices.
+
+    Results use the same format and distance metric (squared L2) as query_rag
+    over ChromaDB.
+    """
+
+    def __init__(self, index_dir: Path, mmap: bool = True):
+        index_dir = Path(index_dir)
+        self.partitions: Dict[str, VectorPartition] = {}
+
+        for document_type in DOCUMENT_TYPES:
+            matrix_path = index_dir / f"{document_type}_embeddings.npy"
+            chunks_path = index_dir / f"{document_type}_chunks.json"
+            if not matrix_path.exists() or not chunks_path.exists():
+                raise FileNotFoundError(
+                    f"Vector index artifact missing for '{document_type}' in {index_dir}. Run ingest_data.py first."
+                )
+
+            embeddings = np.load(matrix_path, mmap_mode="r" if mmap else None)
+            with open(chunks_path, 'r', encoding='utf-8') as f:
+                chunks = json.load(f)
+            if embeddings.shape[0] != len(chunks["ids"]):
+                raise ValueError(
+                    f"Vector index for '{document_type}' has {embeddings.shape[0]} rows but "
+                    f"{len(chunks['ids'])} chunks (ingestion in progress?)"
+                )
+            self.partitions[document_type] = VectorPartition(embeddings, chunks)
+
+    def __len__(self) -> int:
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def query(
+        self,
+        query_embedding: List[float],
+        document_type: Optional[str] = None,
+        top_k: int = 5
+    ) -> List[Dict]:
+        """
+        Exact top-k search.
+
+        Args:
+            query_embedding: Query vector
+            document_type: Restrict search to one partition (all if None)
+            top_k: Number of results to return
+
+        Returns:
+            List of document chunks with metadata and distance, nearest first
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_squared_norm = float(query @ query)
+
+        if document_type is not None:
+            partitions = [self.partitions[document_type]] if document_type in self.partitions else []
+        else:
+            partitions = list(self.partitions.values())
+
+        candidates = []
+        for partition in partitions:
+            for distance, row in partition.search(query, query_squared_norm, top_k):
+                candidates.append((distance, partition, row))
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        return [
+            {
+                "id": partition.ids[row],
+                "content": partition.documents[row],
+                "metadata": partition.metadatas[row],
+                "distance": distance
+            }
+            for distance, partition, row in candidates[:top_k]
+        ]